@@ -0,0 +1,466 @@
+import re
+import json
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+# ===========================
+# === AGENT ACTION PARSER ===
+# ===========================
+# Parses an agent LLM reply in a single scan. Every marker ends with ':' (except END_CONTENT),
+# so the tokenizer jumps from colon to colon (C-speed str.find) and reads the word before it:
+# REASON:, COMMAND:, REPORT:, ASK:, SRCH:, WRITE_FILE:, CONTENT:, TIMEOUT: and the hallucinated
+# "Output:" / "Result:" / "Observation:" markers. A small state machine then slices the fields
+# out of the text between markers.
+#
+# Action priority (unchanged): REPORT > ASK (only when allowed) > SRCH > WRITE_FILE > COMMAND.
+# Markers inside a WRITE_FILE body (between CONTENT: and END_CONTENT) are file content,
+# not actions.
+
+_KEYWORDS = frozenset({'REASON', 'COMMAND', 'REPORT', 'ASK', 'SRCH', 'WRITE_FILE', 'TIMEOUT', 'CONTENT'})
+_HALLUCINATION_MARKERS = ('OUTPUT', 'RESULT', 'OBSERVATION')
+_MAX_KEYWORD_LENGTH = 11
+# Searched in the original text, never in text.upper(): upper() can lengthen a string
+# ('ß' -> 'SS', 'ﬁ' -> 'FI') and shift the offsets used to cut the original.
+# ASCII letters only, so the matched word keeps its length when upper-cased.
+_WORD_BEFORE_COLON_RE = re.compile(r"[A-Za-z_]+\Z")
+_END_CONTENT_RE = re.compile(r"END_CONTENT", re.IGNORECASE | re.ASCII)
+_TIMEOUT_VALUE_RE = re.compile(r"\s*(\d+)")
+
+# A command ends at the next of these markers when it starts a line, or at a hallucinated output marker
+_COMMAND_STOP_MARKERS = frozenset({'REASON', 'TIMEOUT', 'REPORT', 'ASK', 'SRCH', 'WRITE_FILE', 'END_CONTENT'})
+# The reason ends at the next of these markers (anywhere)
+_REASON_STOP_MARKERS = frozenset({'COMMAND', 'REPORT', 'ASK', 'SRCH', 'WRITE_FILE', 'TIMEOUT'})
+
+EMPTY_COMMAND_FALLBACK = "echo 'Error: LLM hallucinated output without command'"
+
+
+@dataclass
+class AgentAction:
+    """Typed result of parsing one agent reply. kind is None when no action was found."""
+    kind: Optional[str] = None          # 'report' | 'ask' | 'srch' | 'write_file' | 'command'
+    reason: str = ""
+    report: str = ""
+    question: str = ""
+    query: str = ""
+    file_path: str = ""
+    file_content: str = ""
+    raw_command: str = ""               # Command text as written by the LLM
+    command: str = ""                   # Command after clean_command()
+    timeout: Optional[int] = None       # Requested TIMEOUT (seconds), not yet clamped
+    diagnostics: List[str] = field(default_factory=list)
+
+
+# === Command Cleaning ===
+
+_CODE_FENCE_START_RE = re.compile(r"^```[a-zA-Z0-9]*\s*")
+_FILE_FENCE_START_RE = re.compile(r"^```[a-zA-Z0-9]*\n")
+# Leading markdown decorations (bold/italic, headers, list dashes, quotes, separators),
+# repeated. Single '*', '#', '-', '>', '_' only count when followed by whitespace, the same
+# symbol or the end, so flags (-l), redirections (>file) and identifiers are preserved.
+_DECORATION_RE = re.compile(
+    r"(?:(?:\*{3}|\*{2}|\*(?=[ \t*]|\Z)"
+    r"|\#{4}|\#{3}|\#{2}|\#(?=[ \t#]|\Z)"
+    r"|--(?=[ \t-]|\Z)|-(?=[ \t]|\Z)"
+    r"|>>(?=[ \t>]|\Z)|>(?=[ \t>]|\Z)"
+    r"|_{3}|__(?=[ \t_]|\Z)|_(?=[ \t_]|\Z))\s*)+"
+)
+
+
+def clean_command(raw_command: str) -> str:
+    """
+    Cleans formatting artifacts from the LLM response.
+    Removes Markdown code blocks, inline backticks, surrounding quotes and leading decorations.
+    """
+    if not raw_command:
+        return ""
+
+    cmd = raw_command.strip()
+
+    # 0. Decorations wrapped around a code span ("**`ls`**" -> "`ls`")
+    match = _DECORATION_RE.match(cmd)
+    if match:
+        prefix = cmd[:match.end()].strip()
+        cmd = cmd[match.end():]
+        if prefix and prefix.strip('*_') == '' and cmd.endswith(prefix):
+            cmd = cmd[:-len(prefix)].rstrip()
+
+    # 1. Markdown code block (```bash ... ```)
+    if cmd.startswith("```"):
+        cmd = _CODE_FENCE_START_RE.sub("", cmd, count=1)
+        if cmd.endswith("```"):
+            cmd = cmd[:-3]
+        cmd = cmd.strip()
+
+    # 2. Inline code, only if the WHOLE string is wrapped in backticks
+    if cmd.startswith("`") and cmd.endswith("`") and len(cmd) > 2:
+        cmd = cmd[1:-1].strip()
+
+    # 3. Surrounding quotes, only if the WHOLE string is wrapped ("ls -la" -> ls -la, grep "foo" bar untouched)
+    if len(cmd) > 2 and cmd[0] == cmd[-1] and cmd[0] in ('"', "'"):
+        cmd = cmd[1:-1].strip()
+
+    # 4. Leading decorative symbols (**, ##, -, >, ___ ...) which are not valid command prefixes
+    match = _DECORATION_RE.match(cmd)
+    if match:
+        cmd = cmd[match.end():]
+
+    return cmd.strip()
+
+
+def clean_file_content(raw_content: str) -> str:
+    """Strips a Markdown code fence around WRITE_FILE content."""
+    content = _FILE_FENCE_START_RE.sub("", raw_content.strip(), count=1)
+    if content.endswith("```"):
+        content = content[:-3]
+    return content.strip()
+
+
+# === Parser ===
+
+def _is_line_start(text: str, pos: int) -> bool:
+    line_start = text.rfind('\n', 0, pos) + 1
+    return line_start == pos or text[line_start:pos].isspace()
+
+
+def _scan_markers(text: str) -> List[tuple]:
+    """Returns the (kind, start, end) of every marker, in order of appearance (case-insensitive)."""
+    markers = []
+
+    pos = text.find(':')
+    while pos != -1:
+        word_match = _WORD_BEFORE_COLON_RE.search(text, max(0, pos - _MAX_KEYWORD_LENGTH - 1), pos)
+        if word_match:
+            word, start = word_match.group().upper(), word_match.start()
+            # Whole-word markers only ('TASK:' is not 'ASK:')
+            at_boundary = start == 0 or not (text[start - 1].isalnum() or text[start - 1] == '_')
+            if word in _KEYWORDS and at_boundary:
+                markers.append((word, start, pos + 1))
+            elif word.endswith(_HALLUCINATION_MARKERS):
+                marker_start = pos - next(len(m) for m in _HALLUCINATION_MARKERS if word.endswith(m))
+                markers.append(('HALLUCINATION', marker_start, pos + 1))
+        pos = text.find(':', pos + 1)
+
+    for end_match in _END_CONTENT_RE.finditer(text):
+        pos = end_match.start()
+        if pos == 0 or not (text[pos - 1].isalnum() or text[pos - 1] == '_'):
+            markers.append(('END_CONTENT', pos, end_match.end()))
+
+    markers.sort(key=lambda marker: marker[1])
+    return markers
+
+
+def parse_agent_response(text: str, allow_ask: bool = True) -> AgentAction:
+    """Scans the reply once and returns the action with all its fields."""
+    action = AgentAction()
+    if not text:
+        return action
+
+    # --- 1. Tokenize (single pass) ---
+    tokens = []             # (kind, start, end)
+    first = {}              # kind -> index of its first token
+    in_content = False
+    for kind, start, end in _scan_markers(text):
+        if in_content:
+            # Inside a WRITE_FILE body only END_CONTENT is meaningful
+            if kind != 'END_CONTENT':
+                continue
+            in_content = False
+        elif kind == 'CONTENT':
+            if 'WRITE_FILE' not in first or 'CONTENT' in first:
+                continue
+            in_content = True
+
+        first.setdefault(kind, len(tokens))
+        tokens.append((kind, start, end))
+
+    def body(index: int, stop_kinds=None, line_start_only=False, stop_at_hallucination=False) -> str:
+        """Text after token[index] up to the next stop token (or the end)."""
+        _, _, start = tokens[index]
+        for kind, token_start, _ in tokens[index + 1:]:
+            if stop_at_hallucination and kind == 'HALLUCINATION':
+                action.diagnostics.append(f"Command cut at hallucinated '{text[token_start:token_start + 12].split(':')[0]}:' marker.")
+                return text[start:token_start]
+            if stop_kinds and kind in stop_kinds and (not line_start_only or _is_line_start(text, token_start)):
+                return text[start:token_start]
+        return text[start:]
+
+    # --- 2. Common fields ---
+    if 'REASON' in first:
+        action.reason = body(first['REASON'], _REASON_STOP_MARKERS).strip()
+
+    for index, (kind, _, end) in enumerate(tokens):
+        if kind == 'TIMEOUT':
+            value = _TIMEOUT_VALUE_RE.match(text, end)
+            if value:
+                action.timeout = int(value.group(1))
+                break
+            action.diagnostics.append("TIMEOUT marker without a number ignored.")
+
+    # --- 3. Action (by priority) ---
+    candidates = [k for k in ('REPORT', 'ASK', 'SRCH', 'WRITE_FILE', 'COMMAND') if k in first]
+    if not allow_ask and 'ASK' in candidates:
+        candidates.remove('ASK')
+        action.diagnostics.append("ASK ignored (ASK mode disabled).")
+
+    if 'WRITE_FILE' in candidates:
+        content_index = first.get('CONTENT')
+        end_index = next((i for i, t in enumerate(tokens) if t[0] == 'END_CONTENT' and content_index is not None and i > content_index), None)
+        if content_index is None or end_index is None:
+            candidates.remove('WRITE_FILE')
+            action.diagnostics.append("WRITE_FILE ignored: missing CONTENT: or END_CONTENT.")
+        else:
+            path_start = tokens[first['WRITE_FILE']][2]
+            path_line_end = text.find('\n', path_start)
+            action.file_path = text[path_start:path_line_end if path_line_end != -1 else len(text)].strip()
+            action.file_content = clean_file_content(text[tokens[content_index][2]:tokens[end_index][1]])
+
+    if len(candidates) > 1:
+        action.diagnostics.append(f"Multiple actions found ({', '.join(candidates)}); using {candidates[0]}.")
+    if not candidates:
+        return action
+
+    kind = candidates[0]
+    action.kind = kind.lower()
+    if kind == 'REPORT':
+        action.report = text[tokens[first['REPORT']][2]:].strip()
+    elif kind == 'ASK':
+        action.question = text[tokens[first['ASK']][2]:].strip()
+    elif kind == 'SRCH':
+        action.query = text[tokens[first['SRCH']][2]:].strip().split('\n')[0].strip()
+    elif kind == 'COMMAND':
+        raw = body(first['COMMAND'], _COMMAND_STOP_MARKERS, line_start_only=True, stop_at_hallucination=True).strip()
+        if not raw:
+            action.diagnostics.append("Empty command after hallucination filtering.")
+            raw = EMPTY_COMMAND_FALLBACK
+        action.raw_command = raw
+        action.command = clean_command(raw)
+    return action
+
+
+# ====================================
+# === NATIVE TOOL-CALLING PROTOCOL ===
+# ====================================
+# With [Agent] action_protocol = native the agent LLM is given one tool per action and answers
+# with a tool call (Anthropic tools, Gemini function declarations) or, for Ollama, with a JSON
+# object in JSON mode. Both become the same AgentAction as the text markers. A reply without a
+# usable tool call / JSON object falls back to parse_agent_response() on its text.
+
+ACTION_PROTOCOLS = ('text', 'native')
+
+
+def _tool(name: str, description: str, properties: Dict, required: List[str]) -> Dict:
+    """Function declaration (name/description/JSON-schema parameters), accepted by the bind_tools of every provider."""
+    properties = {"reason": {"type": "string", "description": "Why this is the right next step."}, **properties}
+    return {
+        "name": name, "description": description,
+        "parameters": {"type": "object", "properties": properties, "required": ["reason"] + required},
+    }
+
+
+AGENT_ACTION_TOOLS = [
+    _tool('run_command', "Execute one shell command on the remote system.", {
+        "command": {"type": "string", "description": "The exact command line to run."},
+        "timeout": {"type": "integer", "description": "Optional timeout in seconds, only for slow commands."},
+    }, ["command"]),
+    _tool('write_file', "Write a file on the remote system (replaces its content).", {
+        "path": {"type": "string", "description": "Absolute path of the file."},
+        "content": {"type": "string", "description": "Full file content."},
+    }, ["path", "content"]),
+    _tool('search_history', "Search the full execution history of this session.", {
+        "query": {"type": "string", "description": "Search query."},
+    }, ["query"]),
+    _tool('report', "Finish the task with the final report.", {
+        "report": {"type": "string", "description": "Final report for the user."},
+    }, ["report"]),
+    _tool('ask_user', "Ask the human operator a question and wait for the answer.", {
+        "question": {"type": "string", "description": "The question."},
+    }, ["question"]),
+]
+TOOL_ACTION_KINDS = {'run_command': 'command', 'write_file': 'write_file', 'search_history': 'srch',
+                     'report': 'report', 'ask_user': 'ask'}
+
+
+def action_tools(allow_ask: bool = True) -> List[Dict]:
+    """The tools offered to the agent (ask_user only in ASK mode)."""
+    return [tool for tool in AGENT_ACTION_TOOLS if allow_ask or tool['name'] != 'ask_user']
+
+
+def native_instructions(json_mode: bool, allow_ask: bool = True) -> str:
+    """Appended to the agent prompt in native mode (the prompt templates describe the text markers)."""
+    if not json_mode:
+        return "\n\nRespond by calling exactly one of the provided tools; put your reasoning in its 'reason' argument."
+    lines = ["", "", "Respond ONLY with one JSON object (no other text), with an \"action\" field and that action's fields:"]
+    for tool in action_tools(allow_ask):
+        fields = ", ".join(tool['parameters']['properties'])
+        lines.append(f'- "{tool["name"]}": {tool["description"]} Fields: {fields}')
+    lines.append('Example: {"action": "run_command", "reason": "Check the OS.", "command": "uname -a"}')
+    return "\n".join(lines)
+
+
+def action_from_tool_call(name: str, args: Optional[Dict], allow_ask: bool = True) -> AgentAction:
+    """Turns one tool call (or JSON-mode object) into an AgentAction; kind stays None if it is unusable."""
+    action = AgentAction()
+    args = args if isinstance(args, dict) else {}
+    kind = TOOL_ACTION_KINDS.get(name or '')
+    if kind is None:
+        action.diagnostics.append(f"Unknown tool '{name}'.")
+        return action
+    if kind == 'ask' and not allow_ask:
+        action.diagnostics.append("ASK ignored (ASK mode disabled).")
+        return action
+
+    def field_value(key: str) -> str:
+        value = args.get(key)
+        return value.strip() if isinstance(value, str) else ("" if value is None else str(value).strip())
+
+    action.reason = field_value('reason')
+    if args.get('timeout') not in (None, ''):
+        try:
+            action.timeout = int(args['timeout'])
+        except (TypeError, ValueError):
+            action.diagnostics.append(f"Invalid timeout {args['timeout']!r} ignored.")
+
+    if kind == 'command':
+        action.raw_command = field_value('command')
+        action.command = clean_command(action.raw_command)
+    elif kind == 'write_file':
+        action.file_path = field_value('path')
+        # File content keeps its inner whitespace; only a Markdown fence is removed
+        action.file_content = clean_file_content(args.get('content') or '')
+        if not action.file_path:
+            action.diagnostics.append("write_file without a path.")
+            return action
+    elif kind == 'srch':
+        action.query = field_value('query').split('\n')[0].strip()
+    elif kind == 'report':
+        action.report = field_value('report')
+    else:
+        action.question = field_value('question')
+
+    action.kind = kind
+    return action
+
+
+def format_action_as_text(action: AgentAction) -> str:
+    """Renders an action with the text markers (raw response panel and history stay in one format)."""
+    lines = [f"REASON: {action.reason}"] if action.reason else []
+    if action.timeout is not None:
+        lines.append(f"TIMEOUT: {action.timeout}")
+    if action.kind == 'command':
+        lines.append(f"COMMAND: {action.raw_command}")
+    elif action.kind == 'write_file':
+        lines.append(f"WRITE_FILE: {action.file_path}\nCONTENT:\n{action.file_content}\nEND_CONTENT")
+    elif action.kind == 'srch':
+        lines.append(f"SRCH: {action.query}")
+    elif action.kind == 'report':
+        lines.append(f"REPORT: {action.report}")
+    elif action.kind == 'ask':
+        lines.append(f"ASK: {action.question}")
+    return "\n".join(lines)
+
+
+def parse_native_response(tool_calls: Optional[List[Dict]], text: str, allow_ask: bool = True) -> Tuple[AgentAction, str]:
+    """
+    Parses a native-protocol reply. Returns (action, text_for_logs).
+    Order: first tool call > JSON object in the text (Ollama JSON mode) > text markers.
+    """
+    if tool_calls:
+        call = tool_calls[0]
+        action = action_from_tool_call(call.get('name'), call.get('args'), allow_ask)
+        if len(tool_calls) > 1:
+            action.diagnostics.append(f"{len(tool_calls)} tool calls returned; using the first ({call.get('name')}).")
+        if action.kind:
+            return action, format_action_as_text(action)
+        diagnostics = action.diagnostics
+    else:
+        diagnostics = []
+
+    stripped = (text or '').strip()
+    if stripped.startswith('{'):
+        try:
+            data = json.loads(stripped)
+        except ValueError as e:
+            diagnostics.append(f"Invalid JSON reply: {e}")
+        else:
+            if isinstance(data, dict):
+                action = action_from_tool_call(data.get('action'), data, allow_ask)
+                if action.kind:
+                    return action, format_action_as_text(action)
+                diagnostics.extend(action.diagnostics)
+
+    action = parse_agent_response(stripped, allow_ask=allow_ask)
+    action.diagnostics[:0] = diagnostics + ["No usable tool call; parsed the text markers instead."]
+    return action, stripped
+
+
+# --- Bloc optional pentru testare / benchmark ---
+if __name__ == '__main__':
+    import timeit
+
+    CORPUS = [
+        "REASON: Check the OS version first.\nCOMMAND: uname -a",
+        "REASON: List the web root.\nTIMEOUT: 30\nCOMMAND: ls -la /var/www/html",
+        "REASON: Need disk usage.\nCOMMAND: ```bash\ndf -h\n```",
+        "REASON: Inspect nginx.\n**COMMAND:** `systemctl status nginx --no-pager`",
+        "REASON: Show config.\nCOMMAND: cat /etc/hosts\nOutput:\n127.0.0.1 localhost",
+        "REASON: Find the previous port value.\nSRCH: nginx listen port",
+        "REASON: The service is running and enabled.\nREPORT: nginx is installed and serving on port 80.",
+        "REASON: I need the DB password.\nASK: What is the PostgreSQL password?",
+        "REASON: Fix config.\nWRITE_FILE: /etc/app.conf\nCONTENT:\n```ini\n[main]\nREPORT: not an action\nport=8080\n```\nEND_CONTENT",
+        "REASON: Long running build.\nTIMEOUT: 600\nCOMMAND: make -j4 2>&1 | tail -n 50\nREASON: (duplicate)",
+        "REASON: " + "long explanation of the reasoning. " * 60 + "\nCOMMAND: journalctl -u nginx -n 100 --no-pager",
+    ]
+
+    for sample in CORPUS:
+        parsed = parse_agent_response(sample)
+        print(f"{parsed.kind:<10} cmd={parsed.command!r:.50} timeout={parsed.timeout} "
+              f"report={parsed.report!r:.30} diag={parsed.diagnostics}")
+
+    assert parse_agent_response("REASON: x\nCOMMAND: echo hi\nOutput: hi").command == "echo hi"
+    assert parse_agent_response("Goal TASK: y\nCOMMAND: ls").kind == 'command'
+    # upper() lengthens these; offsets must still match the original text
+    assert parse_agent_response("REASON: Die Straße prüfen, Größe messen …\nCOMMAND: ls -la /etc").command == "ls -la /etc"
+    ligature = parse_agent_response("REASON: check the ﬁle system ﬂags\nCOMMAND: df -h\nTIMEOUT: 30")
+    assert (ligature.command, ligature.timeout) == ("df -h", 30)
+    assert parse_agent_response("reason: Maße\nwrite_file: /tmp/a\ncontent:\nx\nend_content").kind == 'write_file'
+    assert parse_agent_response("REASON: r\nWRITE_FILE: /tmp/a\nCONTENT:\nREPORT: x\nEND_CONTENT").kind == 'write_file'
+    assert clean_command("** ## - ls -la") == "ls -la" and clean_command("-l") == "-l"
+    assert clean_command("**`ls -la`**") == "ls -la"
+
+    # Native protocol: tool call, Ollama JSON mode and text fallback
+    action, _ = parse_native_response([{'name': 'run_command', 'args': {'reason': 'r', 'command': '`df -h`', 'timeout': '30'}}], '')
+    assert (action.kind, action.command, action.timeout) == ('command', 'df -h', 30)
+    action, logged = parse_native_response(None, '{"action": "report", "reason": "ok", "report": "done"}')
+    assert action.kind == 'report' and logged == "REASON: ok\nREPORT: done"
+    action, _ = parse_native_response(None, "REASON: r\nCOMMAND: uptime")
+    assert action.command == 'uptime' and action.diagnostics
+    assert parse_native_response([{'name': 'ask_user', 'args': {'question': 'q'}}], '', allow_ask=False)[0].kind is None
+
+    def legacy_parse(response):
+        """The per-marker regex passes previously done in agent_task_runner (for comparison)."""
+        flags = re.DOTALL | re.IGNORECASE
+        re.search(r"REPORT:\s*(.*)", response, flags)
+        re.search(r"ASK:\s*(.*)", response, flags)
+        re.search(r"SRCH:\s*(.*)", response, flags)
+        command_match = re.search(r'COMMAND:\s*(.*?)(?=\n(?:REASON|TIMEOUT|REPORT|ASK|SRCH|WRITE_FILE|END_CONTENT)|$)', response, flags)
+        re.search(r'WRITE_FILE:\s*(.*?)\n.*?CONTENT:\s*\n(.*?)END_CONTENT', response, flags)
+        re.search(r"TIMEOUT:\s*(\d+)", response, re.IGNORECASE)
+        re.search(r"REASON:\s*(.*?)(?:COMMAND:|REPORT:|ASK:|SRCH:|WRITE_FILE:|$)", response, flags)
+        if command_match:
+            raw_cmd = command_match.group(1).strip()
+            for marker in ["Output:", "Result:", "Observation:"]:
+                if marker.lower() in raw_cmd.lower():
+                    raw_cmd = raw_cmd[:raw_cmd.lower().find(marker.lower())].strip()
+            lines = []
+            for line in raw_cmd.split('\n'):
+                if re.match(r'^(REASON|REPORT|ASK|SRCH|TIMEOUT|WRITE_FILE):', line.strip(), re.IGNORECASE):
+                    break
+                lines.append(line)
+            clean_command('\n'.join(lines))
+
+    runs = 2000
+    legacy = timeit.timeit(lambda: [legacy_parse(s) for s in CORPUS], number=runs)
+    single = timeit.timeit(lambda: [parse_agent_response(s) for s in CORPUS], number=runs)
+    per_reply = 1_000_000 / (runs * len(CORPUS))
+    print(f"\nlegacy regex passes: {legacy * per_reply:.1f} us/reply")
+    print(f"single-pass parser:  {single * per_reply:.1f} us/reply ({legacy / single:.1f}x)")
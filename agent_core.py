@@ -3,16 +3,24 @@ import traceback
 import time
 import eventlet
 from time import sleep # Folosim sleep direct
-from langchain_community.llms import Ollama
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_anthropic import ChatAnthropic
 from langchain_core.prompts import PromptTemplate
 from eventlet.timeout import Timeout
 
 # Importam functiile necesare din modulele separate
 from config import get_config
 from ssh_utils import execute_ssh_command, set_detected_os
-from log_manager import UnifiedLogManager
+from log_manager import UnifiedLogManager, new_task_id
+from tracing import TRACER, traced
+from llm_utils import invoke_llm, create_llm, bind_action_tools, response_text
+from action_parser import (
+    parse_agent_response, parse_native_response, clean_command, action_tools, native_instructions, ACTION_PROTOCOLS
+)
+import metrics
+from ollama_client import OllamaSession
+from snapshot_store import SNAPSHOT_STORE
+from task_checkpoint import TaskCheckpoint, steps_recorded_after
+from live_log import filter_log_lines
+from prompt_cache import AgentPromptCache, HISTORY_PLACEHOLDER, OLLAMA_KEEP_ALIVE, split_rendered_prompt, record_cache_usage
 
 # ---
 # --- Functii Helper pentru Logare ---
@@ -21,8 +29,9 @@ from log_manager import UnifiedLogManager
 def log_and_emit(socketio, global_state, message, clear=False):
     """Functie helper pentru a loga, emite prin socket si salva in stare."""
     print(message, flush=True) # Logam in consola serverului
-    global_state['last_session']['log'] += message + '\n' # Adaugam la log-ul complet
-    socketio.emit('agent_log', {'data': message, 'clear': clear})
+    global_state['live_log'].append(message) # Adaugam la log-ul live (ring buffer)
+    with TRACER.span('emit', cat='emit'):
+        socketio.emit('agent_log', {'data': message, 'clear': clear})
 
 class ThinkingIndicator:
     """Clasa pentru gestionarea indicatorului 'Thinking...' cu timer in-place."""
@@ -133,119 +142,17 @@ def parse_command_log(full_log):
     """Extrage doar liniile relevante (comenzi, pasi, etc.) pentru afisajul live."""
     if not isinstance(full_log, str):
         return "Invalid log data."
-        
-    filtered_lines = []
-    # Cuvinte cheie care indica o linie de afisat in log-ul filtrat
-    log_filter_keywords = [
-        '===', '---', 'STEP', 'COMMAND:', 'Executing Command:', 'REASON:', 
-        'REPORT:', 'ASK:', 'Validating command', 'Auto-Rejected', 
-        'Auto-Validated', 'Pager disabled', 'Intervention:', 'Human Response:',
-        'ERROR:', 'CRITICAL:', 'FATAL:', 'Exception:', 'Timeout:', 'Objective updated'
-    ]
-
-    for line in full_log.splitlines():
-        # Verificam daca linia incepe (dupa spatii) cu unul din cuvintele cheie
-        if any(line.strip().startswith(keyword) for keyword in log_filter_keywords):
-            filtered_lines.append(line)
-            
-    return "\n".join(filtered_lines)
+    return filter_log_lines(full_log)
 
-def clean_command_string(raw_command):
-    """
-    Cleans formatting artifacts from the LLM response.
-    Removes Markdown code blocks, inline backticks, and surrounding quotes.
-    """
-    if not raw_command:
-        return ""
-
-    cmd = raw_command.strip()
-
-    # 1. Remove Markdown Code Blocks (```bash ... ```)
-    # Regex looks for starting ``` (optional lang) and ending ```
-    # We handle multiline just in case, though commands should be single line per our prompt
-    if cmd.startswith("```"):
-        # Remove the first line (``` or ```bash)
-        cmd = re.sub(r"^```[a-zA-Z0-9]*\s*", "", cmd)
-        # Remove the last line (```) if present
-        if cmd.endswith("```"):
-            cmd = cmd[:-3]
-        cmd = cmd.strip()
-
-    # 2. Remove Inline Code (`...`)
-    # Only if the WHOLE string is wrapped in backticks
-    if cmd.startswith("`") and cmd.endswith("`") and len(cmd) > 2:
-        cmd = cmd[1:-1].strip()
-
-    # 3. Remove Surrounding Quotes ("..." or '...')
-    # Only if the WHOLE string is wrapped.
-    # Example: "ls -la" -> ls -la (Fixes LLM artifact)
-    # Example: grep "foo" bar -> grep "foo" bar (Touched nothing, which is correct)
-    if (cmd.startswith('"') and cmd.endswith('"')) and len(cmd) > 2:
-        cmd = cmd[1:-1].strip()
-    elif (cmd.startswith("'") and cmd.endswith("'")) and len(cmd) > 2:
-        cmd = cmd[1:-1].strip()
-
-    # 4. Remove leading markdown/decorative symbols that LLMs sometimes add
-    # These are NOT valid bash command prefixes and break execution
-    # Examples: **, ***, ##, ###, -, >, etc.
-    max_iterations = 10  # Safety limit to prevent infinite loops
-    iteration_count = 0
-
-    while cmd and iteration_count < max_iterations:
-        original_cmd = cmd
-        iteration_count += 1
-
-        # Pattern 1: Asterisks (markdown bold/italic: *, **, ***)
-        if cmd.startswith('***'):
-            cmd = cmd[3:].lstrip()
-        elif cmd.startswith('**'):
-            cmd = cmd[2:].lstrip()
-        elif cmd.startswith('*') and (len(cmd) == 1 or cmd[1] in (' ', '\t', '*')):
-            cmd = cmd[1:].lstrip()
-
-        # Pattern 2: Hash symbols (markdown headers: #, ##, ###, ####)
-        elif cmd.startswith('####'):
-            cmd = cmd[4:].lstrip()
-        elif cmd.startswith('###'):
-            cmd = cmd[3:].lstrip()
-        elif cmd.startswith('##'):
-            cmd = cmd[2:].lstrip()
-        elif cmd.startswith('#') and (len(cmd) == 1 or cmd[1] in (' ', '\t', '#')):
-            cmd = cmd[1:].lstrip()
-
-        # Pattern 3: Leading dash (markdown list: -, --)
-        # CAREFUL: Don't remove single - followed by letter (valid flag like -l)
-        elif cmd.startswith('--') and (len(cmd) == 2 or cmd[2] in (' ', '\t', '-')):
-            cmd = cmd[2:].lstrip()
-        elif cmd.startswith('-') and (len(cmd) == 1 or cmd[1] in (' ', '\t')):
-            cmd = cmd[1:].lstrip()
-
-        # Pattern 4: Leading greater-than (markdown quote: >, >>)
-        # CAREFUL: Don't remove redirection (e.g., > file.txt should be preserved if it's a full command)
-        elif cmd.startswith('>>') and (len(cmd) == 2 or cmd[2] in (' ', '\t', '>')):
-            cmd = cmd[2:].lstrip()
-        elif cmd.startswith('>') and (len(cmd) == 1 or cmd[1] in (' ', '\t', '>')):
-            cmd = cmd[1:].lstrip()
-
-        # Pattern 5: Underscore repeating (markdown separator: ___, __, _)
-        elif cmd.startswith('___'):
-            cmd = cmd[3:].lstrip()
-        elif cmd.startswith('__') and (len(cmd) == 2 or cmd[2] in (' ', '\t', '_')):
-            cmd = cmd[2:].lstrip()
-        elif cmd.startswith('_') and (len(cmd) == 1 or cmd[1] in (' ', '\t', '_')):
-            cmd = cmd[1:].lstrip()
-
-        # No more patterns matched - command is clean
-        if cmd == original_cmd:
-            break
-
-    return cmd.strip()
+# Command cleaning lives in action_parser (shared with the single-pass response parser)
+clean_command_string = clean_command
 
 # ---
 # --- Pure Accumulation Strategy: No Helper Functions Needed ---
 # ---
 # (All summarization is now handled directly by log_manager.py)
 
+@traced('summarize.history', cat='summarize')
 def summarize_history(socketio, global_state, force_summary=False):
     """
     PURE SUMMARIZATION:
@@ -286,13 +193,13 @@ def summarize_history(socketio, global_state, force_summary=False):
         llm = None
         if provider == 'ollama':
             api_url = cfg.get('Ollama', 'api_url', fallback='')
-            llm = Ollama(model=model_name, base_url=api_url, timeout=300)
+            llm = create_llm('ollama', model_name, base_url=api_url, timeout=300)
         elif provider == 'gemini':
             api_key = cfg.get('General', 'gemini_api_key', fallback='')
-            llm = ChatGoogleGenerativeAI(model=model_name, google_api_key=api_key, generation_config={"temperature": 0.5})
+            llm = create_llm('gemini', model_name, api_key=api_key, temperature=0.5)
         elif provider == 'anthropic':
             api_key = cfg.get('General', 'anthropic_api_key', fallback='')
-            llm = ChatAnthropic(model=model_name, api_key=api_key, temperature=0.5)
+            llm = create_llm('anthropic', model_name, api_key=api_key, temperature=0.5)
 
         if not llm:
              log_and_emit(socketio, global_state, f"{log_prefix} ERROR: LLM not configured.")
@@ -309,7 +216,7 @@ def summarize_history(socketio, global_state, force_summary=False):
         for i in range(3):
             try:
                 log_and_emit(socketio, global_state, f"{log_prefix} Generating summary (Attempt {i+1})...")
-                raw_summary = llm.invoke(prompt)
+                raw_summary = invoke_llm(llm, prompt, provider, 'summarizer')
                 if provider == 'gemini' and hasattr(raw_summary, 'content'):
                     summary = raw_summary.content
                 else:
@@ -334,8 +241,9 @@ def summarize_history(socketio, global_state, force_summary=False):
 
         # Update UI State
         new_context = log_manager.get_llm_context()
+        metrics.record_summarization('history', len(full_context_to_compress), len(new_context))
         global_state['agent_history'] = new_context
-        socketio.emit('update_history', {'data': new_context})
+        socketio.emit('update_history', {'chars': len(new_context)})
 
         log_and_emit(socketio, global_state, f"{log_prefix} COMPLETED. New context size: {len(new_context)} chars.")
 
@@ -361,6 +269,7 @@ def test_ssh_connectivity(socketio, global_state):
         log_and_emit(socketio, global_state, f"--- Connectivity Test: FAILED ({str(e)}) ---")
         return False
 
+@traced('ssh.execute', cat='ssh')
 def execute_ssh_command_with_timeout(socketio, global_state, command, timeout_seconds, max_retries=3):
     """
     Executa o comanda SSH cu timeout si retry logic.
@@ -372,6 +281,8 @@ def execute_ssh_command_with_timeout(socketio, global_state, command, timeout_se
     from eventlet.event import Event
 
     for attempt in range(1, max_retries + 1):
+        if attempt > 1:
+            metrics.SSH_RETRIES.inc()
         try:
             # Read current timeout from global_state (allows live updates during execution)
             current_timeout = global_state.get('command_timeout', timeout_seconds)
@@ -433,11 +344,13 @@ def execute_ssh_command_with_timeout(socketio, global_state, command, timeout_se
 
             # Return result if successful
             if execution_result['success']:
+                metrics.SSH_COMMAND_ATTEMPTS.inc(outcome='success')
                 return True, execution_result['data'], attempt
             else:
                 raise Exception(execution_result['data'])
 
         except EventletTimeout:
+            metrics.SSH_COMMAND_ATTEMPTS.inc(outcome='timeout')
             # Read actual timeout that was used
             actual_timeout = global_state.get('command_timeout', timeout_seconds)
             log_and_emit(socketio, global_state, f"--- TIMEOUT after {actual_timeout}s (attempt {attempt}/{max_retries}) ---")
@@ -464,6 +377,7 @@ def execute_ssh_command_with_timeout(socketio, global_state, command, timeout_se
                 return False, f"Error: Command timed out and connection was lost.", attempt
 
         except Exception as e:
+            metrics.SSH_COMMAND_ATTEMPTS.inc(outcome='error')
             # Check if this error is due to User Stop
             if not global_state.get('task_running', False):
                 log_and_emit(socketio, global_state, "--- Execution interrupted by User Stop. ---")
@@ -479,6 +393,7 @@ def execute_ssh_command_with_timeout(socketio, global_state, command, timeout_se
     # Should not reach here, but just in case
     return False, "Error: Unexpected execution flow.", max_retries
 
+@traced('detect.sudo', cat='ssh')
 def detect_sudo_capability(socketio, global_state):
     """
     Detecteaza daca utilizatorul curent poate folosi sudo fara parola.
@@ -514,6 +429,7 @@ def detect_sudo_capability(socketio, global_state):
         global_state['sudo_available'] = False
         return False
 
+@traced('validate', cat='llm')
 def validate_command_with_llm(socketio, global_state, command_to_validate, reason=""):
     """
     Verifica o comanda folosind un LLM (validator) pentru a preveni output-ul excesiv
@@ -544,20 +460,19 @@ def validate_command_with_llm(socketio, global_state, command_to_validate, reaso
             if not api_url:
                 log_and_emit(socketio, global_state, f"{log_prefix} ERROR: Ollama URL not configured.")
                 return False, "Validator Ollama URL not configured."
-            llm = Ollama(model=model_name, base_url=api_url, timeout=60)
+            llm = create_llm('ollama', model_name, base_url=api_url, timeout=60)
         elif provider == 'gemini':
             api_key = cfg.get('General', 'gemini_api_key', fallback='')
             if not api_key:
                 log_and_emit(socketio, global_state, f"{log_prefix} ERROR: Gemini API Key not configured.")
                 return False, "Validator Gemini API Key not configured."
-            llm = ChatGoogleGenerativeAI(model=model_name, google_api_key=api_key,
-                                         generation_config={"temperature": 0.0})
+            llm = create_llm('gemini', model_name, api_key=api_key, temperature=0.0)
         elif provider == 'anthropic':
             api_key = cfg.get('General', 'anthropic_api_key', fallback='')
             if not api_key:
                 log_and_emit(socketio, global_state, f"{log_prefix} ERROR: Anthropic API Key not configured.")
                 return False, "Validator Anthropic API Key not configured."
-            llm = ChatAnthropic(model=model_name, api_key=api_key, temperature=0.0)
+            llm = create_llm('anthropic', model_name, api_key=api_key, temperature=0.0)
         else:
             log_and_emit(socketio, global_state, f"{log_prefix} ERROR: Unknown LLM provider '{provider}'.")
             return False, "Unknown validator LLM provider."
@@ -591,7 +506,7 @@ def validate_command_with_llm(socketio, global_state, command_to_validate, reaso
                     log_and_emit(socketio, global_state, f"{log_prefix} Retry {attempt}/{max_retries}...")
                     sleep(1)  # Pauza scurta intre incercari
 
-                raw_response = llm.invoke(prompt)
+                raw_response = invoke_llm(llm, prompt, provider, 'validator')
 
                 # Extragem textul in functie de provider
                 response_text = ""
@@ -644,6 +559,7 @@ def validate_command_with_llm(socketio, global_state, command_to_validate, reaso
         return True, "Unexpected error in validator setup - command approved by default."
 
 
+@traced('summarize.output', cat='summarize')
 def summarize_single_output(output_text, llm, provider, socketio, global_state):
     """
     Compresses a single large command output using the LLM.
@@ -665,7 +581,7 @@ def summarize_single_output(output_text, llm, provider, socketio, global_state):
         # 3. Call LLM
         summary = ""
         try:
-            raw_summary = llm.invoke(prompt)
+            raw_summary = invoke_llm(llm, prompt, provider, 'summarizer')
             # Both Gemini and Anthropic use .content attribute
             if provider in ['gemini', 'anthropic'] and hasattr(raw_summary, 'content'):
                 summary = raw_summary.content
@@ -677,7 +593,9 @@ def summarize_single_output(output_text, llm, provider, socketio, global_state):
             return output_text[:1000] + "\n... [Output Truncated due to size] ...\n" + output_text[-1000:]
 
         if summary:
-            return f"[ Output too big, here is a summary of it : ]\n{summary.strip()}"
+            summary_text = f"[ Output too big, here is a summary of it : ]\n{summary.strip()}"
+            metrics.record_summarization('output', len(output_text), len(summary_text))
+            return summary_text
         else:
             return output_text[:2000] + "\n... [Output Truncated] ..."
 
@@ -686,11 +604,53 @@ def summarize_single_output(output_text, llm, provider, socketio, global_state):
         return output_text[:1000] + "\n... [Output Truncated] ..."
 
 
-def agent_task_runner(socketio, global_state, control_flags, event_objects, log_manager=None):
+def _restore_task_context(checkpoint, global_state, log_manager, log_agent):
+    """
+    Prepares the resume of an interrupted task. System info comes from the checkpoint and the
+    LLM context from disk, so no detection command is re-run. A command that was pending when
+    the process died is reported to the agent (never executed again).
+    Returns the step to continue from.
+    """
+    system = checkpoint.get('system', {})
+    global_state['system_os_info'] = system.get('os_info', global_state.get('system_os_info', ''))
+    global_state['sudo_available'] = system.get('sudo_available', False)
+    set_detected_os(system.get('detected_os', 'Unknown'))
+
+    context = log_manager.get_llm_context()
+    # Steps written to the context after the last checkpoint (crash before the next one) are kept
+    next_step = checkpoint.get('completed_step', 0) + 1 + steps_recorded_after(checkpoint, context)
+
+    note = None
+    pending = checkpoint.get('pending')
+    last_command = checkpoint.get('last_command')
+    if pending and pending['step'] >= next_step:
+        if pending['state'] == 'executing':
+            outcome = "was running when the controller stopped. Its outcome is unknown: verify the system state before repeating it."
+        else:
+            outcome = "was waiting for user approval when the controller stopped. It was NOT executed."
+        note = (pending['step'], pending.get('reason', ''), pending['command'], f"Interrupted: the command {outcome}")
+    elif last_command and last_command['step'] >= next_step:
+        note = (last_command['step'], '', last_command['command'],
+                f"Interrupted: the command finished with status '{last_command['status']}' but its output was not recorded.")
+    if note:
+        step, reason, command, output = note
+        log_manager.append_to_llm_context(f"\n\n--- STEP {step} ---\n\nREASON: {reason}\n\nCOMMAND: {command}\n\nOutput:\n{output}\n")
+        next_step = step + 1
+        log_agent(f"--- Step {step}: {output} ---")
+
+    log_manager.log_intervention("Task Resumed", f"Resuming '{checkpoint['objective']}' at step {next_step} after an interruption.")
+    global_state['agent_history'] = log_manager.get_llm_context()
+    log_agent(f"--- Resuming interrupted task at step {next_step} (no LLM call or command replayed) ---")
+    return next_step
+
+
+def agent_task_runner(socketio, global_state, control_flags, event_objects, log_manager=None, resume_checkpoint=None):
     """
     Thread-ul principal care ruleaza task-ul agentului.
     Primeste si modifica 'global_state' direct.
     Uses UnifiedLogManager for multi-log architecture.
+    resume_checkpoint: task checkpoint of an interrupted task (see task_checkpoint.py); the task
+    continues after its last completed step instead of starting over.
     """
 
     # Initialize log manager if not provided
@@ -716,113 +676,126 @@ def agent_task_runner(socketio, global_state, control_flags, event_objects, log_
         """Helper pentru a loga in contextul acestui task."""
         log_and_emit(socketio, global_state, message, clear)
 
+    # --- Tracing: un fisier de trace per task, span-uri etichetate cu task/step ---
+    task_id = resume_checkpoint['task_id'] if resume_checkpoint else new_task_id()
+    TRACER.start_task(task_id, current_objective)
+    checkpoint = None
+    task_failed = False
+
     try:
         # --- 1. Initializare LLM & Configurare ---
         log_agent(f"--- Agent task starting ---")
         log_agent(f"\n=== OBJECTIVE ===\n{current_objective}\n")
 
-        # IMPROVEMENT: Detectam sudo capability si initializam system info
-        detect_sudo_capability(socketio, global_state)
+        detected_os = "Unknown"
+        if resume_checkpoint is not None:
+            # Resume: system info and the LLM context come from the checkpoint and the logs on disk
+            step_counter = _restore_task_context(resume_checkpoint, global_state, log_manager, log_agent)
+            detected_os = resume_checkpoint['system'].get('detected_os', detected_os)
+        else:
+            # IMPROVEMENT: Detectam sudo capability si initializam system info
+            detect_sudo_capability(socketio, global_state)
 
-        # Detectam OS si user info
-        try:
-            # Try uname first (works on Unix/Linux/macOS)
-            os_result = execute_ssh_command("uname -s 2>/dev/null || ver")
-            user_result = execute_ssh_command("whoami")
-
-            # DEBUG: Log what we actually received
-            log_agent(f"[OS DETECTION DEBUG] os_result raw: '{os_result}'")
-            log_agent(f"[OS DETECTION DEBUG] user_result raw: '{user_result}'")
-
-            detected_os = "Unknown"
-            if "Linux" in os_result:
-                detected_os = "Linux"
-            elif "Darwin" in os_result:
-                detected_os = "macOS"
-            elif "Windows" in os_result or "Microsoft" in os_result or "Version" in os_result:
-                # Windows 'ver' command returns something like "Microsoft Windows [Version 10.0.xxxxx]"
-                detected_os = "Windows (or non-Unix)"
-            elif "Error" in os_result or not os_result.strip():
-                # If uname fails and ver also fails, try another Windows detection
-                log_agent("[OS DETECTION] First attempt failed, trying Windows-specific detection...")
-                win_test = execute_ssh_command("echo %OS%")
-                log_agent(f"[OS DETECTION DEBUG] win_test result: '{win_test}'")
-                if "Windows" in win_test:
+            # Detectam OS si user info
+            try:
+                # Try uname first (works on Unix/Linux/macOS)
+                with TRACER.span('detect.system', cat='ssh'):
+                    os_result = execute_ssh_command("uname -s 2>/dev/null || ver")
+                    user_result = execute_ssh_command("whoami")
+
+                # DEBUG: Log what we actually received
+                log_agent(f"[OS DETECTION DEBUG] os_result raw: '{os_result}'")
+                log_agent(f"[OS DETECTION DEBUG] user_result raw: '{user_result}'")
+
+                detected_os = "Unknown"
+                if "Linux" in os_result:
+                    detected_os = "Linux"
+                elif "Darwin" in os_result:
+                    detected_os = "macOS"
+                elif "Windows" in os_result or "Microsoft" in os_result or "Version" in os_result:
+                    # Windows 'ver' command returns something like "Microsoft Windows [Version 10.0.xxxxx]"
                     detected_os = "Windows (or non-Unix)"
-                else:
-                    detected_os = "Windows (or non-Unix)"  # Default to Windows if all else fails
+                elif "Error" in os_result or not os_result.strip():
+                    # If uname fails and ver also fails, try another Windows detection
+                    log_agent("[OS DETECTION] First attempt failed, trying Windows-specific detection...")
+                    win_test = execute_ssh_command("echo %OS%")
+                    log_agent(f"[OS DETECTION DEBUG] win_test result: '{win_test}'")
+                    if "Windows" in win_test:
+                        detected_os = "Windows (or non-Unix)"
+                    else:
+                        detected_os = "Windows (or non-Unix)"  # Default to Windows if all else fails
 
-            # Curatam user_result - luam ultima linie non-empty (pentru Windows care poate avea caractere ciudate)
-            if "Error" not in user_result:
-                user_lines = [line.strip() for line in user_result.split('\n') if line.strip()]
-                raw_user = user_lines[-1] if user_lines else "unknown"
+                # Curatam user_result - luam ultima linie non-empty (pentru Windows care poate avea caractere ciudate)
+                if "Error" not in user_result:
+                    user_lines = [line.strip() for line in user_result.split('\n') if line.strip()]
+                    raw_user = user_lines[-1] if user_lines else "unknown"
 
-                # Windows whoami returns "HOSTNAME\username" - extract only username
-                if '\\' in raw_user:
-                    detected_user = raw_user.split('\\')[-1]  # Take part after backslash
+                    # Windows whoami returns "HOSTNAME\username" - extract only username
+                    if '\\' in raw_user:
+                        detected_user = raw_user.split('\\')[-1]  # Take part after backslash
+                    else:
+                        detected_user = raw_user
                 else:
-                    detected_user = raw_user
-            else:
-                detected_user = "unknown"
+                    detected_user = "unknown"
 
-            sudo_status = "not applicable (Windows)" if detected_os == "Windows (or non-Unix)" else \
-                         ("available (passwordless)" if global_state.get('sudo_available', False) else "not available or requires password")
+                sudo_status = "not applicable (Windows)" if detected_os == "Windows (or non-Unix)" else \
+                             ("available (passwordless)" if global_state.get('sudo_available', False) else "not available or requires password")
 
-            # Actualizam system_os_info cu informatii complete
-            system_context = f"OS: {detected_os}, User: {detected_user}, Sudo: {sudo_status}"
-            global_state['system_os_info'] = system_context
+                # Actualizam system_os_info cu informatii complete
+                system_context = f"OS: {detected_os}, User: {detected_user}, Sudo: {sudo_status}"
+                global_state['system_os_info'] = system_context
 
-            # IMPORTANT: Communicate detected OS to ssh_utils for proper PTY handling
-            set_detected_os(detected_os)
+                # IMPORTANT: Communicate detected OS to ssh_utils for proper PTY handling
+                set_detected_os(detected_os)
 
-            # Update log manager with system info string prep
-            system_info_detailed = f"{detected_os}, user: {detected_user}, Sudo: {sudo_status}, IP: {global_state.get('system_ip', 'unknown')}"
+                # Update log manager with system info string prep
+                system_info_detailed = f"{detected_os}, user: {detected_user}, Sudo: {sudo_status}, IP: {global_state.get('system_ip', 'unknown')}"
 
-            # Log SSH connection at task start (establishes single source of truth for current connection)
-            # This ensures VM Screen always shows correct username@ip for this task
-            current_username = global_state.get('system_username', 'unknown')
-            current_ip = global_state.get('system_ip', 'unknown')
-            log_manager.log_ssh_connection_change(current_username, current_ip, '', '')
-            log_agent(f"Task started on: {current_username}@{current_ip}")
+                # Log SSH connection at task start (establishes single source of truth for current connection)
+                # This ensures VM Screen always shows correct username@ip for this task
+                current_username = global_state.get('system_username', 'unknown')
+                current_ip = global_state.get('system_ip', 'unknown')
+                log_manager.log_ssh_connection_change(current_username, current_ip, '', '')
+                log_agent(f"Task started on: {current_username}@{current_ip}")
 
-            # --- NEW: Always Auto-Summarize Previous History on Task Start ---
-            existing_context = log_manager.get_llm_context()
+                # --- NEW: Always Auto-Summarize Previous History on Task Start ---
+                existing_context = log_manager.get_llm_context()
 
-            # Read summarization threshold from config (needed for auto-summarization check)
-            cfg_threshold = get_config()
-            SUMMARIZATION_THRESHOLD = cfg_threshold.getint('Agent', 'summarization_threshold', fallback=15000)
+                # Read summarization threshold from config (needed for auto-summarization check)
+                cfg_threshold = get_config()
+                SUMMARIZATION_THRESHOLD = cfg_threshold.getint('Agent', 'summarization_threshold', fallback=15000)
 
-            # Check if history exists and is larger than 70% of threshold (User Preference)
-            # We ignore the default "No commands" message
-            summarization_threshold_70 = int(SUMMARIZATION_THRESHOLD * 0.7)
-            if existing_context and len(existing_context) > summarization_threshold_70 and "No commands have been executed yet" not in existing_context:
-                log_agent(f"--- Starting New Task: History size {len(existing_context)} chars > {summarization_threshold_70} (70% of {SUMMARIZATION_THRESHOLD}). Forcing summarization... ---")
+                # Check if history exists and is larger than 70% of threshold (User Preference)
+                # We ignore the default "No commands" message
+                summarization_threshold_70 = int(SUMMARIZATION_THRESHOLD * 0.7)
+                if existing_context and len(existing_context) > summarization_threshold_70 and "No commands have been executed yet" not in existing_context:
+                    log_agent(f"--- Starting New Task: History size {len(existing_context)} chars > {summarization_threshold_70} (70% of {SUMMARIZATION_THRESHOLD}). Forcing summarization... ---")
 
-                # Sync global state so summarizer sees the text
-                global_state['agent_history'] = existing_context
+                    # Sync global state so summarizer sees the text
+                    global_state['agent_history'] = existing_context
 
-                # Run summarization with FORCE flag enabled
-                # This ensures we switch to a clean summary format even if it slightly increases size
-                summarize_history(socketio, global_state, force_summary=True)
+                    # Run summarization with FORCE flag enabled
+                    # This ensures we switch to a clean summary format even if it slightly increases size
+                    summarize_history(socketio, global_state, force_summary=True)
 
-                log_agent("--- Previous history summarized. Initializing new task context... ---")
+                    log_agent("--- Previous history summarized. Initializing new task context... ---")
 
-            # Initialize the new task in log manager (Appends NEW TASK header)
-            log_manager.log_new_task(current_objective, system_info_detailed)
+                # Initialize the new task in log manager (Appends NEW TASK header)
+                log_manager.log_new_task(current_objective, system_info_detailed, task_id)
 
-            # --- MODIFICATION: Reconstruct memory from log manager ---
-            # Instead of manually building the string, we ask the log manager
-            # This ensures we are in sync with the disk log (SSOT)
-            # It also picks up any previous history if we are continuing
+                # --- MODIFICATION: Reconstruct memory from log manager ---
+                # Instead of manually building the string, we ask the log manager
+                # This ensures we are in sync with the disk log (SSOT)
+                # It also picks up any previous history if we are continuing
             
-            # Force a reload of the context from the file we just wrote to
-            global_state['agent_history'] = log_manager.get_llm_context()
+                # Force a reload of the context from the file we just wrote to
+                global_state['agent_history'] = log_manager.get_llm_context()
             
-            log_agent(f"System detected: {detected_os}, User: {detected_user}, Sudo: {sudo_status}")
+                log_agent(f"System detected: {detected_os}, User: {detected_user}, Sudo: {sudo_status}")
 
-        except Exception as detect_err:
-            log_agent(f"Warning: System detection failed: {detect_err}")
-            global_state['system_os_info'] = "Unknown OS (detection failed)"
+            except Exception as detect_err:
+                log_agent(f"Warning: System detection failed: {detect_err}")
+                global_state['system_os_info'] = "Unknown OS (detection failed)"
 
         cfg = get_config()
         PROVIDER = cfg.get('General', 'provider', fallback='')
@@ -848,26 +821,65 @@ def agent_task_runner(socketio, global_state, control_flags, event_objects, log_
             api_url = cfg.get('Ollama', 'api_url', fallback='')
             if not api_url:
                 raise ValueError("Ollama API URL missing in config.ini.")
-            llm = Ollama(model=MODEL_NAME, base_url=api_url, timeout=300) # Timeout 5 min
+            # Native /api/generate client reuses the KV context of the previous step (only new history is evaluated)
+            ollama_context_reuse = cfg.getboolean('Ollama', 'context_reuse', fallback=True)
+            ollama_num_ctx = cfg.getint('Ollama', 'num_ctx', fallback=0)
+            if ollama_context_reuse:
+                llm = OllamaSession(api_url, MODEL_NAME, timeout=300, keep_alive=OLLAMA_KEEP_ALIVE, num_ctx=ollama_num_ctx)
+            else:
+                llm = create_llm('ollama', MODEL_NAME, base_url=api_url, timeout=300, keep_alive=OLLAMA_KEEP_ALIVE) # Timeout 5 min
         elif PROVIDER == 'gemini':
             api_key = cfg.get('General', 'gemini_api_key', fallback='')
             if not api_key:
                 raise ValueError("Gemini API Key missing in config.ini.")
-            llm = ChatGoogleGenerativeAI(model=MODEL_NAME, google_api_key=api_key,
-                                         generation_config={"temperature": 0.5}) # Adaugam temperatura
+            llm = create_llm('gemini', MODEL_NAME, api_key=api_key, temperature=0.5) # Adaugam temperatura
         elif PROVIDER == 'anthropic':
             api_key = cfg.get('General', 'anthropic_api_key', fallback='')
             if not api_key:
                 raise ValueError("Anthropic API Key missing in config.ini.")
-            llm = ChatAnthropic(model=MODEL_NAME, api_key=api_key, temperature=0.5)
+            llm = create_llm('anthropic', MODEL_NAME, api_key=api_key, temperature=0.5)
         else:
             raise ValueError(f"Unsupported LLM: {PROVIDER}")
 
+        # Action protocol: 'text' (COMMAND:/REPORT:... markers) or 'native' (tool calls / Ollama JSON mode)
+        ACTION_PROTOCOL = cfg.get('Agent', 'action_protocol', fallback='text').strip().lower()
+        if ACTION_PROTOCOL not in ACTION_PROTOCOLS:
+            log_agent(f"--- Warning: Unknown action_protocol '{ACTION_PROTOCOL}'. Using text markers. ---")
+            ACTION_PROTOCOL = 'text'
+        native_llm = None
+        if ACTION_PROTOCOL == 'native':
+            if PROVIDER == 'ollama':
+                if ollama_context_reuse:
+                    native_llm = OllamaSession(api_url, MODEL_NAME, timeout=300, keep_alive=OLLAMA_KEEP_ALIVE, format='json', num_ctx=ollama_num_ctx)
+                else:
+                    native_llm = create_llm('ollama', MODEL_NAME, base_url=api_url, timeout=300, keep_alive=OLLAMA_KEEP_ALIVE, format='json')
+            else:
+                native_llm = bind_action_tools(llm, PROVIDER, action_tools(current_allow_ask_mode))
+            if native_llm is None:
+                log_agent(f"--- Native tool calling not available for {PROVIDER}. Using text markers. ---")
+        log_agent(f"Action Protocol: {'native' if native_llm is not None else 'text'}")
+
+        # Stable prompt prefix (head + append-only history) reused by the provider prompt cache
+        prompt_cache = AgentPromptCache(PROVIDER)
+
+        # Crash-safe task checkpoint (rewritten at every step boundary)
+        if resume_checkpoint is not None:
+            checkpoint = TaskCheckpoint.resume(resume_checkpoint)
+        else:
+            checkpoint = TaskCheckpoint.start(task_id, global_state, detected_os)
+            step_counter = 1
+
         # --- 2. Bucla Principala a Agentului ---
-        step_counter = 1
         while step_counter <= MAX_STEPS:
             # Reset per-step variables
             command_to_validate = None
+            TRACER.set_step(step_counter)
+            checkpoint.step_completed(step_counter - 1, global_state['agent_history'], log_manager)
+
+            # Incremental checkpoint of the previous step (only new log bytes are stored)
+            if step_counter > 1 and get_config().getboolean('System', 'snapshot_every_step', fallback=True):
+                with TRACER.span('snapshot', cat='log'):
+                    SNAPSHOT_STORE.checkpoint(global_state, label=f"step {step_counter - 1}")
 
             # --- A. Verificari de Control ---
             if not control_flags['is_running']():
@@ -919,7 +931,8 @@ def agent_task_runner(socketio, global_state, control_flags, event_objects, log_
                     })
 
                     try:
-                        summarization_event.wait()  # Wait for user response (summarize/continue)
+                        with TRACER.span('summarization.wait', cat='human'):
+                            summarization_event.wait()  # Wait for user response (summarize/continue)
                     except Exception as e:
                         log_agent(f"Summarization wait interrupted: {e}")
 
@@ -932,6 +945,7 @@ def agent_task_runner(socketio, global_state, control_flags, event_objects, log_
                     log_agent("--- Resuming after summarization choice. ---")
 
             # --- C. Pregatirea Prompt-ului ---
+            prompt_span = TRACER.begin('prompt.build')
             try:
                 # --- DYNAMIC PROMPT LOADING ---
                 # Re-read config to pick up live edits from Prompt Editor
@@ -954,9 +968,10 @@ def agent_task_runner(socketio, global_state, control_flags, event_objects, log_
 
                 # Extragem mereu cele mai noi date din starea globala
                 # Inject command_timeout so the agent knows the limit
+                # History is inserted by the prompt cache (head | history | tail layout)
                 format_args = {
                     'objective': global_state['current_objective'], # Folosim obiectivul actualizat
-                    'history': global_state['agent_history'],
+                    'history': HISTORY_PLACEHOLDER,
                     'system_info': global_state['system_os_info'],
                     'command_timeout': global_state.get('command_timeout', 120)
                 }
@@ -967,7 +982,10 @@ def agent_task_runner(socketio, global_state, control_flags, event_objects, log_
                 if missing_keys:
                     raise KeyError(f"Prompt template missing keys: {missing_keys}")
 
-                full_prompt = prompt_template_obj.format(**format_args)
+                prompt_head, prompt_tail = split_rendered_prompt(prompt_template_obj.format(**format_args))
+                if native_llm is not None:
+                    prompt_tail += native_instructions(PROVIDER == 'ollama', current_allow_ask_mode)
+                llm_input, full_prompt = prompt_cache.build(prompt_head, global_state['agent_history'], prompt_tail)
                 
             except KeyError as fmt_err:
                 log_agent(f"\n--- ERROR: Prompt format error (Missing Key: {fmt_err}). Check template. Stopping. ---")
@@ -977,6 +995,8 @@ def agent_task_runner(socketio, global_state, control_flags, event_objects, log_
                 traceback.print_exc()
                 break
 
+            TRACER.end(prompt_span, chars=len(full_prompt))
+
             # --- D. Apelarea LLM-ului (cu reincercari) ---
             retries = 0
             llm_response = ""
@@ -1004,55 +1024,54 @@ def agent_task_runner(socketio, global_state, control_flags, event_objects, log_
                     # Gemini limit: max 5 stop sequences
                     stop_sequences = ["Output:", "Observation:", "Result:", "\nOutput", "\nResult"]
 
+                    # The Ollama session continues from the previous step's KV context (head + history is the stable prefix)
+                    agent_llm = native_llm if native_llm is not None else llm
+                    session_kwargs = {'stable_prefix': prompt_head + global_state['agent_history']} if isinstance(agent_llm, OllamaSession) else {}
+
                     # Invoke LLM with stop sequences
-                    try:
-                        llm_response_obj = llm.invoke(full_prompt, stop=stop_sequences)
-                    except TypeError:
-                        # Fallback for models that don't accept 'stop' parameter
-                        llm_response_obj = llm.invoke(full_prompt)
+                    with TRACER.span('llm.invoke', cat='llm', provider=PROVIDER, model=MODEL_NAME, attempt=retries + 1):
+                        if native_llm is not None:
+                            # No stop sequences: they could cut tool arguments / JSON strings containing "Output:"
+                            llm_response_obj = invoke_llm(native_llm, llm_input, PROVIDER, 'agent', **session_kwargs)
+                        else:
+                            try:
+                                llm_response_obj = invoke_llm(llm, llm_input, PROVIDER, 'agent', stop=stop_sequences, **session_kwargs)
+                            except TypeError:
+                                # Fallback for models that don't accept 'stop' parameter
+                                llm_response_obj = invoke_llm(llm, llm_input, PROVIDER, 'agent', **session_kwargs)
 
                     # Oprim indicatorul de thinking
                     thinking.stop()
+                    record_cache_usage(PROVIDER, llm_response_obj)
 
-                    # Extragem textul
-                    if PROVIDER == 'gemini' and hasattr(llm_response_obj, 'content'):
-                        llm_response = llm_response_obj.content
-                    else:
-                        llm_response = str(llm_response_obj)
-
-                    llm_response = llm_response.strip()
+                    # Extragem textul (chat models return a message, Ollama a plain string)
+                    llm_response = response_text(llm_response_obj).strip()
+                    tool_calls = getattr(llm_response_obj, 'tool_calls', None) if native_llm is not None else None
 
-                    if not llm_response:
+                    if not llm_response and not tool_calls:
                         raise ValueError("Empty response from LLM.")
-                        
-                    # Salvam raspunsul brut
-                    global_state['last_session']['raw_llm_responses'].append(llm_response)
-                    raw_responses_formatted = "\n\n".join([f"--- Response {i+1} ---\n{r}" for i, r in enumerate(global_state['last_session']['raw_llm_responses'])])
-                    socketio.emit('update_raw_llm_responses', {'data': raw_responses_formatted})
 
                     # Cautam actiuni
-                    report_match = re.search(r"REPORT:\s*(.*)", llm_response, re.DOTALL | re.IGNORECASE)
-                    ask_match = None
-                    if current_allow_ask_mode:
-                        ask_match = re.search(r"ASK:\s*(.*)", llm_response, re.DOTALL | re.IGNORECASE)
-                    srch_match = re.search(r"SRCH:\s*(.*)", llm_response, re.DOTALL | re.IGNORECASE)
-                    # IMPROVED: Non-greedy regex that stops at reserved keywords to prevent TIMEOUT/REASON from being included in the command
-                    command_match = re.search(
-                        r'COMMAND:\s*(.*?)(?=\n(?:REASON|TIMEOUT|REPORT|ASK|SRCH|WRITE_FILE|END_CONTENT)|$)',
-                        llm_response,
-                        re.DOTALL | re.IGNORECASE
-                    )
-                    # IMPROVED: WRITE_FILE regex that skips any REASON/other text between path and CONTENT marker
-                    # Captures: (1) file path, (2) content strictly up to END_CONTENT
-                    write_match = re.search(
-                        r'WRITE_FILE:\s*(.*?)\n.*?CONTENT:\s*\n(.*?)END_CONTENT',
-                        llm_response,
-                        re.DOTALL | re.IGNORECASE
-                    )
-                    timeout_match = re.search(r"TIMEOUT:\s*(\d+)", llm_response, re.IGNORECASE)
+                    parse_span = TRACER.begin('parse', cat='agent')
+                    if native_llm is not None:
+                        # Tool call / JSON object first, text markers as fallback; llm_response becomes the marker rendering
+                        action, llm_response = parse_native_response(tool_calls, llm_response, allow_ask=current_allow_ask_mode)
+                    else:
+                        action = parse_agent_response(llm_response, allow_ask=current_allow_ask_mode)
+                    TRACER.end(parse_span)
+                    metrics.AGENT_ACTIONS_PARSED.inc(protocol=ACTION_PROTOCOL if native_llm is not None else 'text',
+                                                     outcome='action' if action.kind else 'none')
+
+                    # Salvam raspunsul brut
+                    global_state['last_session']['raw_llm_responses'].append(llm_response)
+                    # Only the new response is sent; the debug panel fetches older ones from /raw_llm_responses
+                    response_count = len(global_state['last_session']['raw_llm_responses'])
+                    socketio.emit('update_raw_llm_responses', {'append': f"--- Response {response_count} ---\n{llm_response}", 'count': response_count})
+                    for diagnostic in action.diagnostics:
+                        print(f"[PARSER] {diagnostic}")
 
                     # Updated check (timeout alone is not an action, but we parse it here)
-                    if report_match or ask_match or srch_match or command_match or write_match:
+                    if action.kind:
                         action_found = True
 
                         # --- PROCESS TIMEOUT ADJUSTMENT (Ephemeral) ---
@@ -1064,9 +1083,9 @@ def agent_task_runner(socketio, global_state, control_flags, event_objects, log_
                         # Initialize step_timeout with the user default
                         step_timeout = user_limit
 
-                        if timeout_match:
+                        if action.timeout is not None:
                             try:
-                                requested_timeout = int(timeout_match.group(1))
+                                requested_timeout = action.timeout
 
                                 # 2. Compare Requested vs User Limit
                                 if requested_timeout > user_limit:
@@ -1102,13 +1121,15 @@ def agent_task_runner(socketio, global_state, control_flags, event_objects, log_
                         if retries < 3:
                             # Attempts 1-2: Soft Nudge (Warning)
                             log_agent("--- Injecting system nudge to force response... ---")
-                            full_prompt += "\n\nSYSTEM ERROR: You returned an empty response. You MUST provide a valid COMMAND or REPORT now."
+                            prompt_tail += "\n\nSYSTEM ERROR: You returned an empty response. You MUST provide a valid COMMAND or REPORT now."
                         else:
                             # Attempts 3-5: Hard Nudge (Force Feed)
                             # We write the first line of the response FOR the agent.
                             # This forces the LLM to complete the pattern instead of starting from scratch.
                             log_agent("--- Nudge escalation: Forcing 'Format 1: Action' preamble... ---")
-                            full_prompt += "\n\nSYSTEM: Action required immediately.\nFormat 1: Action"
+                            prompt_tail += "\n\nSYSTEM: Action required immediately.\nFormat 1: Action"
+                        # Nudges go after the history, so the cached prefix stays valid
+                        llm_input, full_prompt = prompt_cache.build(prompt_head, global_state['agent_history'], prompt_tail)
 
                     traceback.print_exc()
                     sleep(retries * 2) # Asteptare exponentiala
@@ -1126,16 +1147,12 @@ def agent_task_runner(socketio, global_state, control_flags, event_objects, log_
             # --- E. Procesarea Actiunii LLM ---
             
             command_to_execute = None
-            reason_text = ""
-            
             # Extragem motivul (comun pentru toate actiunile)
-            reason_match = re.search(r"REASON:\s*(.*?)(?:COMMAND:|REPORT:|ASK:|SRCH:|WRITE_FILE:|$)", llm_response, re.DOTALL | re.IGNORECASE)
-            if reason_match:
-                reason_text = reason_match.group(1).strip()
+            reason_text = action.reason
             
             # --- CAZUL 1: REPORT (Task finalizat) ---
-            if report_match:
-                final_report_text = report_match.group(1).strip()
+            if action.kind == 'report':
+                final_report_text = action.report
                 report_log_message = f"--- REPORT ---\nREASON: {reason_text}\nREPORT: {final_report_text}"
                 log_agent(report_log_message)
 
@@ -1151,14 +1168,14 @@ def agent_task_runner(socketio, global_state, control_flags, event_objects, log_
 
                 # Sync global state from file to ensure consistency
                 global_state['agent_history'] = log_manager.get_llm_context()
-                socketio.emit('update_history', {'data': global_state['agent_history']})
+                socketio.emit('update_history', {'chars': len(global_state['agent_history'])})
 
                 log_agent("\n--- Task completed (REPORT received). ---")
                 break # Task terminat
 
             # --- CAZUL 2: ASK (Agentul intreaba) ---
-            elif ask_match and current_allow_ask_mode:
-                question = ask_match.group(1).strip()
+            elif action.kind == 'ask':
+                question = action.question
                 ask_log_message = f"--- AGENT ASKING ---\nREASON: {reason_text}\nASK: {question}"
                 log_agent(ask_log_message)
 
@@ -1219,13 +1236,13 @@ def agent_task_runner(socketio, global_state, control_flags, event_objects, log_
 
                 # Sync global state from file to ensure consistency
                 global_state['agent_history'] = log_manager.get_llm_context()
-                socketio.emit('update_history', {'data': global_state['agent_history']})
+                socketio.emit('update_history', {'chars': len(global_state['agent_history'])})
                 step_counter += 1
                 continue # Trecem la pasul urmator
 
             # --- CAZUL 3: SRCH (Agent searches base log) ---
-            elif srch_match:
-                search_query = srch_match.group(1).strip().split('\n')[0].strip()
+            elif action.kind == 'srch':
+                search_query = action.query
                 srch_log_message = f"--- AGENT SEARCHING ---\nREASON: {reason_text}\nSRCH: {search_query}"
                 log_agent(srch_log_message)
 
@@ -1264,26 +1281,17 @@ def agent_task_runner(socketio, global_state, control_flags, event_objects, log_
 
                 # Sync global state from file to ensure consistency
                 global_state['agent_history'] = log_manager.get_llm_context()
-                socketio.emit('update_history', {'data': global_state['agent_history']})
+                socketio.emit('update_history', {'chars': len(global_state['agent_history'])})
 
                 log_agent(f"Search results added to context. Continuing...")
                 step_counter += 1
                 continue # Continue to next step with enriched context
 
             # --- CAZUL 4: WRITE_FILE (Scriere sigura prin Base64) ---
-            elif write_match:
-                target_path = write_match.group(1).strip()
-                raw_content = write_match.group(2)
-
-                # --- Enhanced Cleaning Logic ---
-                # Remove Markdown code blocks (start and end)
-                # Handles ```bash, ```sh, ```python, or just ```
-                clean_content = re.sub(r"^```[a-zA-Z0-9]*\n", "", raw_content.strip())
-                if clean_content.endswith("```"):
-                    clean_content = clean_content[:-3]
-
-                # Strip any remaining leading/trailing whitespace
-                file_content = clean_content.strip()
+            elif action.kind == 'write_file':
+                # Path and content (Markdown fence already stripped) come from the parser
+                target_path = action.file_path
+                file_content = action.file_content
 
                 # Safety check: Ensure we don't have empty content
                 if not file_content:
@@ -1350,53 +1358,11 @@ def agent_task_runner(socketio, global_state, control_flags, event_objects, log_
                 # This ensures standard logging of Success/Exit Code 1.
 
             # --- CAZUL 5: COMMAND (Executie SSH) ---
-            elif command_match:
-                raw_cmd = command_match.group(1).strip()
-
-                # --- HALLUCINATION SANITIZATION FILTER ---
-                # If LLM generated "Output:" or similar markers, cut everything after
-                # Note: Using case-insensitive matching via lower() comparison
-                hallucination_markers = ["Output:", "Result:", "Observation:"]
-                for marker in hallucination_markers:
-                    # Case-insensitive check
-                    if marker.lower() in raw_cmd.lower():
-                        # Find the position and split
-                        marker_pos = raw_cmd.lower().find(marker.lower())
-                        raw_cmd = raw_cmd[:marker_pos].strip()
-                        print(f"[SANITIZATION] Filtered hallucinated output marker: {marker}")
-
-                # If command has multiple lines and contains output marker on subsequent lines
-                # Take only the first valid line
-                command_lines = raw_cmd.split('\n')
-                if len(command_lines) > 1:
-                    # Check if any line after the first contains output markers
-                    for i, line in enumerate(command_lines):
-                        for marker in hallucination_markers:
-                            # Case-insensitive check
-                            if marker.lower() in line.lower() and i > 0:  # Not the first line
-                                # Truncate to lines before the marker
-                                command_lines = command_lines[:i]
-                                raw_cmd = '\n'.join(command_lines).strip()
-                                print(f"[SANITIZATION] Filtered hallucinated output on line {i+1}")
-                                break
-
-                # Edge case: If command is empty after filtering (ex: COMMAND: Output:...)
-                if not raw_cmd:
-                    print("[SANITIZATION] Empty command after filtering hallucination. Injecting error message.")
-                    raw_cmd = "echo 'Error: LLM hallucinated output without command'"
-                # --- END HALLUCINATION SANITIZATION ---
-
-                # DEFENSIVE SANITIZATION: Line-by-line check to catch edge cases
-                # Stop at first line that starts with a reserved keyword
-                sanitized_lines = []
-                for line in raw_cmd.split('\n'):
-                    if re.match(r'^(REASON|REPORT|ASK|SRCH|TIMEOUT|WRITE_FILE):', line.strip(), re.IGNORECASE):
-                        break  # Stop processing at keyword
-                    sanitized_lines.append(line)
-                raw_cmd = '\n'.join(sanitized_lines).strip()
-
-                # Apply cleaning to remove Markdown/Quotes artifacts
-                command_to_execute = clean_command_string(raw_cmd)
+            elif action.kind == 'command':
+                # The parser already cut the command at hallucinated 'Output:' / 'Result:' / 'Observation:'
+                # markers and at reserved keywords starting a line, and cleaned Markdown/quote artifacts
+                raw_cmd = action.raw_command
+                command_to_execute = action.command
 
                 if not command_to_execute:
                     log_agent(f"--- WARNING: LLM provided an empty COMMAND. Retrying step. ---")
@@ -1439,6 +1405,7 @@ def agent_task_runner(socketio, global_state, control_flags, event_objects, log_
                 display_cmd = original_command_from_llm if "WRITE_FILE" in original_command_from_llm else command_to_execute
                 log_agent(f"\n--- Waiting for command approval ---\nREASON: {reason_text}\nCOMMAND: {display_cmd}")
                 log_agent("--- EXECUTION PAUSED ---")
+                checkpoint.pending(step_counter, display_cmd, reason_text, 'awaiting_approval')
 
                 # Curatam raspunsul anterior
                 user_response.clear()
@@ -1452,7 +1419,8 @@ def agent_task_runner(socketio, global_state, control_flags, event_objects, log_
 
                 # Asteptam aprobarea utilizatorului
                 try:
-                    user_approval_event.wait(timeout=3600) # Asteptam 1 ora
+                    with TRACER.span('approval.wait', cat='human'):
+                        user_approval_event.wait(timeout=3600) # Asteptam 1 ora
                 except Timeout:
                     log_agent("\n--- APPROVAL TIMEOUT (1h). Stopping. ---")
                     break
@@ -1482,10 +1450,13 @@ def agent_task_runner(socketio, global_state, control_flags, event_objects, log_
 
                     # Log validation result - approved by user in assisted mode
                     log_manager.log_validator_result(True, 'assisted')
+                    metrics.VALIDATOR_DECISIONS.inc(mode='assisted', decision='approved')
                 else:
                     rejection_reason = user_response.get('reason', 'No reason provided')
                     log_agent(f"--- Command rejected by user ---\nReason: {rejection_reason}")
                     log_manager.log_validator_result(False, 'assisted', rejection_reason)
+                    checkpoint.command_finished(step_counter, original_command_from_llm, 'rejected')
+                    metrics.VALIDATOR_DECISIONS.inc(mode='assisted', decision='rejected')
                     log_manager.log_step_end()
 
                     # CRITICAL: Update LLM context file
@@ -1494,7 +1465,7 @@ def agent_task_runner(socketio, global_state, control_flags, event_objects, log_
 
                     # Sync global state from file to ensure consistency
                     global_state['agent_history'] = log_manager.get_llm_context()
-                    socketio.emit('update_history', {'data': global_state['agent_history']})
+                    socketio.emit('update_history', {'chars': len(global_state['agent_history'])})
                     step_counter += 1
                     continue # Trecem la pasul urmator
 
@@ -1510,6 +1481,7 @@ def agent_task_runner(socketio, global_state, control_flags, event_objects, log_
 
                     # Log validation result to log_manager
                     log_manager.log_validator_result(is_valid, 'independent', validation_reason)
+                    metrics.VALIDATOR_DECISIONS.inc(mode='independent', decision='approved' if is_valid else 'rejected')
 
                     if is_valid:
                         log_agent("--- Command Auto-Validated. Proceeding... ---")
@@ -1518,6 +1490,7 @@ def agent_task_runner(socketio, global_state, control_flags, event_objects, log_
                         log_agent(f"--- Command Auto-Rejected by Validator ---")
                         log_agent(f"Reason: {validation_reason}")
                         log_manager.log_step_end()
+                        checkpoint.command_finished(step_counter, original_command_from_llm, 'rejected')
 
                         # Update LLM context file
                         history_entry = f"\n\n--- STEP {step_counter} ---\n\nREASON: {reason_text}\n\nCOMMAND: {original_command_from_llm}\n\nOutput:\nIntervention: Command auto-rejected by validator. Reason: {validation_reason}\n"
@@ -1525,7 +1498,7 @@ def agent_task_runner(socketio, global_state, control_flags, event_objects, log_
 
                         # Sync global state
                         global_state['agent_history'] = log_manager.get_llm_context()
-                        socketio.emit('update_history', {'data': global_state['agent_history']})
+                        socketio.emit('update_history', {'chars': len(global_state['agent_history'])})
                         step_counter += 1
                         continue
                 else:
@@ -1561,7 +1534,7 @@ def agent_task_runner(socketio, global_state, control_flags, event_objects, log_
                 # Emitem catre ecranul VM
                 vm_prompt = f"\n{global_state['system_username']}@{global_state['system_ip']}~# "
                 socketio.emit('vm_screen', {'data': vm_prompt + command_to_execute + '\n'})
-                global_state['persistent_vm_output'] += vm_prompt + command_to_execute + '\n'
+                global_state['persistent_vm_output'].append(vm_prompt + command_to_execute + '\n')
 
                 # IMPROVEMENT: Executam comanda cu timeout si retry
                 # Use the step-specific timeout calculated in parsing phase
@@ -1572,6 +1545,7 @@ def agent_task_runner(socketio, global_state, control_flags, event_objects, log_
                 # Note: We pass the specific timeout to the timer so the UI countdown is correct for this step
                 exec_timer = CommandExecutionTimer(socketio, global_state, command=command_to_execute, specific_timeout=final_timeout)
                 exec_timer.start()
+                checkpoint.pending(step_counter, display_cmd, reason_text, 'executing')
 
                 success, result, attempt_num = execute_ssh_command_with_timeout(
                     socketio, global_state, command_to_execute, final_timeout, max_retries=3
@@ -1585,9 +1559,11 @@ def agent_task_runner(socketio, global_state, control_flags, event_objects, log_
                     log_agent(f"     --- Command failed after {attempt_num} attempt(s). ---")
                 else:
                     log_agent(" .         --- Command Completed ---")
+                checkpoint.command_finished(step_counter, display_cmd, 'success' if success else 'failed')
 
                 # 1. Log RAW result to Full Log (Disk) - Audit trail must be complete
-                log_manager.log_command_execution(command_to_execute, result, success)
+                with TRACER.span('log.write', cat='log'):
+                    log_manager.log_command_execution(command_to_execute, result, success)
 
                 # 2. Process result for LLM Context (RAM)
                 context_result = result
@@ -1619,7 +1595,7 @@ def agent_task_runner(socketio, global_state, control_flags, event_objects, log_
 
                 # Emitem rezultatul (Raw to VM Screen for visibility, Summarized to History)
                 socketio.emit('vm_screen', {'data': result + '\n'})  # User sees full output
-                global_state['persistent_vm_output'] += result + '\n'
+                global_state['persistent_vm_output'].append(result + '\n')
 
                 # Actualizam istoricul agentului cu rezultatul PROCESAT
                 history_entry = f"\n\n--- STEP {step_counter} ---\n\nREASON: {reason_text}\n\nCOMMAND: {original_command_from_llm}\n\n"
@@ -1630,11 +1606,12 @@ def agent_task_runner(socketio, global_state, control_flags, event_objects, log_
                 history_entry += f"Output:\n{context_result}\n"
 
                 # CRITICAL: Update LLM context file
-                log_manager.append_to_llm_context(history_entry)
+                with TRACER.span('context.write', cat='log'):
+                    log_manager.append_to_llm_context(history_entry)
 
-                # Sync global state from file to ensure consistency
-                global_state['agent_history'] = log_manager.get_llm_context()
-                socketio.emit('update_history', {'data': global_state['agent_history']})
+                    # Sync global state from file to ensure consistency
+                    global_state['agent_history'] = log_manager.get_llm_context()
+                socketio.emit('update_history', {'chars': len(global_state['agent_history'])})
 
                 # Verificam daca sistemul de operare a fost identificat
                 if "Unknown. The first step" in global_state['system_os_info']:
@@ -1681,6 +1658,7 @@ def agent_task_runner(socketio, global_state, control_flags, event_objects, log_
             error_message = f"\n--- AGENT RUNNER FATAL ERROR ---\n{type(e).__name__}: {e}\n{traceback.format_exc()}\n--- TASK STOPPED ---"
             log_agent(error_message)
             global_state['last_session']['final_report'] = f"Task failed with error: {e}"
+            task_failed = True
             socketio.emit('final_report', {'data': f"Task failed with error: {e}"})
         
     finally:
@@ -1689,6 +1667,11 @@ def agent_task_runner(socketio, global_state, control_flags, event_objects, log_
 
         # Store log_manager reference in global_state for app.py to access
         global_state['log_manager'] = log_manager
+        TRACER.end_task()
+
+        # A failed task stays resumable; finished or stopped tasks drop their checkpoint
+        if checkpoint is not None:
+            checkpoint.finish('failed' if task_failed else 'completed')
 
         control_flags['set_running'](False)
         control_flags['set_paused'](False)
@@ -1718,6 +1701,7 @@ def process_chat_message(socketio, global_state, user_message):
 
         # 1. Select LLM (Use separate chat LLM if configured, otherwise use execution LLM)
         llm = global_state.get('chat_llm')
+        chat_provider = provider
 
         if llm is None:
             # Fallback to execution LLM if separate chat LLM not configured
@@ -1725,15 +1709,15 @@ def process_chat_message(socketio, global_state, user_message):
             if provider == 'ollama':
                 api_url = cfg.get('Ollama', 'api_url', fallback='')
                 print(f"[CHAT] Creating Ollama execution LLM: model={model_name}, url={api_url}", flush=True)
-                llm = Ollama(model=model_name, base_url=api_url, timeout=120)
+                llm = create_llm('ollama', model_name, base_url=api_url, timeout=120)
             elif provider == 'gemini':
                 api_key = cfg.get('General', 'gemini_api_key', fallback='')
                 print(f"[CHAT] Creating Gemini execution LLM: model={model_name}", flush=True)
-                llm = ChatGoogleGenerativeAI(model=model_name, google_api_key=api_key, generation_config={"temperature": 0.6})
+                llm = create_llm('gemini', model_name, api_key=api_key, temperature=0.6)
             elif provider == 'anthropic':
                 api_key = cfg.get('General', 'anthropic_api_key', fallback='')
                 print(f"[CHAT] Creating Anthropic execution LLM: model={model_name}", flush=True)
-                llm = ChatAnthropic(model=model_name, api_key=api_key, temperature=0.6)
+                llm = create_llm('anthropic', model_name, api_key=api_key, temperature=0.6)
         else:
             # Get the model name from the Chat LLM config
             chat_cfg = get_config()
@@ -1782,9 +1766,10 @@ def process_chat_message(socketio, global_state, user_message):
                 # Read message count from config (default 20)
                 chat_msg_count = int(cfg.get('Agent', 'chat_history_message_count', fallback='20'))
 
-                chat_messages = log_manager.get_chat_history()
+                # Tail read: only the last N+1 messages are needed
+                chat_messages = log_manager.get_chat_history(limit=chat_msg_count + 1)
                 # Get last N messages (excluding the current user message which was just added)
-                recent_messages = chat_messages[-(chat_msg_count+1):-1] if len(chat_messages) > 1 else []
+                recent_messages = chat_messages[:-1] if len(chat_messages) > 1 else []
 
                 if recent_messages:
                     formatted_messages = []
@@ -1819,10 +1804,10 @@ def process_chat_message(socketio, global_state, user_message):
 
             # Check if model supports 'stop' in invoke method (most LangChain models do)
             try:
-                response_obj = llm.invoke(full_prompt, stop=stop_sequences)
+                response_obj = invoke_llm(llm, full_prompt, chat_provider, 'chat', stop=stop_sequences)
             except TypeError:
                 # Fallback for models that don't accept 'stop' directly in invoke
-                response_obj = llm.invoke(full_prompt)
+                response_obj = invoke_llm(llm, full_prompt, chat_provider, 'chat')
 
             response_text = ""
             if hasattr(response_obj, 'content'):
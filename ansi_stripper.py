@@ -0,0 +1,153 @@
+import re
+
+# ===========================
+# === ANSI STRIPPER ===
+# ===========================
+# Removes ANSI escape sequences from SSH output and the conhost window-title artifacts of
+# Windows OpenSSH. The regexes are compiled once; AnsiStripper consumes the output in chunks
+# (sequences and CRLF pairs split across chunk boundaries are held back until complete) and
+# drops the conhost artifact lines in the same pass, so a multi-MB output is never copied
+# more than once per step. strip_ansi() gives the same result for a whole string.
+
+# OSC 0 (window title: ESC ] 0 ; title BEL | ESC \) first, then CSI (colors, cursor) and
+# the 2-character ESC sequences. One alternation = one scan of the text.
+ANSI_SEQUENCE_RE = re.compile(r'\x1B\]0;.*?(?:\x07|\x1B\\)|\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])', re.DOTALL)
+# A sequence that may still be completed by the next chunk (only searched near the end)
+PARTIAL_SEQUENCE_RE = re.compile(r'\x1B(?:\](?:0(?:;(?:(?!\x07|\x1B\\).)*\x1B?)?)?|\[[0-?]*[ -/]*)?\Z', re.DOTALL)
+# Line breaks other than \n recognised by str.splitlines() (\r\n is replaced before).
+# Detected with str 'in' (one fast scan per character); the regex only runs when one is present.
+OTHER_LINE_BREAKS = '\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029'
+OTHER_LINE_BREAKS_RE = re.compile(f'[{OTHER_LINE_BREAKS}]')
+# Orphaned window title left when a sequence was cut: '0;C:\\WINDOWS\\system32\\conhost.exe'.
+# The pattern starts with the literal '0;' (fast prefix scan); the whole line is dropped only
+# when nothing but whitespace precedes it on its line.
+CONHOST_ARTIFACT_RE = re.compile(r'0;[^\n]*(?:conhost\.exe|:\\)[^\n]*(?:\n|\Z)')
+
+MAX_SEQUENCE_CHARS = 4096       # Longer unterminated OSC titles are not waited for
+MAX_LINE_CHARS = 64 * 1024      # Longer lines are passed on without waiting for their end
+
+
+class AnsiStripper:
+    """Incremental stripper: feed() chunks, then flush() once at the end."""
+
+    def __init__(self):
+        self._raw = ""      # Possibly incomplete escape sequence at the end of the last chunk
+        self._line = ""     # Cleaned text of the current (unfinished) line
+
+    def feed(self, chunk: str, final: bool = False) -> str:
+        """Returns the cleaned text of the lines completed by this chunk (with their '\\n')."""
+        text = self._raw + chunk if self._raw else chunk
+        self._raw = ""
+        if not final and '\x1B' in text[-MAX_SEQUENCE_CHARS:]:
+            partial = PARTIAL_SEQUENCE_RE.search(text, max(0, len(text) - MAX_SEQUENCE_CHARS))
+            if partial:
+                text, self._raw = text[:partial.start()], text[partial.start():]
+        if '\x1B' in text:
+            text = ANSI_SEQUENCE_RE.sub('', text)
+
+        data = self._line + text if self._line else text
+        held_cr = not final and data.endswith('\r')
+        if held_cr:
+            data = data[:-1]      # May be the first half of a CRLF split across chunks
+        if '\r' in data:
+            data = data.replace('\r\n', '\n')
+        if any(char in data for char in OTHER_LINE_BREAKS):
+            data = OTHER_LINE_BREAKS_RE.sub('\n', data)
+
+        if final:
+            complete, self._line = data, ""
+        else:
+            end = data.rfind('\n') + 1
+            complete, self._line = data[:end], data[end:]
+            if len(self._line) > MAX_LINE_CHARS:
+                complete, self._line = data, ""
+            if held_cr:
+                self._line += '\r'
+        if '0;' in complete:
+            complete = _drop_conhost_artifacts(complete)
+        return complete
+
+    def flush(self) -> str:
+        """Cleans whatever is left (an unterminated sequence is stripped as far as it matches)."""
+        return self.feed("", final=True)
+
+
+def _drop_conhost_artifacts(text: str) -> str:
+    parts, last = [], 0
+    for match in CONHOST_ARTIFACT_RE.finditer(text):
+        line_start = text.rfind('\n', 0, match.start()) + 1
+        indent = text[line_start:match.start()]
+        if not indent or indent.isspace():
+            parts.append(text[last:line_start])
+            last = match.end()
+    if not parts:
+        return text
+    parts.append(text[last:])
+    return "".join(parts)
+
+
+def strip_ansi(text: str) -> str:
+    """
+    Whole-string form (same result as joining the lines of str.splitlines() with '\\n'
+    after removing the sequences and the conhost artifact lines).
+    """
+    if not text:
+        return ""
+    # One final pass: no partial-sequence check and no held-back line to copy
+    result = AnsiStripper().feed(text, final=True)
+    return result[:-1] if result.endswith('\n') else result
+
+
+# --- Bloc optional pentru testare ---
+if __name__ == '__main__':
+    import time
+    import tracemalloc
+
+    def _reference(text):
+        """Implementarea anterioara din ssh_utils (doua regex-uri + splitlines)."""
+        text = re.compile(r'\x1B\]0;.*?(?:\x07|\x1B\\)', re.DOTALL).sub('', text)
+        text = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])').sub('', text)
+        lines = [line for line in text.splitlines()
+                 if not (line.strip().startswith("0;") and ("conhost.exe" in line.strip() or ":\\" in line.strip()))]
+        return '\n'.join(lines)
+
+    def _chunked(text, size):
+        stripper = AnsiStripper()
+        parts = [stripper.feed(text[i:i + size]) for i in range(0, len(text), size)]
+        result = "".join(parts) + stripper.flush()
+        return result[:-1] if result.endswith('\n') else result
+
+    def _measure(function, *args):
+        # Timed without tracemalloc (its per-allocation hook would dominate), peak in a second run
+        start = time.perf_counter()
+        result = function(*args)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        tracemalloc.start()
+        function(*args)
+        peak_mb = tracemalloc.get_traced_memory()[1] / 1e6
+        tracemalloc.stop()
+        return result, elapsed_ms, peak_mb
+
+    linux = "".join(f"\x1b[01;34mdir_{i}\x1b[0m  \x1b[01;32mrun_{i}.sh\x1b[0m  file_{i}.txt\r\n" for i in range(200000))
+    windows = "".join(
+        (f"\x1b]0;C:\\WINDOWS\\system32\\conhost.exe\x07\x1b[?25l\x1b[2J\x1b[H" if i % 50 == 0 else "")
+        + f"{i:>6} C:\\Users\\admin\\file_{i}.log  \x1b[32mOK\x1b[m\r\n"
+        + ("0;C:\\WINDOWS\\system32\\conhost.exe\r\n" if i % 777 == 0 else "")
+        for i in range(200000))
+
+    for name, capture in (('linux pty', linux), ('windows conhost', windows)):
+        expected, reference_ms, reference_mb = _measure(_reference, capture)
+        result, whole_ms, whole_mb = _measure(strip_ansi, capture)
+        chunked, chunked_ms, chunked_mb = _measure(_chunked, capture, 32768)
+        assert result == expected and chunked == expected, name
+        for size in (1, 2, 3, 7, 4093):     # Sequences and CRLF pairs split at every boundary
+            sample = capture[:20000]
+            assert _chunked(sample, size) == _reference(sample), (name, size)
+        # Peak = extra memory on top of the capture (the chunked result is still joined here)
+        print(f"{name}: {len(capture) / 1e6:.1f} MB  reference {reference_ms:.0f} ms / {reference_mb:.0f} MB peak  "
+              f"strip_ansi {whole_ms:.0f} ms / {whole_mb:.0f} MB  32 KB chunks {chunked_ms:.0f} ms / {chunked_mb:.0f} MB")
+
+    assert strip_ansi("a\x1b]0;title\nline\x07b\r\n\r\n") == "ab\n"
+    edge = "x 0;C:\\a\n \t0;C:\\WINDOWS\\conhost.exe\n0;no\n0;D:\\y 0;C:\\z"
+    assert strip_ansi(edge) == _reference(edge) == "x 0;C:\\a\n0;no", strip_ansi(edge)
+    print("ANSI stripper checks passed.")
@@ -1,5 +1,8 @@
 # --- Importuri Python Standard & Pachete ---
 # Note: Eventlet removed for PyInstaller compatibility. Flask-SocketIO will use simple-websocket instead.
+import time
+STARTUP_STARTED_AT = time.time()  # Reference point for the startup-time report
+
 import os
 import re
 import zipfile
@@ -17,25 +20,40 @@ from flask_socketio import SocketIO
 # --- Importurile Noilor Module Refactorizate ---
 from config import (
     get_config, KEYS_DIR, CONFIG_FILE_PATH,
-    SESSION_FILE_PATH, CONNECTIONS_FILE_PATH, EXECUTION_LOG_FILE_PATH,
+    SESSION_FILE_PATH, CONNECTIONS_FILE_PATH, EXECUTION_LOG_FILE_PATH, EXECUTION_LOG_SEGMENTS_DIR,
+    EXECUTION_LOG_LLM_CONTEXT_PATH, CHAT_LOG_FILE_PATH, ACTION_PLAN_FILE_PATH,
     APP_DIR
 )
 import ssh_utils
 import llm_utils
+from llm_utils import create_llm
+import health
+from model_catalog import MODEL_CATALOG
+from fleet_scanner import FLEET_SCANNER
+from snapshot_store import SNAPSHOT_STORE
 import session_manager
+import task_checkpoint
+import output_capture
+from live_log import LiveLog, VmOutputStore, DEFAULT_PAGE_SIZE
+from event_bus import EventBus
+from http_transport import init_compression, versioned_view
+from tracing import TRACER
+import metrics
 import agent_core
 
 # --- Importuri LangChain (Added for Search Summarization) ---
-from langchain_community.llms import Ollama
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_anthropic import ChatAnthropic
+# Provider classes are imported lazily through llm_utils.create_llm()
 from langchain_core.prompts import PromptTemplate
 
 # --- Initializam Aplicatia si WebSocket-ul ---
 app = Flask(__name__, template_folder='templates')
+# gzip/br for the large JSON views (the WebSocket negotiates permessage-deflate on its own)
+init_compression(app)
 # Let Flask-SocketIO auto-detect best async_mode for PyInstaller
 # Note: eventlet not working in PyInstaller, will fallback to threading
 socketio = SocketIO(app, cors_allowed_origins="*")
+# Agent-side emits go through the event bus (coalescing, batching, per-client backpressure)
+EVENT_BUS = EventBus(socketio)
 
 # ---
 # --- STAREA GLOBALA A APLICATIEI ---
@@ -46,10 +64,11 @@ socketio = SocketIO(app, cors_allowed_origins="*")
 GLOBAL_STATE = {
     "agent_history": "No commands have been executed yet.",
     "system_os_info": "Unknown. The first step should be to determine the OS.",
-    "persistent_vm_output": "",
+    "persistent_vm_output": VmOutputStore(),
     "full_history_backups": [],
+    # Log-ul live (Execution Log): ring buffer limitat in memorie, istoricul complet e pe disc
+    "live_log": LiveLog.from_text("Application started. Ready for task."),
     "last_session": {
-        "log": "Application started. Ready for task.",
         "vm_output": "", # Acesta nu mai este folosit, 'persistent_vm_output' a preluat rolul
         "final_report": "",
         "raw_llm_responses": []
@@ -103,14 +122,15 @@ def setattr_safe(key, val):
 # --- Functii Helper ---
 # ---
 
-def save_app_state():
-    """Salveaza starea aplicatiei pe disc."""
+def save_app_state(label: str = "save"):
+    """Salveaza starea aplicatiei pe disc (session.json + incremental snapshot)."""
     session_manager.save_current_session_to_disk(GLOBAL_STATE, SESSION_FILE_PATH, EXECUTION_LOG_FILE_PATH)
+    SNAPSHOT_STORE.checkpoint(GLOBAL_STATE, label=label)
 
 def load_app_state():
     """Incarca starea aplicatiei de pe disc."""
     global GLOBAL_STATE
-    loaded_state = session_manager.load_session_from_disk(SESSION_FILE_PATH, EXECUTION_LOG_FILE_PATH)
+    loaded_state = session_manager.load_session_from_disk(SESSION_FILE_PATH, EXECUTION_LOG_SEGMENTS_DIR)
     GLOBAL_STATE.update(loaded_state)
 
 def perform_unified_search(query: str, reason: str = "General inquiry", summarize: bool = True) -> dict:
@@ -151,13 +171,13 @@ def perform_unified_search(query: str, reason: str = "General inquiry", summariz
                 # Initialize LLM for summarization
                 if provider == 'ollama':
                     api_url = cfg.get('Ollama', 'api_url', fallback='')
-                    llm = Ollama(model=model_name, base_url=api_url, timeout=60)
+                    llm = create_llm('ollama', model_name, base_url=api_url, timeout=60)
                 elif provider == 'gemini':
                     api_key = cfg.get('General', 'gemini_api_key', fallback='')
-                    llm = ChatGoogleGenerativeAI(model=model_name, google_api_key=api_key, generation_config={"temperature": 0.5})
+                    llm = create_llm('gemini', model_name, api_key=api_key, temperature=0.5)
                 elif provider == 'anthropic':
                     api_key = cfg.get('General', 'anthropic_api_key', fallback='')
-                    llm = ChatAnthropic(model=model_name, api_key=api_key, temperature=0.5)
+                    llm = create_llm('anthropic', model_name, api_key=api_key, temperature=0.5)
 
                 # --- UPDATED PROMPT LOGIC ---
                 # Try to get the specific Search prompt first, fallback to generic Summarize
@@ -197,7 +217,7 @@ def perform_unified_search(query: str, reason: str = "General inquiry", summariz
                 prompt = PromptTemplate.from_template(prompt_template_str).format(**format_args)
 
                 # Call LLM
-                summarized_result = llm.invoke(prompt)
+                summarized_result = llm_utils.invoke_llm(llm, prompt, provider, 'search')
                 # Both Gemini and Anthropic use .content attribute
                 if provider in ['gemini', 'anthropic'] and hasattr(summarized_result, 'content'):
                     results_summarized = summarized_result.content
@@ -205,6 +225,7 @@ def perform_unified_search(query: str, reason: str = "General inquiry", summariz
                     results_summarized = str(summarized_result)
 
                 was_summarized = True
+                metrics.record_summarization('search', size, len(results_summarized))
 
         except Exception as e:
             print(f"Error summarizing search results ({type(e).__name__}): {e}")
@@ -239,154 +260,30 @@ def initialize_log_system():
         print(f"Error initializing log system: {e}")
         traceback.print_exc()
 
+def _on_health_change(kind, status):
+    """Keeps GLOBAL_STATE in sync with the health checker and pushes the change to clients."""
+    GLOBAL_STATE[f'{kind}_connection_status'] = status
+    socketio.emit(f'{kind}_status_update', status)
+
+# Model lists are revalidated in Socket.IO background tasks
+MODEL_CATALOG.spawn = socketio.start_background_task
+
+# Concurrent SSH/LLM probes with deadlines and a TTL cache (see health.py)
+HEALTH = health.HealthChecker(on_change=_on_health_change, spawn=socketio.start_background_task)
+
 def initialize_ssh_status():
     """Actualizeaza statusul conexiunii SSH in GLOBAL_STATE."""
-    global GLOBAL_STATE
-    
-    # Citim configuratia
-    cfg = get_config()
-    ip = cfg.get('System', 'ip_address', fallback='').strip()
-    username = cfg.get('System', 'username', fallback='').strip()
-    
-    if not ip or not username:
-        GLOBAL_STATE['ssh_connection_status'] = {
-            "status": "failure",
-            "message": "System IP or Username not configured."
-        }
-        return
-    
-    # Verificam conectivitatea
-    is_reachable, ping_msg = ssh_utils.check_host_availability(ip)
-    if not is_reachable:
-        GLOBAL_STATE['ssh_connection_status'] = {
-            "status": "failure",
-            "message": f"Cannot reach {ip}."
-        }
-        return
-    
-    # Verificam conexiunea SSH
-    is_connected, ssh_msg = ssh_utils.check_ssh_connection()
-    if is_connected:
-        GLOBAL_STATE['ssh_connection_status'] = {
-            "status": "success",
-            "message": f"Connected to {username}@{ip}."
-        }
-    else:
-        GLOBAL_STATE['ssh_connection_status'] = {
-            "status": "failure",
-            "message": f"SSH failed: {ssh_msg}"
-        }
+    GLOBAL_STATE['ssh_connection_status'] = HEALTH.check_ssh(force=True)
 
 def initialize_llm_status():
-    """Actualizeaza statusul conexiunii LLM in GLOBAL_STATE."""
+    """Actualizeaza statusul conexiunii LLM in GLOBAL_STATE si reinitializeaza Chat LLM-ul."""
+    GLOBAL_STATE['llm_connection_status'] = HEALTH.check_llm(force=True)
+    initialize_chat_llm()
+
+def initialize_chat_llm():
+    """Creates the separate Chat LLM client when [ChatLLM] is enabled."""
     global GLOBAL_STATE
     cfg = get_config()
-    provider = cfg.get('General', 'provider', fallback='').strip()
-    model_name = cfg.get('Agent', 'model_name', fallback='').strip()
-    
-    if not provider:
-        GLOBAL_STATE['llm_connection_status'] = {
-            "status": "failure",
-            "message": "Provider not configured."
-        }
-        return
-    
-    if not model_name:
-        GLOBAL_STATE['llm_connection_status'] = {
-            "status": "failure",
-            "message": "Model not selected."
-        }
-        return
-    
-    # Verificam conexiunea in functie de provider
-    if provider == 'ollama':
-        api_url = cfg.get('Ollama', 'api_url', fallback='').strip()
-        if not api_url:
-            GLOBAL_STATE['llm_connection_status'] = {
-                "status": "failure",
-                "message": "Ollama URL not configured."
-            }
-            return
-            
-        is_connected, msg, models = llm_utils.check_ollama_connection(api_url)
-        if is_connected:
-            if model_name in models:
-                GLOBAL_STATE['llm_connection_status'] = {
-                    "status": "success",
-                    "message": f"Ollama: {model_name} ready."
-                }
-            else:
-                GLOBAL_STATE['llm_connection_status'] = {
-                    "status": "failure",
-                    "message": f"Model {model_name} not found in Ollama."
-                }
-        else:
-            GLOBAL_STATE['llm_connection_status'] = {
-                "status": "failure",
-                "message": msg
-            }
-    
-    elif provider == 'gemini':
-        api_key = cfg.get('General', 'gemini_api_key', fallback='').strip()
-        if not api_key:
-            GLOBAL_STATE['llm_connection_status'] = {
-                "status": "failure",
-                "message": "Gemini API Key not configured."
-            }
-            return
-
-        is_connected, msg, models = llm_utils.check_gemini_connection(api_key)
-        if is_connected:
-            # Pentru Gemini, verificam daca modelul exista
-            if any(model_name in m for m in models):
-                GLOBAL_STATE['llm_connection_status'] = {
-                    "status": "success",
-                    "message": f"Gemini: {model_name} ready."
-                }
-            else:
-                GLOBAL_STATE['llm_connection_status'] = {
-                    "status": "failure",
-                    "message": f"Model {model_name} not available."
-                }
-        else:
-            GLOBAL_STATE['llm_connection_status'] = {
-                "status": "failure",
-                "message": msg
-            }
-
-    elif provider == 'anthropic':
-        api_key = cfg.get('General', 'anthropic_api_key', fallback='').strip()
-        if not api_key:
-            GLOBAL_STATE['llm_connection_status'] = {
-                "status": "failure",
-                "message": "Anthropic API Key not configured."
-            }
-            return
-
-        is_connected, msg, models = llm_utils.check_anthropic_connection(api_key)
-        if is_connected:
-            # Pentru Anthropic, verificam daca modelul exista
-            if model_name in models:
-                GLOBAL_STATE['llm_connection_status'] = {
-                    "status": "success",
-                    "message": f"Anthropic: {model_name} ready."
-                }
-            else:
-                GLOBAL_STATE['llm_connection_status'] = {
-                    "status": "failure",
-                    "message": f"Model {model_name} not available."
-                }
-        else:
-            GLOBAL_STATE['llm_connection_status'] = {
-                "status": "failure",
-                "message": msg
-            }
-
-    else:
-        GLOBAL_STATE['llm_connection_status'] = {
-            "status": "failure",
-            "message": f"Unknown provider: {provider}"
-        }
 
     # Initialize Chat LLM (separate from execution LLM)
     use_separate_chat_llm = cfg.getboolean('ChatLLM', 'enabled', fallback=False)
@@ -413,25 +310,22 @@ def initialize_llm_status():
         try:
             # Initialize chat LLM
             if chat_provider == 'ollama':
-                from langchain_community.llms import Ollama
                 print(f"[CHAT LLM INIT] Creating Ollama instance: model={chat_model}, url={ollama_url}", flush=True)
-                GLOBAL_STATE['chat_llm'] = Ollama(model=chat_model, base_url=ollama_url, timeout=120)
+                GLOBAL_STATE['chat_llm'] = create_llm('ollama', chat_model, base_url=ollama_url, timeout=120)
                 print(f"[CHAT LLM INIT] ✓ Chat LLM initialized: Ollama ({chat_model}) on {ollama_url}", flush=True)
             elif chat_provider == 'gemini':
-                from langchain_google_genai import ChatGoogleGenerativeAI
                 print(f"[CHAT LLM INIT] Creating Gemini instance: model={chat_model}", flush=True)
-                GLOBAL_STATE['chat_llm'] = ChatGoogleGenerativeAI(
-                    model=chat_model,
-                    google_api_key=chat_api_key,
-                    generation_config={"temperature": 0.6},
+                GLOBAL_STATE['chat_llm'] = create_llm(
+                    'gemini', chat_model,
+                    api_key=chat_api_key,
+                    temperature=0.6,
                     convert_system_message_to_human=True
                 )
                 print(f"[CHAT LLM INIT] ✓ Chat LLM initialized: Gemini ({chat_model})", flush=True)
             elif chat_provider == 'anthropic':
-                from langchain_anthropic import ChatAnthropic
                 print(f"[CHAT LLM INIT] Creating Anthropic instance: model={chat_model}", flush=True)
-                GLOBAL_STATE['chat_llm'] = ChatAnthropic(
-                    model=chat_model,
+                GLOBAL_STATE['chat_llm'] = create_llm(
+                    'anthropic', chat_model,
                     api_key=chat_api_key,
                     temperature=0.6
                 )
@@ -492,6 +386,7 @@ def get_agent_config():
         'summarization_threshold': cfg.getint('Agent', 'summarization_threshold', fallback=15000),
         'llm_timeout': cfg.getint('Agent', 'llm_timeout', fallback=120),
         'chat_history_message_count': cfg.getint('Agent', 'chat_history_message_count', fallback=20),
+        'action_protocol': cfg.get('Agent', 'action_protocol', fallback='text'),
         'chat_llm': chat_llm_config
     })
 
@@ -510,6 +405,7 @@ def save_agent_config():
         cfg.set('Agent', 'summarization_threshold', str(data['summarization_threshold']))
         cfg.set('Agent', 'llm_timeout', str(data.get('llm_timeout', 120)))
         cfg.set('Agent', 'chat_history_message_count', str(data.get('chat_history_message_count', 20)))
+        cfg.set('Agent', 'action_protocol', data.get('action_protocol', 'text'))
         cfg.set('Ollama', 'api_url', data.get('ollama_api_url', ''))
 
         # Save Chat LLM Configuration
@@ -539,7 +435,8 @@ def test_ollama():
     """Testeaza conexiunea la Ollama."""
     try:
         api_url = request.json['api_url']
-        is_connected, msg, models = llm_utils.check_ollama_connection(api_url)
+        # An explicit test always asks the provider (a cached list would hide a stopped server or a revoked key)
+        is_connected, msg, models = MODEL_CATALOG.get_models('ollama', api_url, force=True)
         if is_connected:
             return jsonify({'status': 'success', 'message': msg, 'models': models})
         else:
@@ -553,7 +450,7 @@ def test_gemini():
     """Testeaza API Key-ul Gemini."""
     try:
         api_key = request.json['api_key']
-        is_connected, msg, models = llm_utils.check_gemini_connection(api_key)
+        is_connected, msg, models = MODEL_CATALOG.get_models('gemini', api_key, force=True)
         if is_connected:
             return jsonify({'status': 'success', 'message': msg, 'models': models})
         else:
@@ -567,7 +464,7 @@ def test_anthropic():
     """Testeaza API Key-ul Anthropic."""
     try:
         api_key = request.json['api_key']
-        is_connected, msg, models = llm_utils.check_anthropic_connection(api_key)
+        is_connected, msg, models = MODEL_CATALOG.get_models('anthropic', api_key, force=True)
         if is_connected:
             return jsonify({'status': 'success', 'message': msg, 'models': models})
         else:
@@ -590,21 +487,21 @@ def get_models_route():
         if provider == 'ollama':
             # Use URL from main config
             url = cfg.get('Ollama', 'api_url', fallback='http://localhost:11434')
-            success, msg, models = llm_utils.check_ollama_connection(url)
+            success, msg, models = MODEL_CATALOG.get_models('ollama', url)
 
         elif provider == 'gemini':
             # Use UI key if present, else saved key
             key = api_key_ui if api_key_ui else cfg.get('General', 'gemini_api_key', fallback='')
             if not key:
                 return jsonify({'status': 'error', 'message': 'Missing API Key'})
-            success, msg, models = llm_utils.check_gemini_connection(key)
+            success, msg, models = MODEL_CATALOG.get_models('gemini', key)
 
         elif provider == 'anthropic':
             # Use UI key if present, else saved key
             key = api_key_ui if api_key_ui else cfg.get('General', 'anthropic_api_key', fallback='')
             if not key:
                 return jsonify({'status': 'error', 'message': 'Missing API Key'})
-            success, msg, models = llm_utils.check_anthropic_connection(key)
+            success, msg, models = MODEL_CATALOG.get_models('anthropic', key)
 
         else:
             return jsonify({'status': 'error', 'message': 'Unknown provider'})
@@ -711,6 +608,21 @@ def delete_connection():
         traceback.print_exc()
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
+@app.route('/fleet_status')
+def fleet_status():
+    """
+    Reachability of all saved connections in one round trip (TCP connect + SSH banner, concurrently).
+    Query params: refresh=1 forces a new scan, auth=1 also tests key authentication.
+    """
+    try:
+        refresh = request.args.get('refresh', '0') == '1'
+        auth = request.args.get('auth', '0') == '1'
+        connections = session_manager.load_connections()
+        return jsonify({'status': 'success', **FLEET_SCANNER.status(connections, refresh=refresh, auth=auth)})
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
 @app.route('/deploy_ssh_key', methods=['POST'])
 def deploy_ssh_key():
     """Deploiaza cheia SSH pe sistemul tinta folosind parola."""
@@ -742,24 +654,66 @@ def deploy_ssh_key():
 
 @app.route('/get_llm_status')
 def get_llm_status():
-    """Returneaza statusul conexiunii LLM."""
-    return jsonify(GLOBAL_STATE['llm_connection_status'])
+    """Returneaza statusul conexiunii LLM (reverificat in background dupa expirarea TTL-ului)."""
+    return jsonify(HEALTH.get_status('llm'))
 
 @app.route('/get_ssh_status')
 def get_ssh_status():
-    """Returneaza statusul conexiunii SSH."""
-    return jsonify(GLOBAL_STATE['ssh_connection_status'])
+    """Returneaza statusul conexiunii SSH (reverificat in background dupa expirarea TTL-ului)."""
+    return jsonify(HEALTH.get_status('ssh'))
 
 @app.route('/get_history_stats')
 def get_history_stats():
     """Returneaza statistici despre istoricul agentului."""
     return jsonify({'char_count': len(GLOBAL_STATE['agent_history'])})
 
+# --- Paginare pentru view-urile log-ului ---
+MAX_PAGE_LIMIT = 5000
+
+def _get_page_args():
+    """
+    Reads the optional pagination parameters of the log view routes.
+    Returns (before_offset, limit) or None when the client asked for the classic full view.
+    before_offset is an event sequence number (exclusive), limit is a number of lines.
+    """
+    if 'before_offset' not in request.args and 'limit' not in request.args:
+        return None
+    before_offset = request.args.get('before_offset', type=int)
+    limit = request.args.get('limit', default=500, type=int)
+    return before_offset, max(1, min(limit, MAX_PAGE_LIMIT))
+
+def _log_page_response(log_manager, view: str, page_args):
+    """Builds the JSON response for one page of a log view."""
+    before_offset, limit = page_args
+    page = log_manager.get_log_page(view, before_offset, limit)
+    return jsonify({'status': 'success', **page})
+
+def _log_version():
+    """Version of the Full Log (ETag of the log view routes); None without a log manager."""
+    log_manager = GLOBAL_STATE.get('log_manager')
+    return log_manager.get_log_version() if log_manager else None
+
+def _context_version():
+    log_manager = GLOBAL_STATE.get('log_manager')
+    return log_manager.get_context_version() if log_manager else None
+
+def _buffer_version(key):
+    """Version of an in-memory ring buffer (a new object after session load / reset)."""
+    buffer = GLOBAL_STATE[key]
+    return f"{id(buffer)}.{buffer.version}"
+
 @app.route('/get_agent_execution_log')
+@versioned_view(_log_version)
 def get_agent_execution_log():
-    """Returns Full Log (immutable base log from execution_log.txt)."""
+    """
+    Returns Full Log (tail of the immutable segmented event log, rendered as text).
+    Optional: ?limit=N&before_offset=SEQ returns one page (see _get_page_args).
+    """
     try:
         log_manager = GLOBAL_STATE.get('log_manager')
+        page_args = _get_page_args()
+        if log_manager and page_args:
+            return _log_page_response(log_manager, 'full', page_args)
         if log_manager:
             view_data = log_manager.get_full_log()
             return jsonify({'status': 'success', 'data': view_data})
@@ -775,10 +729,14 @@ def get_agent_execution_log():
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
 @app.route('/get_execution_log_actions')
+@versioned_view(_log_version)
 def get_execution_log_actions():
     """Returns Actions View (extracted from Full Log)."""
     try:
         log_manager = GLOBAL_STATE.get('log_manager')
+        page_args = _get_page_args()
+        if log_manager and page_args:
+            return _log_page_response(log_manager, 'actions', page_args)
         if log_manager:
             view_data = log_manager.get_actions_view()
             return jsonify({'status': 'success', 'data': view_data})
@@ -789,10 +747,14 @@ def get_execution_log_actions():
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
 @app.route('/get_execution_log_commands')
+@versioned_view(_log_version)
 def get_execution_log_commands():
     """Returns Commands View (extracted from Full Log)."""
     try:
         log_manager = GLOBAL_STATE.get('log_manager')
+        page_args = _get_page_args()
+        if log_manager and page_args:
+            return _log_page_response(log_manager, 'commands', page_args)
         if log_manager:
             view_data = log_manager.get_commands_view()
             return jsonify({'status': 'success', 'data': view_data})
@@ -803,21 +765,151 @@ def get_execution_log_commands():
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
 @app.route('/get_vm_screen_log')
+@versioned_view(_log_version)
 def get_vm_screen_log():
     """Returns VM Screen Log view (commands + output, terminal view)."""
     try:
         log_manager = GLOBAL_STATE.get('log_manager')
+        page_args = _get_page_args()
+        if log_manager and page_args:
+            return _log_page_response(log_manager, 'vm_screen', page_args)
         if log_manager:
             view_data = log_manager.get_vm_screen_view()
             return jsonify({'status': 'success', 'data': view_data})
         else:
             # Fallback to old persistent_vm_output if log_manager not available
-            return jsonify({'status': 'success', 'data': GLOBAL_STATE.get('persistent_vm_output', '')})
+            return jsonify({'status': 'success', 'data': GLOBAL_STATE['persistent_vm_output'].text()})
     except Exception as e:
         print(f"Error getting VM screen log: {e}")
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
+# === LAZY PANELS ===
+# initial_state only carries a summary of the large panels; the rest is fetched on demand.
+
+@app.route('/vm_output')
+@versioned_view(lambda: _buffer_version('persistent_vm_output'))
+def get_vm_output():
+    """Pages the in-memory VM Screen buffer (?before=<seq>&limit=N, oldest first)."""
+    try:
+        before = request.args.get('before', type=int)
+        limit = max(1, min(request.args.get('limit', DEFAULT_PAGE_SIZE, type=int), 5000))
+        vm_output = GLOBAL_STATE['persistent_vm_output']
+        page = vm_output.page(before=before, limit=limit, view='full')
+        page.update(status='success', version=vm_output.version)
+        return jsonify(page)
+    except Exception as e:
+        print(f"Error getting VM output page: {e}")
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+@app.route('/command_output/<spill_id>')
+def get_command_output(spill_id):
+    """
+    Full output of a command that was too large to keep in memory (spilled to disk).
+    ?offset=N&limit=N returns one JSON page; ?download=1 returns the whole file.
+    """
+    try:
+        if request.args.get('download'):
+            path = output_capture.spill_path(spill_id)
+            if path is None:
+                return jsonify({'status': 'error', 'message': 'Output not found (it may have been rotated).'}), 404
+            return send_file(path, mimetype='text/plain', as_attachment=True, download_name=f"command_output_{spill_id}.log")
+        offset = max(0, request.args.get('offset', 0, type=int))
+        limit = max(1, min(request.args.get('limit', 64 * 1024, type=int), 1024 * 1024))
+        page = output_capture.read_spill_page(spill_id, offset, limit)
+        if page is None:
+            return jsonify({'status': 'error', 'message': 'Output not found (it may have been rotated).'}), 404
+        return jsonify({'status': 'success', **page})
+    except Exception as e:
+        print(f"Error reading command output: {e}")
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+@app.route('/raw_llm_responses')
+def get_raw_llm_responses():
+    """Raw LLM responses of the last task (?offset=N&limit=N), formatted for the debug panel."""
+    try:
+        responses = GLOBAL_STATE['last_session'].get('raw_llm_responses', [])
+        offset = max(0, request.args.get('offset', 0, type=int))
+        limit = request.args.get('limit', len(responses), type=int)
+        selected = responses[offset:offset + max(0, limit)]
+        data = "\n\n".join(f"--- Response {offset + i + 1} ---\n{r}" for i, r in enumerate(selected))
+        return jsonify({'status': 'success', 'data': data, 'total': len(responses)})
+    except Exception as e:
+        print(f"Error getting raw LLM responses: {e}")
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+@app.route('/chat_history')
+def get_chat_history():
+    """Chat messages (?limit=N returns only the newest N)."""
+    try:
+        log_manager = GLOBAL_STATE.get('log_manager')
+        messages = log_manager.get_chat_history() if log_manager else []
+        limit = request.args.get('limit', type=int)
+        total = len(messages)
+        if limit is not None:
+            messages = messages[-limit:] if limit > 0 else []
+        return jsonify({'status': 'success', 'messages': messages, 'total': total})
+    except Exception as e:
+        print(f"Error getting chat history: {e}")
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+# --- Metrics (Prometheus text format) ---
+
+def _log_file_sizes() -> dict:
+    """Scrape-time sizes of the persistent logs (never computed on the hot path)."""
+    sizes = {}
+    log_manager = GLOBAL_STATE.get('log_manager')
+    if log_manager:
+        sizes[('execution_log',)] = log_manager.base_log.get_total_bytes()
+    for name, path in (('llm_context', EXECUTION_LOG_LLM_CONTEXT_PATH),
+                       ('chat_history', CHAT_LOG_FILE_PATH),
+                       ('action_plan', ACTION_PLAN_FILE_PATH)):
+        try:
+            sizes[(name,)] = os.path.getsize(path)
+        except OSError:
+            pass
+    return sizes
+
+metrics.CONTEXT_SIZE.set_function(lambda: len(GLOBAL_STATE.get('agent_history') or ''))
+metrics.LOG_FILE_BYTES.set_function(_log_file_sizes)
+
+@app.route('/metrics')
+def get_metrics():
+    """Prometheus scrape endpoint."""
+    return Response(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@app.route('/get_task_trace')
+def get_task_trace():
+    """Returns the spans of one task (default: the latest) for the history waterfall view."""
+    try:
+        tasks = TRACER.list_traces()
+        task_id = request.args.get('task_id') or (tasks[0] if tasks else None)
+        spans = TRACER.load_trace(task_id) if task_id else []
+
+        # Times relative to the first span, in milliseconds
+        origin = spans[0]['ts'] if spans else 0
+        phase_totals = {}
+        view_spans = []
+        for span in spans:
+            dur_ms = span['dur'] / 1000.0
+            if span['name'] != 'step':
+                phase_totals[span['name']] = phase_totals.get(span['name'], 0) + dur_ms
+            view_spans.append({
+                'name': span['name'],
+                'cat': span.get('cat', ''),
+                'step': span.get('args', {}).get('step', 0),
+                'start_ms': (span['ts'] - origin) / 1000.0,
+                'dur_ms': dur_ms,
+                'args': span.get('args', {})
+            })
+
+        return jsonify({'status': 'success', 'task_id': task_id, 'tasks': tasks,
+                        'spans': view_spans, 'phase_totals_ms': phase_totals})
+    except Exception as e:
+        print(f"Error getting task trace: {e}")
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
 @app.route('/get_agent_memory_log')
+@versioned_view(_context_version)
 def get_agent_memory_log():
     """Returns Agent Persistent Memory view (actual LLM context)."""
     try:
@@ -898,7 +990,7 @@ def add_search_to_context():
             GLOBAL_STATE['agent_history'] += history_entry
 
         # Emit update to UI
-        socketio.emit('update_history', {'data': GLOBAL_STATE['agent_history']})
+        socketio.emit('update_history', {'chars': len(GLOBAL_STATE['agent_history'])})
 
         # Clear human_search_pending flag
         GLOBAL_STATE['human_search_pending'] = False
@@ -918,32 +1010,18 @@ def add_search_to_context():
 def save_session():
     """
     Save current session as a ZIP containing ALL persistence files.
+    The archive is generated while it is sent (chunked response), without a temp file.
     """
     try:
-        # Use the updated session_manager function which saves GLOBAL_STATE + all files
-        zip_path = session_manager.save_session_state(GLOBAL_STATE)
-
-        if not zip_path or not os.path.exists(zip_path):
-            return jsonify({'status': 'error', 'message': 'Failed to create session ZIP'}), 500
-
-        # Read the ZIP file into memory for download
-        with open(zip_path, 'rb') as f:
-            zip_data = f.read()
-
-        # Cleanup the temporary file
-        os.remove(zip_path)
-
-        # Create BytesIO buffer for send_file
-        zip_buffer = BytesIO(zip_data)
-        zip_buffer.seek(0)
-
-        filename = os.path.basename(zip_path)
+        compress_level = get_config().getint('General', 'export_compress_level',
+                                             fallback=session_manager.DEFAULT_EXPORT_COMPRESS_LEVEL)
+        filename, chunks = session_manager.stream_session_zip(GLOBAL_STATE, compress_level)
 
-        return send_file(
-            zip_buffer,
+        return Response(
+            chunks,
             mimetype='application/zip',
-            as_attachment=True,
-            download_name=filename
+            headers={'Content-Disposition': f'attachment; filename={filename}'},
+            direct_passthrough=True
         )
 
     except Exception as e:
@@ -953,6 +1031,7 @@ def save_session():
 
 @app.route('/load_session', methods=['POST'])
 def load_session():
+    global GLOBAL_STATE
     if 'file' not in request.files:
         return jsonify({'status': 'error', 'message': 'No file uploaded'})
 
@@ -967,18 +1046,23 @@ def load_session():
             file.save(temp_path)
 
             # 1. Restore Files to Disk
+            # Pending write-behind state first, so no timer rewrites a restored file afterwards
+            if GLOBAL_STATE.get('log_manager'):
+                GLOBAL_STATE['log_manager'].flush()
             loaded_state_data = session_manager.load_session_state(temp_path)
 
             # 2. Update RAM (GLOBAL_STATE)
             if loaded_state_data:
-                global GLOBAL_STATE
-
                 # --- FIX: Protect log_manager from being overwritten by a string ---
                 # The JSON save converts objects to strings. We must NOT overwrite
                 # the live LogManager object with that string.
                 if 'log_manager' in loaded_state_data:
                     del loaded_state_data['log_manager']
                 # -----------------------------------------------------------------
+                # The VM Screen buffer is exported as plain text; rebuild the ring buffer
+                # (same as session_manager.load_session_from_disk at startup)
+                loaded_state_data['persistent_vm_output'] = VmOutputStore.from_text(
+                    loaded_state_data.get('persistent_vm_output') or "")
 
                 GLOBAL_STATE.update(loaded_state_data)
                 print("Global State memory updated from session file.")
@@ -993,6 +1077,9 @@ def load_session():
                 if log_manager:
                     log_manager.reload_state()
 
+                # The live log is not part of the archive: rebuild it from the restored event log
+                GLOBAL_STATE['live_log'] = session_manager.load_live_log(EXECUTION_LOG_SEGMENTS_DIR)
+
                 # Cleanup
                 if os.path.exists(temp_path):
                     os.remove(temp_path)
@@ -1007,6 +1094,48 @@ def load_session():
 
     return jsonify({'status': 'error', 'message': 'Unknown error'})
 
+@app.route('/live_log')
+@versioned_view(lambda: _buffer_version('live_log'))
+def get_live_log_page():
+    """Older entries of the live Execution Log (?before=<seq>&limit=N&view=filtered|full)."""
+    try:
+        before = request.args.get('before', type=int)
+        limit = min(request.args.get('limit', DEFAULT_PAGE_SIZE, type=int), 5000)
+        view = request.args.get('view', 'filtered')
+        return jsonify({'status': 'success', **GLOBAL_STATE['live_log'].page(before, limit, view)})
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+@app.route('/snapshots')
+def list_snapshots():
+    """Lists the incremental session snapshots (newest last)."""
+    return jsonify({'status': 'success', 'snapshots': SNAPSHOT_STORE.list_snapshots()})
+
+@app.route('/snapshots/restore', methods=['POST'])
+def restore_snapshot():
+    """Restores a snapshot (latest if no id is given): files on disk, then GLOBAL_STATE and the log manager."""
+    if GLOBAL_STATE['task_running']:
+        return jsonify({'status': 'error', 'message': 'Stop the running task before restoring a snapshot.'}), 409
+    try:
+        snapshot_id = (request.json or {}).get('id') if request.is_json else None
+        # Pending write-behind state first, so no timer rewrites a restored file afterwards
+        if GLOBAL_STATE.get('log_manager'):
+            GLOBAL_STATE['log_manager'].flush()
+        if SNAPSHOT_STORE.restore(int(snapshot_id) if snapshot_id is not None else None) is None:
+            return jsonify({'status': 'error', 'message': 'Snapshot not found.'}), 404
+
+        # Same path as startup: session.json + the tail of the restored event log
+        GLOBAL_STATE.update(session_manager.load_session_from_disk(SESSION_FILE_PATH, EXECUTION_LOG_SEGMENTS_DIR))
+        log_manager = GLOBAL_STATE.get('log_manager')
+        if log_manager:
+            log_manager.reload_state()
+        socketio.emit('update_history', {'chars': len(GLOBAL_STATE['agent_history'])})
+        return jsonify({'status': 'success'})
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
 @app.route('/get_public_key')
 def get_public_key():
     """Returneaza cheia publica, o genereaza daca este necesar."""
@@ -1400,59 +1529,98 @@ def import_prompts():
 # --- Handler-e SocketIO (Logica in Timp Real) ---
 # ---
 
-@socketio.on('connect')
-def handle_connect():
-    """Gestioneaza o noua conexiune client (ex: deschiderea paginii, refresh)."""
-    global GLOBAL_STATE
-    print(f"Client connected: {request.sid}")
-    
-    # Trimite starea *curenta* (inclusiv din task-ul care ruleaza)
-    try:
-        # CORECTIE LOG: Trimitem log-ul parsat pentru vizualizarea 'Live'
-        filtered_log = agent_core.parse_command_log(GLOBAL_STATE['last_session']['log'])
+def _interrupted_task_summary():
+    """Objective and progress of a task that can be resumed (None if there is none or one is running)."""
+    if GLOBAL_STATE['task_running']:
+        return None
+    checkpoint = task_checkpoint.interrupted_task()
+    if checkpoint is None:
+        return None
+    return {'objective': checkpoint['objective'], 'completed_step': checkpoint.get('completed_step', 0),
+            'status': checkpoint.get('status'), 'pending': checkpoint.get('pending'),
+            'target': task_checkpoint.recorded_target(checkpoint)}
+
+INITIAL_STATE_VERSION = 2               # Summary-only handshake (panels load their data lazily)
+INITIAL_VM_OUTPUT_CHARS = 16 * 1024     # VM Screen tail sent on connect; older text via /vm_output
+INITIAL_CHAT_MESSAGES = 50              # Newest chat messages sent on connect; all via /chat_history
+
+def initial_state_payload():
+    """
+    Handshake v2: only summaries of the large panels (sizes, versions, newest items).
+    Agent memory, older log / VM Screen pages, raw LLM responses and older chat messages
+    are fetched by the panels themselves (/get_agent_memory_log, /live_log, /vm_output, ...).
+    """
+    # CORECTIE LOG: Trimitem ultima pagina din log-ul filtrat (precalculat la append); restul via /live_log
+    live_log = GLOBAL_STATE['live_log']
+    live_page = live_log.page()
+    filtered_log = "\n".join(entry['text'] for entry in live_page['entries'])
 
-        raw_responses = "\n\n".join([f"-- Resp {i+1} --\n{r}" for i, r in enumerate(GLOBAL_STATE['last_session'].get("raw_llm_responses", []))])
+    vm_output = GLOBAL_STATE['persistent_vm_output']
+    vm_tail = vm_output.tail(INITIAL_VM_OUTPUT_CHARS)
+
+    # Load Chat History (doar ultimele mesaje)
+    log_manager = GLOBAL_STATE.get('log_manager')
+    chat_history = log_manager.get_chat_history() if log_manager else []
+
+    return {
+        'handshake_version': INITIAL_STATE_VERSION,
+        'agent_history_info': {'chars': len(GLOBAL_STATE.get('agent_history') or '')},
+        'vm_output': vm_tail,
+        'vm_output_info': {'version': vm_output.version, 'bytes': vm_output.size, 'complete': len(vm_tail) < INITIAL_VM_OUTPUT_CHARS},
+        'last_log': filtered_log, # Trimitem log-ul filtrat
+        'last_log_before': live_page['before'] if live_page['has_more'] else None,
+        'live_log_version': live_log.version,
+        'last_report': GLOBAL_STATE['last_session'].get('final_report', ''),
+        'raw_llm_responses_count': len(GLOBAL_STATE['last_session'].get('raw_llm_responses', [])),
+        'task_running': GLOBAL_STATE['task_running'],
+        'task_paused': GLOBAL_STATE['task_paused'],
+        'validator_enabled': GLOBAL_STATE.get('validator_enabled', True),
+        'chat_history': chat_history[-INITIAL_CHAT_MESSAGES:],
+        'chat_history_total': len(chat_history),
+        'interrupted_task': _interrupted_task_summary()
+    }
+
+def send_initial_state(sid):
+    """Trimite starea *curenta* (inclusiv din task-ul care ruleaza) unui client."""
+    try:
+        socketio.emit('initial_state', initial_state_payload(), to=sid)
 
-        # Load Chat History
-        log_manager = GLOBAL_STATE.get('log_manager')
-        chat_history = log_manager.get_chat_history() if log_manager else []
-
-        initial_data = {
-            'agent_history': GLOBAL_STATE['agent_history'],
-            'vm_output': GLOBAL_STATE['persistent_vm_output'],
-            'last_log': filtered_log, # Trimitem log-ul filtrat
-            'last_report': GLOBAL_STATE['last_session'].get('final_report', ''),
-            'raw_llm_responses': raw_responses,
-            'task_running': GLOBAL_STATE['task_running'],
-            'task_paused': GLOBAL_STATE['task_paused'],
-            'validator_enabled': GLOBAL_STATE.get('validator_enabled', True),
-            'chat_history': chat_history  # NEW FIELD
-        }
-        socketio.emit('initial_state', initial_data, to=request.sid)
-        
         # Trimitem si statusurile curente
-        socketio.emit('ssh_status_update', GLOBAL_STATE['ssh_connection_status'], to=request.sid)
-        socketio.emit('llm_status_update', GLOBAL_STATE['llm_connection_status'], to=request.sid)
-        
+        socketio.emit('ssh_status_update', GLOBAL_STATE['ssh_connection_status'], to=sid)
+        socketio.emit('llm_status_update', GLOBAL_STATE['llm_connection_status'], to=sid)
+
     except Exception as e:
         print(f"Error sending initial state: {e}")
         traceback.print_exc()
 
+# Clientii prea lenti (backlog aruncat de event bus) primesc din nou starea completa
+EVENT_BUS.on_resync = send_initial_state
+
+@socketio.on('connect')
+def handle_connect():
+    """Gestioneaza o noua conexiune client (ex: deschiderea paginii, refresh)."""
+    print(f"Client connected: {request.sid}")
+    metrics.SOCKETIO_CLIENTS.inc()
+    send_initial_state(request.sid)
+    EVENT_BUS.add_client(request.sid)
+
 @socketio.on('disconnect')
 def handle_disconnect():
     """Gestioneaza deconectarea clientului."""
     print(f"Client disconnected: {request.sid}. Task continues if running.")
+    metrics.SOCKETIO_CLIENTS.dec()
+    EVENT_BUS.remove_client(request.sid)
 
 # --- Wrapper pentru Task-ul Agentului ---
 
-def run_agent_and_update_state(socketio, global_state, control_flags, event_objects):
+def run_agent_and_update_state(socketio, global_state, control_flags, event_objects, resume_checkpoint=None):
     """
     Wrapper care ruleaza agent_task_runner si gestioneaza curatarea
     si salvarea starii la final.
     """
     try:
         # Apelam functia principala din agent_core
-        agent_core.agent_task_runner(socketio, global_state, control_flags, event_objects)
+        agent_core.agent_task_runner(socketio, global_state, control_flags, event_objects, resume_checkpoint=resume_checkpoint)
     except Exception as e:
         print(f"Agent task runner exception: {e}")
         traceback.print_exc()
@@ -1464,7 +1632,7 @@ def run_agent_and_update_state(socketio, global_state, control_flags, event_obje
         socketio.emit('task_finished')
         
         # Salvam starea
-        save_app_state()
+        save_app_state(label="task end")
 
 # --- Handler-e SocketIO pentru Controlul Task-ului ---
 
@@ -1520,12 +1688,58 @@ def handle_execute_task(data):
     # Pornim thread-ul agentului
     socketio.start_background_task(
         run_agent_and_update_state,
-        socketio,
+        EVENT_BUS,
         GLOBAL_STATE,
         CONTROL_FLAGS,
         EVENT_OBJECTS
     )
 
+@socketio.on('resume_interrupted_task')
+def handle_resume_interrupted_task():
+    """Reia un task intrerupt (crash / restart) de la ultimul pas finalizat, din task_checkpoint.json."""
+    if GLOBAL_STATE['task_running']:
+        socketio.emit('agent_log', {'data': "A task is already running. Please stop it first."})
+        return
+
+    checkpoint = task_checkpoint.interrupted_task()
+    if checkpoint is None:
+        socketio.emit('agent_log', {'data': "No interrupted task to resume."})
+        return
+
+    # The task only continues on the host it ran on (OS, sudo and context were detected there)
+    cfg = get_config()
+    username = cfg.get('System', 'username', fallback='unknown')
+    ip = cfg.get('System', 'ip_address', fallback='unknown')
+    if task_checkpoint.target_changed(checkpoint, username, ip):
+        socketio.emit('agent_log', {'data': (
+            f"Cannot resume: the interrupted task ran on {task_checkpoint.recorded_target(checkpoint)}, "
+            f"but the configured target is now {username}@{ip}. Switch back to that host to resume it, "
+            f"or start a new task.")})
+        return
+
+    modes = checkpoint.get('modes', {})
+    GLOBAL_STATE['current_objective'] = checkpoint['objective']
+    GLOBAL_STATE['current_execution_mode'] = modes.get('execution', 'independent')
+    GLOBAL_STATE['current_summarization_mode'] = modes.get('summarization', 'automatic')
+    GLOBAL_STATE['current_allow_ask_mode'] = modes.get('allow_ask', False)
+    GLOBAL_STATE['task_running'] = True
+    GLOBAL_STATE['task_paused'] = False
+    USER_RESPONSE.clear()
+    USER_ANSWER.clear()
+
+    GLOBAL_STATE['system_username'] = username
+    GLOBAL_STATE['system_ip'] = ip
+
+    socketio.emit('task_started')
+    socketio.start_background_task(
+        run_agent_and_update_state,
+        EVENT_BUS,
+        GLOBAL_STATE,
+        CONTROL_FLAGS,
+        EVENT_OBJECTS,
+        checkpoint
+    )
+
 @socketio.on('stop_task')
 def handle_stop_task():
     """Opreste task-ul curent."""
@@ -1574,9 +1788,9 @@ def handle_resume_task(data):
             GLOBAL_STATE['current_objective'] = new_objective
             log_msg = f"\n--- Objective updated during pause ---\nOld: {old_objective}\nNew: {new_objective}\n"
             socketio.emit('agent_log', {'data': log_msg})
-            GLOBAL_STATE['last_session']['log'] += log_msg + '\n'
+            GLOBAL_STATE['live_log'].append(log_msg)
             GLOBAL_STATE['agent_history'] += f"\n\n--- USER INTERVENTION ---\nObjective changed from:\n{old_objective}\nTo:\n{new_objective}\n"
-            socketio.emit('update_history', {'data': GLOBAL_STATE['agent_history']})
+            socketio.emit('update_history', {'chars': len(GLOBAL_STATE['agent_history'])})
         
         GLOBAL_STATE['task_paused'] = False
         socketio.emit('task_resumed')
@@ -1592,7 +1806,7 @@ def handle_update_execution_mode(data):
             GLOBAL_STATE['current_execution_mode'] = new_mode
             log_msg = f"--- Execution mode changed to: {new_mode} ---"
             socketio.emit('agent_log', {'data': log_msg})
-            GLOBAL_STATE['last_session']['log'] += log_msg + '\n'
+            GLOBAL_STATE['live_log'].append(log_msg)
 
 @socketio.on('toggle_validator')
 def handle_toggle_validator(data):
@@ -1605,8 +1819,7 @@ def handle_toggle_validator(data):
     log_msg = f"--- Command Validator {status_msg} by user ---"
 
     socketio.emit('agent_log', {'data': log_msg})
-    if GLOBAL_STATE.get('last_session'):
-        GLOBAL_STATE['last_session']['log'] += log_msg + '\n'
+    GLOBAL_STATE['live_log'].append(log_msg)
 
 @socketio.on('update_summarization_threshold')
 def handle_update_summarization_threshold(data):
@@ -1623,7 +1836,7 @@ def handle_update_summarization_threshold(data):
         if GLOBAL_STATE['task_paused']:
             log_msg = f"--- Summarization threshold updated to: {new_threshold} chars ---"
             socketio.emit('agent_log', {'data': log_msg})
-            GLOBAL_STATE['last_session']['log'] += log_msg + '\n'
+            GLOBAL_STATE['live_log'].append(log_msg)
 
 @socketio.on('update_timeout')
 def handle_update_timeout(data):
@@ -1645,8 +1858,7 @@ def handle_update_timeout(data):
 
         log_msg = f"--- Command timeout updated to: {new_timeout} seconds ---"
         socketio.emit('agent_log', {'data': log_msg})
-        if GLOBAL_STATE.get('last_session'):
-            GLOBAL_STATE['last_session']['log'] += log_msg + '\n'
+        GLOBAL_STATE['live_log'].append(log_msg)
 
 # --- Handler-e pentru Aprobare Comenzi si Interactiuni ---
 
@@ -1682,7 +1894,7 @@ def handle_summarize_decision(data):
         
         log_msg = f"--- Summarization threshold updated to: {new_threshold} chars ---"
         socketio.emit('agent_log', {'data': log_msg})
-        GLOBAL_STATE['last_session']['log'] += log_msg + '\n'
+        GLOBAL_STATE['live_log'].append(log_msg)
     
     if data.get('summarize'):
         # Apelam functia de sumarizare
@@ -1695,7 +1907,7 @@ def handle_manual_summarize():
     if not GLOBAL_STATE['task_running']:
         socketio.emit('agent_log', {'data': "\n--- Manual summarization requested ---", 'clear': False})
         agent_core.summarize_history(socketio, GLOBAL_STATE)
-        save_app_state()
+        save_app_state(label="manual summarization")
 
 # --- Handler-e pentru Memory Management ---
 
@@ -1711,28 +1923,21 @@ def handle_reset_agent(data):
         # 1. Resetam fisierele de pe disc (Sesiune & Exec Log)
         reset_state = session_manager.reset_all_memory(SESSION_FILE_PATH, EXECUTION_LOG_FILE_PATH)
         GLOBAL_STATE.update(reset_state)
+        # Un task intrerupt nu mai poate fi reluat fara contextul lui
+        task_checkpoint.clear_task_checkpoint()
 
         # 2. Resetam variabilele specifice din RAM care nu sunt in session_manager
-        GLOBAL_STATE['persistent_vm_output'] = ""
+        GLOBAL_STATE['persistent_vm_output'].reset()
         GLOBAL_STATE['current_objective'] = ""  # FIX: Explicitly clear the objective
 
         # 3. Reset Log Manager (Base Log, Context, Chat History)
         log_manager = GLOBAL_STATE.get('log_manager')
         if log_manager:
-            log_manager.reset_all()  # This clears execution_log, llm_context, AND chat_history.json
+            log_manager.reset_all()  # This clears execution_log, llm_context, AND chat_history.jsonl
             print("Log manager reset completed.")
 
         # 4. Emitem noua stare catre UI
-        socketio.emit('initial_state', {
-            'agent_history': GLOBAL_STATE['agent_history'],
-            'vm_output': GLOBAL_STATE['persistent_vm_output'],
-            'last_log': GLOBAL_STATE['last_session']['log'],
-            'last_report': '',
-            'raw_llm_responses': '',
-            'task_running': False,
-            'task_paused': False,
-            'chat_history': []  # Clear chat in UI
-        })
+        socketio.emit('initial_state', initial_state_payload())
 
         # Confirmare vizuala
         socketio.emit('agent_log', {'data': "--- AGENT MEMORY & OBJECTIVE RESET ---", 'clear': True})
@@ -1763,8 +1968,8 @@ def handle_edit_history(data):
         log_manager.log_manual_edit(new_history)
         print("Agent memory manually updated via checkpoint system.")
 
-    socketio.emit('update_history', {'data': GLOBAL_STATE['agent_history']})
-    save_app_state()
+    socketio.emit('update_history', {'chars': len(GLOBAL_STATE['agent_history'])})
+    save_app_state(label="memory edit")
 
 @socketio.on('human_search_started')
 def handle_human_search_started(data):
@@ -1975,24 +2180,58 @@ def handle_clear_action_plan():
 # --- Initializare Aplicatie (Module Level - runs on import) ---
 # ---
 
+STARTUP_TIMES = {'imports': time.time() - STARTUP_STARTED_AT}
+
+def run_startup_checks():
+    """
+    Background task: tests SSH/LLM connectivity from config.ini once the server is serving,
+    then pushes the results to connected clients.
+    """
+    checks_started_at = time.time()
+    try:
+        ssh_status, llm_status = HEALTH.check_all(force=True)
+        GLOBAL_STATE['ssh_connection_status'] = ssh_status
+        GLOBAL_STATE['llm_connection_status'] = llm_status
+        initialize_chat_llm()
+        print("Connections initialized.")
+    except Exception as e:
+        print(f"Error during startup connectivity checks: {e}")
+        traceback.print_exc()
+    STARTUP_TIMES['connectivity_checks'] = time.time() - checks_started_at
+    metrics.STARTUP_DURATION.set(STARTUP_TIMES['connectivity_checks'], phase='connectivity_checks')
+    print(f"Startup connectivity checks finished in {STARTUP_TIMES['connectivity_checks'] * 1000:.0f} ms "
+          f"(SSH: {GLOBAL_STATE['ssh_connection_status']['status']}, LLM: {GLOBAL_STATE['llm_connection_status']['status']})")
+
 # Initialize log system when module is loaded (for Gunicorn)
+phase_started_at = time.time()
 initialize_log_system()
+STARTUP_TIMES['log_system'] = time.time() - phase_started_at
 
 # CRITICAL FIX: Initialize connections from config.ini immediately
 # This ensures settings persist after Docker restart/rebuild when running via Gunicorn
 try:
     print("Loading configuration from disk...")
     # Load app state first (to recover session history if available)
+    phase_started_at = time.time()
     load_app_state()
-
-    # Then test/load connections based on config.ini
-    initialize_ssh_status()
-    initialize_llm_status()
-    print("Configuration loaded and connections initialized.")
+    STARTUP_TIMES['app_state'] = time.time() - phase_started_at
+
+    # Connectivity checks (ping, SSH handshake, provider APIs) take seconds, so they run
+    # in a background task that starts once the server is serving requests
+    GLOBAL_STATE['ssh_connection_status'] = {"status": "unknown", "message": "Checking connection..."}
+    GLOBAL_STATE['llm_connection_status'] = {"status": "unknown", "message": "Checking connection..."}
+    socketio.start_background_task(run_startup_checks)
+    print("Configuration loaded. Connectivity checks scheduled in background.")
 except Exception as e:
     print(f"Error during module-level initialization: {e}")
     # We don't raise here to allow the server to start even if config is partial
 
+STARTUP_TIMES['total'] = time.time() - STARTUP_STARTED_AT
+for startup_phase in ('imports', 'log_system', 'app_state', 'total'):
+    if startup_phase in STARTUP_TIMES:
+        metrics.STARTUP_DURATION.set(STARTUP_TIMES[startup_phase], phase=startup_phase)
+print("Startup time: " + ", ".join(f"{name} {seconds * 1000:.0f} ms" for name, seconds in STARTUP_TIMES.items()))
+
 # ---
 # --- Initializare Aplicatie (Main Block - runs only when executed directly) ---
 # ---
@@ -2006,18 +2245,10 @@ if __name__ == '__main__':
         # Initializam cheile SSH
         ssh_utils.initialize_ssh_key_if_needed()
 
-        # Incarcam starea salvata
-        load_app_state()
-        print("Application state loaded.")
-        print("Log system already initialized at module level.")
+        # Starea salvata si sistemul de log sunt deja incarcate la nivel de modul;
+        # testele de conectivitate ruleaza in background dupa pornirea serverului
+        print("Application state and log system already initialized at module level.")
 
-        # Testam conexiunile
-        initialize_ssh_status()
-        initialize_llm_status()
-        
-        print(f"SSH Status: {GLOBAL_STATE['ssh_connection_status']}")
-        print(f"LLM Status: {GLOBAL_STATE['llm_connection_status']}")
-        
         print("=" * 50)
         print("Server ready. Access at http://localhost:5000")
         print("=" * 50)
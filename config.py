@@ -16,13 +16,23 @@ CONNECTIONS_FILE_PATH = os.path.join(KEYS_DIR, 'connections.json')
 # Fisierul pentru stocarea starii sesiunii agentului (istoric, etc.)
 SESSION_FILE_PATH = os.path.join(APP_DIR, 'session.json')
 # --- NOU: Fisierul pentru log-ul detaliat al executiei ---
+# NOTE: Text export generated on demand from the structured event log below.
 EXECUTION_LOG_FILE_PATH = os.path.join(KEYS_DIR, 'execution_log.txt')
+# --- NEW: Structured event log (one JSON record per event, append-only) ---
+# Superseded by the segmented log directory below; kept for migration and older session archives.
+EXECUTION_EVENT_LOG_PATH = os.path.join(KEYS_DIR, 'execution_log.jsonl')
+# --- NEW: Segmented event log (fixed-size segments + manifest, cold segments gzip-compressed) ---
+EXECUTION_LOG_SEGMENTS_DIR = os.path.join(KEYS_DIR, 'execution_log')
 # --- NOU: Fisierul pentru memoria de lucru a agentului (LLM Context) ---
 EXECUTION_LOG_LLM_CONTEXT_PATH = os.path.join(KEYS_DIR, 'execution_log_llm_context.txt')
-# --- NOU: Fisierul pentru istoricul conversatiei chat ---
-CHAT_LOG_FILE_PATH = os.path.join(KEYS_DIR, 'chat_history.json')
+# --- NOU: Fisierul pentru istoricul conversatiei chat (append-only, un mesaj JSON pe linie) ---
+CHAT_LOG_FILE_PATH = os.path.join(KEYS_DIR, 'chat_history.jsonl')
+# Formatul vechi (lista JSON rescrisa la fiecare mesaj), pastrat doar pentru migrare
+CHAT_LOG_LEGACY_PATH = os.path.join(KEYS_DIR, 'chat_history.json')
 # --- NOU: Fisierul pentru planul de actiune multi-step ---
 ACTION_PLAN_FILE_PATH = os.path.join(KEYS_DIR, 'action_plan.json')
+# Checkpoint-ul task-ului in curs (pas, obiectiv, moduri), pentru reluare dupa un crash
+TASK_CHECKPOINT_PATH = os.path.join(KEYS_DIR, 'task_checkpoint.json')
 
 # Asiguram ca directorul pentru chei exista la importarea modulului
 try:
@@ -42,11 +52,11 @@ def get_config():
     if not os.path.exists(CONFIG_FILE_PATH):
         print(f"Config file not found at {CONFIG_FILE_PATH}. Creating with defaults.")
         # Sectiuni si valori default
-        config['General'] = {'provider': 'ollama', 'gemini_api_key': '', 'anthropic_api_key': ''}
-        config['Agent'] = {'model_name': 'llama3:latest', 'max_steps': '50', 'summarization_threshold': '15000', 'command_timeout': '120', 'llm_timeout': '120', 'chat_history_message_count': '20'}
+        config['General'] = {'provider': 'ollama', 'gemini_api_key': '', 'anthropic_api_key': '', 'export_compress_level': '6'}
+        config['Agent'] = {'model_name': 'llama3:latest', 'max_steps': '50', 'summarization_threshold': '15000', 'command_timeout': '120', 'llm_timeout': '120', 'chat_history_message_count': '20', 'action_protocol': 'text'}
         # Calea SSH default este acum relativa la KEYS_DIR
-        config['System'] = {'ip_address': '', 'username': '', 'ssh_port': '22', 'ssh_key_path': os.path.join(KEYS_DIR, 'id_rsa')}
-        config['Ollama'] = {'api_url': 'http://localhost:11434'}
+        config['System'] = {'ip_address': '', 'username': '', 'ssh_port': '22', 'ssh_key_path': os.path.join(KEYS_DIR, 'id_rsa'), 'snapshot_every_step': 'true', 'output_memory_cap_kb': '1024', 'ssh_window_size_kb': '8192', 'ssh_max_packet_kb': '32'}
+        config['Ollama'] = {'api_url': 'http://localhost:11434', 'context_reuse': 'true', 'num_ctx': '0'}
         # Prompturi default simple cu SRCH capability
         srch_documentation = """
 
@@ -0,0 +1,181 @@
+import threading
+from typing import Callable, Dict, List, Optional
+
+import metrics
+
+# ===========================
+# === SOCKET.IO EVENT BUS ===
+# ===========================
+# Sits in front of socketio.emit for the agent thread. emit() only queues the event for every
+# connected client (no network I/O, never blocks the agent); a background task sends one frame
+# per client every FLUSH_INTERVAL seconds:
+#   coalesced - timer ticks (thinking_update, command_exec_update): only the latest value is sent
+#   batched   - consecutive agent_log / vm_screen messages are joined into one event
+#   others    - sent in order, unchanged
+# Backpressure: a client whose engine.io queue still holds more than MAX_CLIENT_BACKLOG packets
+# (slow or background tab) is skipped for that frame and its droppable events are discarded.
+# If its pending data still exceeds MAX_PENDING_CHARS, the queue is dropped and the client is
+# resynced with a fresh initial_state once it catches up.
+
+FLUSH_INTERVAL = 0.1                # Seconds between frames
+COALESCED_EVENTS = ('thinking_update', 'command_exec_update')
+BATCHED_EVENTS = {'agent_log': "\n", 'vm_screen': ""}   # event -> separator used to join messages
+MAX_BATCH_CHARS = 64 * 1024         # A batch is closed beyond this size
+MAX_CLIENT_BACKLOG = 64             # engine.io packets not yet written to the client
+MAX_PENDING_CHARS = 2 * 1024 * 1024
+
+
+class _Client:
+    __slots__ = ('pending', 'pending_chars', 'needs_resync')
+
+    def __init__(self):
+        self.pending: List[List] = []     # [event, data, batchable]
+        self.pending_chars = 0
+        self.needs_resync = False
+
+
+def _size(data) -> int:
+    if isinstance(data, dict) and isinstance(data.get('data'), str):
+        return len(data['data'])
+    return 64
+
+
+class EventBus:
+    """Drop-in for socketio.emit (agent thread side) with per-client coalescing and backpressure."""
+
+    def __init__(self, socketio, flush_interval: float = FLUSH_INTERVAL):
+        self.socketio = socketio
+        self.flush_interval = flush_interval
+        self.on_resync: Optional[Callable[[str], None]] = None
+        self._clients: Dict[str, _Client] = {}
+        self._lock = threading.Lock()
+        self._started = False
+
+    # === Clients ===
+
+    def add_client(self, sid: str):
+        with self._lock:
+            self._clients[sid] = _Client()
+            start = not self._started
+            self._started = True
+        if start:
+            self.socketio.start_background_task(self._flush_loop)
+
+    def remove_client(self, sid: str):
+        with self._lock:
+            self._clients.pop(sid, None)
+
+    # === Producer side ===
+
+    def emit(self, event: str, data=None, to: Optional[str] = None, **kwargs):
+        """Queues the event for all clients (or for 'to'). Other socketio options bypass the bus."""
+        with self._lock:
+            if kwargs or (to is not None and to not in self._clients):
+                direct = True
+            else:
+                direct = False
+                targets = [self._clients[to]] if to is not None else list(self._clients.values())
+                for client in targets:
+                    self._enqueue(client, event, data)
+        if direct:
+            if to is not None:
+                kwargs['to'] = to
+            self.socketio.emit(event, data, **kwargs)
+
+    def _enqueue(self, client: _Client, event: str, data):
+        pending = client.pending
+        if event in COALESCED_EVENTS:
+            for item in reversed(pending):
+                if item[0] == event:
+                    item[1] = data
+                    metrics.SOCKETIO_EVENTS.inc(outcome='coalesced')
+                    return
+
+        batchable = event in BATCHED_EVENTS and isinstance(data, dict) and isinstance(data.get('data'), str)
+        if batchable and not data.get('clear'):
+            # Timer ticks carry no ordering, so a batch continues across them
+            last = next((item for item in reversed(pending) if item[0] not in COALESCED_EVENTS), None)
+            if last is not None and last[0] == event and last[2] and len(last[1]['data']) < MAX_BATCH_CHARS:
+                last[1]['data'] += BATCHED_EVENTS[event] + data['data']
+                client.pending_chars += _size(data)
+                metrics.SOCKETIO_EVENTS.inc(outcome='batched')
+                return
+
+        pending.append([event, dict(data) if batchable else data, batchable])
+        client.pending_chars += _size(data)
+        metrics.SOCKETIO_EVENTS.inc(outcome='queued')
+        if client.pending_chars > MAX_PENDING_CHARS:
+            # Too far behind: the client gets the full current state instead of the backlog
+            metrics.SOCKETIO_EVENTS.inc(len(pending), outcome='dropped')
+            client.pending, client.pending_chars, client.needs_resync = [], 0, True
+
+    # === Consumer side ===
+
+    def _backlog(self, sid: str) -> int:
+        """Packets engine.io has queued but not yet written to this client."""
+        try:
+            server = self.socketio.server
+            eio_sid = server.manager.eio_sid_from_sid(sid, '/')
+            return server.eio.sockets[eio_sid].queue.qsize()
+        except Exception:
+            return 0
+
+    def _flush_loop(self):
+        while True:
+            self.socketio.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Event bus flush error: {e}")
+
+    def flush(self):
+        """Sends one frame to every client that is not backlogged."""
+        with self._lock:
+            sids = [sid for sid, client in self._clients.items() if client.pending or client.needs_resync]
+        for sid in sids:
+            slow = self._backlog(sid) > MAX_CLIENT_BACKLOG
+            with self._lock:
+                client = self._clients.get(sid)
+                if client is None:
+                    continue
+                if slow:
+                    # Skip this frame; timer ticks are stale by the next one anyway
+                    kept = [item for item in client.pending if item[0] not in COALESCED_EVENTS]
+                    metrics.SOCKETIO_EVENTS.inc(len(client.pending) - len(kept), outcome='dropped')
+                    client.pending = kept
+                    continue
+                items, resync = client.pending, client.needs_resync
+                client.pending, client.pending_chars, client.needs_resync = [], 0, False
+            if resync and self.on_resync is not None:
+                metrics.SOCKETIO_EVENTS.inc(outcome='resync')
+                self.on_resync(sid)
+                # The fresh state already contains the queued log / screen text; control events are kept
+                items = [item for item in items if not item[2] and item[0] not in COALESCED_EVENTS]
+            for event, data, _ in items:
+                self.socketio.emit(event, data, to=sid)
+
+
+# --- Bloc optional pentru testare ---
+if __name__ == '__main__':
+    class _FakeSocketIO:
+        def __init__(self):
+            self.sent = []
+
+        def emit(self, event, data=None, **kwargs):
+            self.sent.append((event, data, kwargs.get('to')))
+
+        def start_background_task(self, target, *args):
+            pass
+
+    fake = _FakeSocketIO()
+    bus = EventBus(fake)
+    bus.add_client('a')
+    for i in range(5):
+        bus.emit('agent_log', {'data': f"line {i}", 'clear': False})
+        bus.emit('thinking_update', {'remaining': 60 - i})
+    bus.emit('task_finished')
+    bus.flush()
+    assert [event for event, _, _ in fake.sent] == ['agent_log', 'thinking_update', 'task_finished'], fake.sent
+    assert fake.sent[0][1]['data'] == "line 0\nline 1\nline 2\nline 3\nline 4"
+    assert fake.sent[1][1] == {'remaining': 56}
+    print("Event bus checks passed.")
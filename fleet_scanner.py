@@ -0,0 +1,179 @@
+import os
+import json
+import time
+import socket
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import paramiko
+
+from config import KEYS_DIR, get_config
+
+# ===========================
+# === FLEET SCANNER ===
+# ===========================
+# Checks every saved connection (connections.json) concurrently:
+#   1. TCP connect to the SSH port (latency = connect time)
+#   2. SSH banner read ("SSH-2.0-OpenSSH_9.6 ...") - proves an SSH daemon answers, no auth needed
+#   3. optional key authentication (only when auth=True)
+# Per-host latency history is kept in memory and persisted to keys/fleet_status.json.
+
+FLEET_STATUS_PATH = os.path.join(KEYS_DIR, 'fleet_status.json')
+MAX_PARALLEL_PROBES = 16    # Bounded pool, a large fleet is scanned in waves
+CONNECT_TIMEOUT = 3         # Seconds for TCP connect and banner read
+AUTH_TIMEOUT = 8            # Seconds for the optional key authentication
+HISTORY_LENGTH = 20         # Latency samples kept per host
+SCAN_CACHE_SECONDS = 30     # A fleet status younger than this is returned without rescanning
+
+_EXECUTOR = ThreadPoolExecutor(max_workers=MAX_PARALLEL_PROBES, thread_name_prefix='fleet')
+
+
+def host_key(conn: Dict) -> str:
+    return f"{conn.get('username', '')}@{conn.get('ip', '')}:{conn.get('port', 22)}"
+
+
+def probe_host(conn: Dict, auth: bool = False) -> Dict:
+    """Probes one saved connection. Never raises; errors are reported in the result."""
+    ip = conn.get('ip', '')
+    port = int(conn.get('port', 22) or 22)
+    result = {
+        'host': host_key(conn), 'ip': ip, 'port': port, 'username': conn.get('username', ''),
+        'reachable': False, 'latency_ms': None, 'banner': '', 'auth': 'skipped', 'error': '',
+        'checked_at': time.time(),
+    }
+
+    sock = None
+    try:
+        start = time.time()
+        sock = socket.create_connection((ip, port), timeout=CONNECT_TIMEOUT)
+        result['latency_ms'] = round((time.time() - start) * 1000, 1)
+        result['reachable'] = True
+
+        # The server sends its identification string first (RFC 4253, section 4.2)
+        sock.settimeout(CONNECT_TIMEOUT)
+        banner = b''
+        while b'\n' not in banner and len(banner) < 512:
+            chunk = sock.recv(256)
+            if not chunk:
+                break
+            banner += chunk
+        result['banner'] = banner.split(b'\n')[0].decode('utf-8', 'ignore').strip()
+        if not result['banner'].startswith('SSH-'):
+            result['error'] = "Port is open but no SSH banner was received."
+    except socket.timeout:
+        result['error'] = f"Timed out after {CONNECT_TIMEOUT}s."
+    except OSError as e:
+        result['error'] = f"{type(e).__name__}: {e}"
+    finally:
+        if sock:
+            sock.close()
+
+    if auth and result['reachable'] and not result['error']:
+        result['auth'], auth_error = _try_auth(conn, ip, port)
+        if auth_error:
+            result['error'] = auth_error
+    return result
+
+
+def _try_auth(conn: Dict, ip: str, port: int):
+    key_path = conn.get('ssh_key_path') or get_config().get('System', 'ssh_key_path', fallback='')
+    if not key_path or not os.path.exists(key_path):
+        return 'failed', f"Key file missing: {key_path}"
+    client = paramiko.SSHClient()
+    client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+    try:
+        pkey = paramiko.RSAKey.from_private_key_file(key_path)
+        client.connect(hostname=ip, port=port, username=conn.get('username', ''), pkey=pkey,
+                       timeout=AUTH_TIMEOUT, banner_timeout=AUTH_TIMEOUT, auth_timeout=AUTH_TIMEOUT,
+                       look_for_keys=False, allow_agent=False)
+        return 'ok', ''
+    except paramiko.AuthenticationException:
+        return 'failed', "Authentication failed: key not authorized."
+    except Exception as e:
+        return 'failed', f"SSH error: {type(e).__name__} - {e}"
+    finally:
+        client.close()
+
+
+class FleetScanner:
+    """Concurrent reachability scans over the saved connections, with latency history."""
+
+    def __init__(self, path: str = FLEET_STATUS_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._scan_lock = threading.Lock()
+        self._history: Dict[str, deque] = {}
+        self._last_results: Dict[str, Dict] = {}
+        self.scanned_at = 0.0
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            for host, samples in data.get('history', {}).items():
+                self._history[host] = deque(samples, maxlen=HISTORY_LENGTH)
+            self._last_results = data.get('hosts', {})
+            self.scanned_at = data.get('scanned_at', 0.0)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"Fleet scanner: could not read {self.path}: {e}")
+
+    def _save(self):
+        with self._lock:
+            data = {
+                'scanned_at': self.scanned_at,
+                'hosts': dict(self._last_results),
+                'history': {host: list(samples) for host, samples in self._history.items()},
+            }
+        tmp_path = self.path + '.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            print(f"Fleet scanner: could not save {self.path}: {e}")
+
+    def scan(self, connections: List[Dict], auth: bool = False) -> List[Dict]:
+        """Probes all connections concurrently (bounded pool) and records the results."""
+        with self._scan_lock:
+            results = list(_EXECUTOR.map(lambda conn: probe_host(conn, auth=auth), connections))
+            with self._lock:
+                for result in results:
+                    history = self._history.setdefault(result['host'], deque(maxlen=HISTORY_LENGTH))
+                    history.append([round(result['checked_at'], 1), result['latency_ms']])
+                    self._last_results[result['host']] = result
+                self.scanned_at = time.time()
+            self._save()
+        return results
+
+    def status(self, connections: List[Dict], refresh: bool = False, auth: bool = False) -> Dict:
+        """
+        Whole-fleet reachability in one call. Rescans when asked to, when the last scan is older
+        than SCAN_CACHE_SECONDS, or when a saved connection has never been scanned.
+        """
+        unknown = any(host_key(conn) not in self._last_results for conn in connections)
+        if refresh or auth or unknown or time.time() - self.scanned_at > SCAN_CACHE_SECONDS:
+            self.scan(connections, auth=auth)
+
+        hosts = []
+        with self._lock:
+            for conn in connections:
+                key = host_key(conn)
+                entry = dict(self._last_results.get(key, {'host': key}))
+                samples = [latency for _, latency in self._history.get(key, []) if latency is not None]
+                entry['history'] = list(self._history.get(key, []))
+                entry['avg_latency_ms'] = round(sum(samples) / len(samples), 1) if samples else None
+                hosts.append(entry)
+        return {
+            'scanned_at': self.scanned_at,
+            'reachable': sum(1 for h in hosts if h.get('reachable')),
+            'total': len(hosts),
+            'hosts': hosts,
+        }
+
+
+FLEET_SCANNER = FleetScanner()
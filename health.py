@@ -0,0 +1,224 @@
+import time
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Callable, Dict, Optional, Tuple
+
+from config import get_config
+import ssh_utils
+from model_catalog import MODEL_CATALOG
+
+# ===========================
+# === HEALTH CHECK SERVICE ===
+# ===========================
+# Runs the SSH probe and one probe per configured LLM provider concurrently, each with its
+# own deadline. Results are cached per configuration (IP/user/key, URL, API key) for
+# HEALTH_TTL_SECONDS; status changes are reported through the on_change callback.
+# Probes never make generation calls: listing models is enough to validate a key.
+
+HEALTH_TTL_SECONDS = 60
+PROBE_DEADLINES = {'ssh': 12, 'ollama': 6, 'gemini': 12, 'anthropic': 12}
+
+_EXECUTOR = ThreadPoolExecutor(max_workers=4, thread_name_prefix='health')
+
+
+def _status(ok: bool, message: str) -> Dict:
+    return {"status": "success" if ok else "failure", "message": message}
+
+
+def probe_ssh(ip: str, username: str) -> Dict:
+    """Ping + SSH handshake with the configured key."""
+    is_reachable, ping_msg = ssh_utils.check_host_availability(ip)
+    if not is_reachable:
+        return _status(False, f"Cannot reach {ip}.")
+
+    is_connected, ssh_msg = ssh_utils.check_ssh_connection()
+    if is_connected:
+        return _status(True, f"Connected to {username}@{ip}.")
+    return _status(False, f"SSH failed: {ssh_msg}")
+
+
+# Provider probes always query the provider (conditionally where supported) and refresh
+# the model catalogue as a side effect
+PROVIDER_PROBES = {
+    provider: functools.partial(MODEL_CATALOG.refresh, provider)
+    for provider in ('ollama', 'gemini', 'anthropic')
+}
+
+
+def _provider_credential(cfg, provider: str) -> str:
+    if provider == 'ollama':
+        return cfg.get('Ollama', 'api_url', fallback='').strip()
+    return cfg.get('General', f'{provider}_api_key', fallback='').strip()
+
+
+def llm_status_from_probe(provider: str, model_name: str, result: Tuple) -> Dict:
+    """Turns a provider probe result (ok, msg, models) into the status shown in the UI."""
+    is_connected, msg, models = result
+    if not is_connected:
+        return _status(False, msg)
+    if provider == 'ollama':
+        if model_name in models:
+            return _status(True, f"Ollama: {model_name} ready.")
+        return _status(False, f"Model {model_name} not found in Ollama.")
+    if provider == 'gemini':
+        # Gemini model names are returned as 'models/<name>'
+        if any(model_name in m for m in models):
+            return _status(True, f"Gemini: {model_name} ready.")
+        return _status(False, f"Model {model_name} not available.")
+    if model_name in models:
+        return _status(True, f"Anthropic: {model_name} ready.")
+    return _status(False, f"Model {model_name} not available.")
+
+
+class HealthChecker:
+    """
+    Concurrent SSH/LLM health checks with per-probe deadlines and a TTL cache.
+    on_change(kind, status) is called when the 'ssh' or 'llm' status changes.
+    spawn(func) starts a background task (used for refreshes triggered by stale reads).
+    """
+
+    def __init__(self, on_change: Optional[Callable] = None, spawn: Optional[Callable] = None,
+                 ttl: float = HEALTH_TTL_SECONDS):
+        self.on_change = on_change
+        self.spawn = spawn
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._cache: Dict[Tuple, Tuple[float, object]] = {}
+        self._status = {
+            'ssh': {"status": "unknown", "message": "Checking connection..."},
+            'llm': {"status": "unknown", "message": "Checking connection..."},
+        }
+        self._checked_at = 0.0
+        self._refreshing = False
+
+    # === Probes ===
+
+    def _run_probes(self, probes: Dict[Tuple, Tuple[Callable, tuple, float]], force: bool) -> Dict[Tuple, object]:
+        """
+        probes: {cache_key: (func, args, deadline_seconds)}. Fresh cached results are reused
+        unless force is set; the rest run concurrently. A probe that misses its deadline
+        yields None (its thread is left to finish on its own).
+        """
+        now = time.time()
+        results, futures = {}, {}
+        with self._lock:
+            for key, (func, args, deadline) in probes.items():
+                cached = self._cache.get(key)
+                if cached and not force and now - cached[0] < self.ttl:
+                    results[key] = cached[1]
+                else:
+                    futures[key] = (_EXECUTOR.submit(func, *args), now + deadline)
+
+        for key, (future, deadline_at) in futures.items():
+            try:
+                result = future.result(timeout=max(0.0, deadline_at - time.time()))
+            except FutureTimeoutError:
+                print(f"Health check {key[0]} missed its deadline ({PROBE_DEADLINES.get(key[0])}s).")
+                results[key] = None
+                continue
+            except Exception as e:
+                print(f"Health check {key[0]} failed: {e}")
+                result = (False, f"Check failed: {e}", []) if key[0] != 'ssh' else _status(False, f"SSH check failed: {e}")
+            results[key] = result
+            with self._lock:
+                self._cache[key] = (time.time(), result)
+        return results
+
+    def _ssh_probe(self, cfg) -> Tuple[Optional[Tuple], Optional[Dict]]:
+        """Returns (probe spec, immediate status) for the SSH target."""
+        ip = cfg.get('System', 'ip_address', fallback='').strip()
+        username = cfg.get('System', 'username', fallback='').strip()
+        if not ip or not username:
+            return None, _status(False, "System IP or Username not configured.")
+        key = ('ssh', ip, username, cfg.get('System', 'ssh_key_path', fallback='').strip(),
+               cfg.get('System', 'ssh_port', fallback='22'))
+        return (key, (probe_ssh, (ip, username), PROBE_DEADLINES['ssh'])), None
+
+    def _provider_probes(self, cfg) -> Dict[Tuple, Tuple]:
+        """One probe per provider that has a URL / API key configured."""
+        probes = {}
+        for provider, func in PROVIDER_PROBES.items():
+            credential = _provider_credential(cfg, provider)
+            if credential:
+                probes[(provider, credential)] = (func, (credential,), PROBE_DEADLINES[provider])
+        return probes
+
+    def _llm_status(self, cfg, results: Dict[Tuple, object]) -> Dict:
+        provider = cfg.get('General', 'provider', fallback='').strip()
+        model_name = cfg.get('Agent', 'model_name', fallback='').strip()
+        if not provider:
+            return _status(False, "Provider not configured.")
+        if not model_name:
+            return _status(False, "Model not selected.")
+        if provider not in PROVIDER_PROBES:
+            return _status(False, f"Unknown provider: {provider}")
+        credential = _provider_credential(cfg, provider)
+        if not credential:
+            labels = {'ollama': "Ollama URL", 'gemini': "Gemini API Key", 'anthropic': "Anthropic API Key"}
+            return _status(False, f"{labels[provider]} not configured.")
+        result = results.get((provider, credential))
+        if result is None:
+            return _status(False, f"{provider.capitalize()} check timed out after {PROBE_DEADLINES[provider]}s.")
+        return llm_status_from_probe(provider, model_name, result)
+
+    # === Public API ===
+
+    def check_all(self, force: bool = False) -> Tuple[Dict, Dict]:
+        """Runs the SSH and all provider probes concurrently. Returns (ssh_status, llm_status)."""
+        cfg = get_config()
+        probes = self._provider_probes(cfg)
+        ssh_probe, ssh_status = self._ssh_probe(cfg)
+        if ssh_probe:
+            probes[ssh_probe[0]] = ssh_probe[1]
+
+        results = self._run_probes(probes, force)
+
+        if ssh_probe:
+            ssh_status = results.get(ssh_probe[0]) or _status(False, f"SSH check timed out after {PROBE_DEADLINES['ssh']}s.")
+        llm_status = self._llm_status(cfg, results)
+        self._checked_at = time.time()
+        self._update('ssh', ssh_status)
+        self._update('llm', llm_status)
+        return ssh_status, llm_status
+
+    def check_ssh(self, force: bool = False) -> Dict:
+        cfg = get_config()
+        ssh_probe, status = self._ssh_probe(cfg)
+        if ssh_probe:
+            results = self._run_probes(dict([ssh_probe]), force)
+            status = results.get(ssh_probe[0]) or _status(False, f"SSH check timed out after {PROBE_DEADLINES['ssh']}s.")
+        self._update('ssh', status)
+        return status
+
+    def check_llm(self, force: bool = False) -> Dict:
+        cfg = get_config()
+        status = self._llm_status(cfg, self._run_probes(self._provider_probes(cfg), force))
+        self._update('llm', status)
+        return status
+
+    def get_status(self, kind: str) -> Dict:
+        """Returns the last known status; starts a background refresh when it is older than the TTL."""
+        if self.spawn and time.time() - self._checked_at > self.ttl:
+            with self._lock:
+                start_refresh = not self._refreshing
+                self._refreshing = True
+            if start_refresh:
+                self.spawn(self._background_refresh)
+        return self._status[kind]
+
+    def _background_refresh(self):
+        try:
+            self.check_all()
+        finally:
+            self._refreshing = False
+
+    def _update(self, kind: str, status: Dict):
+        with self._lock:
+            changed = self._status.get(kind) != status
+            self._status[kind] = status
+        if changed and self.on_change:
+            try:
+                self.on_change(kind, status)
+            except Exception as e:
+                print(f"Health status callback failed: {e}")
@@ -0,0 +1,125 @@
+import gzip
+import hashlib
+import uuid
+from functools import wraps
+from typing import Callable
+
+from flask import request, Response
+
+try:
+    import brotli
+except ImportError:    # Optional: without it only gzip is offered
+    brotli = None
+
+# ===========================
+# === HTTP TRANSPORT ===
+# ===========================
+# Bandwidth savers for the large log / view payloads (VPN links):
+#   - compression: JSON and text responses above MIN_COMPRESS_BYTES are sent br or gzip,
+#     negotiated from Accept-Encoding (streamed responses such as the session ZIP are left alone)
+#   - conditional views: @versioned_view routes get an ETag built from the version of the data
+#     behind them; a poll with a matching If-None-Match gets 304 without the view being rendered.
+# WebSocket frames are compressed by the websocket server itself (permessage-deflate is
+# negotiated by both eventlet and simple-websocket when the browser offers it).
+
+MIN_COMPRESS_BYTES = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5                  # Fast enough for per-request compression of ~1 MB views
+COMPRESSIBLE_MIMETYPES = ('application/json', 'text/plain', 'text/html', 'text/css', 'application/javascript')
+
+# ETags of one process are never valid in the next one (versions restart with the process)
+BOOT_ID = uuid.uuid4().hex[:8]
+
+
+def _negotiate_encoding() -> str:
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br']:
+        return 'br'
+    if accepted['gzip']:
+        return 'gzip'
+    return ''
+
+
+def compress_response(response: Response) -> Response:
+    """after_request hook: compresses the body when the client accepts it."""
+    if (response.direct_passthrough or response.is_streamed or response.status_code != 200
+            or 'Content-Encoding' in response.headers or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = _negotiate_encoding()
+    if not encoding:
+        return response
+    body = response.get_data()
+    if len(body) < MIN_COMPRESS_BYTES:
+        return response
+    if encoding == 'br':
+        compressed = brotli.compress(body, quality=BROTLI_QUALITY)
+    else:
+        compressed = gzip.compress(body, compresslevel=GZIP_LEVEL)
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = encoding
+    if response.headers.get('ETag'):
+        # Different bytes than the identity representation, so a different (weak) validator
+        response.set_etag(f"{response.get_etag()[0]}-{encoding}", weak=True)
+    return response
+
+
+def init_compression(app):
+    app.after_request(compress_response)
+
+
+def versioned_view(version_of: Callable[[], object]):
+    """
+    Decorator for view routes whose output only depends on the query string and on
+    version_of() (a log sequence, a file stat, ...). Unchanged polls get 304 Not Modified.
+    version_of() may return None when the version is unknown: the view is then always rendered.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            try:
+                version = version_of()
+            except Exception as e:
+                print(f"Could not compute view version for {request.path}: {e}")
+                return view(*args, **kwargs)
+            if version is None:
+                return view(*args, **kwargs)
+            key = f"{BOOT_ID}|{request.full_path}|{version}"
+            etag = hashlib.sha1(key.encode('utf-8')).hexdigest()[:20]
+            # Compressed variants carry a suffix; any of them validates the same data
+            if any(tag.split('-')[0] == etag for tag in request.if_none_match.as_set(True)):
+                not_modified = Response(status=304)
+                not_modified.set_etag(etag, weak=True)
+                not_modified.headers['Cache-Control'] = 'no-cache'
+                return not_modified
+            response = view(*args, **kwargs)
+            if isinstance(response, Response) and response.status_code == 200:
+                response.set_etag(etag, weak=True)
+                # Cached but always revalidated: the browser sends If-None-Match on every poll
+                response.headers['Cache-Control'] = 'no-cache'
+            return response
+        return wrapper
+    return decorator
+
+
+# --- Bloc optional pentru testare ---
+if __name__ == '__main__':
+    from flask import Flask, jsonify
+
+    app = Flask(__name__)
+    init_compression(app)
+    state = {'version': 1}
+
+    @app.route('/view')
+    @versioned_view(lambda: state['version'])
+    def view():
+        return jsonify({'data': "line\n" * 5000})
+
+    client = app.test_client()
+    first = client.get('/view', headers={'Accept-Encoding': 'gzip'})
+    assert first.headers['Content-Encoding'] == 'gzip' and len(first.data) < 1000
+    etag = first.headers['ETag']
+    assert client.get('/view', headers={'If-None-Match': etag, 'Accept-Encoding': 'gzip'}).status_code == 304
+    state['version'] = 2
+    assert client.get('/view', headers={'If-None-Match': etag}).status_code == 200
+    print("HTTP transport checks passed.", len(first.data), etag)
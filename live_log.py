@@ -0,0 +1,186 @@
+import time
+import threading
+from collections import deque
+from typing import Dict, List, Optional
+
+# ===========================
+# === LIVE LOG ===
+# ===========================
+# In-memory log of the messages shown in the Execution Log panel (log_and_emit and the UI
+# handlers). Bounded ring buffer of entries with a byte cap: old entries are evicted, the
+# full history stays in the on-disk event log (log_manager). The filtered 'Live' view is
+# computed once per message at append time, so a client connect only joins the buffer.
+# VmOutputStore is the same buffer for the VM Screen text (no filtered view).
+
+LIVE_LOG_MAX_BYTES = 1024 * 1024    # UTF-8 bytes kept in memory (messages + filtered lines)
+VM_OUTPUT_MAX_BYTES = 512 * 1024    # VM Screen text kept in memory (and in session.json)
+DEFAULT_PAGE_SIZE = 500             # Entries per page (initial_state and /live_log)
+
+# Cuvinte cheie care indica o linie de afisat in log-ul filtrat
+LOG_FILTER_KEYWORDS = (
+    '===', '---', 'STEP', 'COMMAND:', 'Executing Command:', 'REASON:',
+    'REPORT:', 'ASK:', 'Validating command', 'Auto-Rejected',
+    'Auto-Validated', 'Pager disabled', 'Intervention:', 'Human Response:',
+    'ERROR:', 'CRITICAL:', 'FATAL:', 'Exception:', 'Timeout:', 'Objective updated'
+)
+
+
+def filter_log_lines(text: str) -> str:
+    """Extrage doar liniile relevante (comenzi, pasi, etc.) pentru afisajul live."""
+    return "\n".join(line for line in text.splitlines() if line.strip().startswith(LOG_FILTER_KEYWORDS))
+
+
+class LiveLog:
+    """Thread-safe ring buffer of log messages: (seq, ts, text, filtered text)."""
+
+    SEPARATOR = "\n"       # Between entries when the buffer is read as one text
+
+    def __init__(self, max_bytes: int = LIVE_LOG_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = deque()
+        self._bytes = 0
+        self._next_seq = 1
+        self._evicted = False      # True once older messages exist only on disk
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_text(cls, text: str, truncated: bool = False, max_bytes: int = LIVE_LOG_MAX_BYTES) -> 'LiveLog':
+        """Seeds a live log with text loaded from disk (one entry per line)."""
+        live_log = cls(max_bytes)
+        live_log.reset(text, truncated)
+        return live_log
+
+    def _filter(self, text: str) -> str:
+        return filter_log_lines(text)
+
+    def _split(self, text: str) -> List[str]:
+        return text.splitlines()
+
+    def _append_locked(self, text: str, ts: float):
+        if len(text) > self.max_bytes:
+            text = text[-self.max_bytes:]
+        filtered = self._filter(text)
+        size = len(text.encode('utf-8')) + len(filtered.encode('utf-8'))
+        self._entries.append((self._next_seq, ts, text, filtered, size))
+        self._next_seq += 1
+        self._bytes += size
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            self._bytes -= self._entries.popleft()[4]
+            self._evicted = True
+
+    def append(self, message: str):
+        with self._lock:
+            self._append_locked(message, time.time())
+
+    def reset(self, text: str = "", truncated: bool = False):
+        """Replaces the content (session load / memory reset). Sequence numbers keep increasing."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self._evicted = truncated
+            self._next_seq += 1    # The version changes even if the new content is empty
+            now = time.time()
+            for line in self._split(text[-self.max_bytes:]):
+                self._append_locked(line, now)
+
+    def text(self, view: str = 'full') -> str:
+        """The whole buffer ('full') or only its filtered lines ('filtered')."""
+        with self._lock:
+            if view == 'filtered':
+                return "\n".join(entry[3] for entry in self._entries if entry[3])
+            return self.SEPARATOR.join(entry[2] for entry in self._entries)
+
+    def tail(self, max_chars: int) -> str:
+        """The newest max_chars characters of the buffer (without joining all of it)."""
+        with self._lock:
+            parts, size = [], 0
+            for entry in reversed(self._entries):
+                parts.append(entry[2])
+                size += len(entry[2]) + len(self.SEPARATOR)
+                if size >= max_chars:
+                    break
+            return self.SEPARATOR.join(reversed(parts))[-max_chars:]
+
+    @property
+    def version(self) -> int:
+        """Sequence number of the newest entry (changes on every append / reset)."""
+        with self._lock:
+            return self._next_seq - 1
+
+    @property
+    def size(self) -> int:
+        with self._lock:
+            return self._bytes
+
+    def page(self, before: Optional[int] = None, limit: int = DEFAULT_PAGE_SIZE, view: str = 'filtered') -> Dict:
+        """
+        The newest 'limit' entries older than seq 'before' (oldest first). In the filtered view
+        entries without relevant lines are skipped. 'before' of the result pages further back.
+        """
+        with self._lock:
+            entries: List[Dict] = []
+            index = len(self._entries) - 1
+            while index >= 0 and len(entries) < limit:
+                seq, ts, text, filtered, _ = self._entries[index]
+                index -= 1
+                if before is not None and seq >= before:
+                    continue
+                value = filtered if view == 'filtered' else text
+                if value:
+                    entries.append({'seq': seq, 'ts': ts, 'text': value})
+            entries.reverse()
+            has_more = index >= 0
+            return {
+                'entries': entries,
+                'before': entries[0]['seq'] if entries else before,
+                'has_more': has_more,
+                'evicted': self._evicted,
+            }
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {'entries': len(self._entries), 'bytes': self._bytes, 'max_bytes': self.max_bytes}
+
+
+class VmOutputStore(LiveLog):
+    """Bounded, indexed VM Screen text: chunks are appended as-is (commands, outputs)."""
+
+    SEPARATOR = ""
+
+    def __init__(self, max_bytes: int = VM_OUTPUT_MAX_BYTES):
+        super().__init__(max_bytes)
+
+    @classmethod
+    def from_text(cls, text: str, truncated: bool = False, max_bytes: int = VM_OUTPUT_MAX_BYTES) -> 'VmOutputStore':
+        return super().from_text(text or "", truncated, max_bytes)
+
+    def _filter(self, text: str) -> str:
+        return ""
+
+    def _split(self, text: str) -> List[str]:
+        return text.splitlines(keepends=True)
+
+
+# --- Bloc optional pentru testare ---
+if __name__ == '__main__':
+    live_log = LiveLog(max_bytes=2000)
+    for i in range(200):
+        live_log.append(f"--- STEP {i} ---\nthinking...")
+    stats = live_log.stats()
+    assert stats['bytes'] <= 2000 and stats['entries'] < 200, stats
+    assert "thinking" not in live_log.text('filtered')
+
+    first = live_log.page(limit=5)
+    older = live_log.page(before=first['before'], limit=5)
+    assert [e['seq'] for e in older['entries']][-1] == first['entries'][0]['seq'] - 1
+    assert first['evicted'] and first['has_more']
+
+    live_log.reset("--- AGENT MEMORY RESET ---")
+    assert live_log.text() == "--- AGENT MEMORY RESET ---"
+
+    vm_output = VmOutputStore.from_text("root@vm~# ls\nfile1\n", max_bytes=1000)
+    for i in range(100):
+        vm_output.append(f"root@vm~# echo {i}\n{i}\n")
+    assert vm_output.size <= 1000 and vm_output.text().endswith("root@vm~# echo 99\n99\n")
+    assert vm_output.tail(6) == "\n99\n99\n"[-6:] and vm_output.version == 103
+    print("Live log checks passed.", stats)
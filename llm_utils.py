@@ -1,22 +1,145 @@
+import time
+import importlib
 import requests
-import google.generativeai as genai
 import traceback
-from langchain_anthropic import ChatAnthropic
+from metrics import record_llm_call
+
+# --- Provider Registry ---
+# Provider SDKs are heavy to import (several seconds together), so each one is
+# imported on first use only; a deployment that uses one provider never loads the others.
+
+PROVIDER_CLASSES = {
+    'ollama': ('langchain_community.llms', 'Ollama'),
+    'gemini': ('langchain_google_genai', 'ChatGoogleGenerativeAI'),
+    'anthropic': ('langchain_anthropic', 'ChatAnthropic'),
+}
+_LOADED_CLASSES = {}
+
+
+def get_provider_class(provider: str):
+    """Returns the LangChain class for a provider, importing its module on first use."""
+    if provider not in PROVIDER_CLASSES:
+        raise ValueError(f"Unsupported LLM provider: {provider}")
+    cls = _LOADED_CLASSES.get(provider)
+    if cls is None:
+        module_name, class_name = PROVIDER_CLASSES[provider]
+        start = time.time()
+        cls = getattr(importlib.import_module(module_name), class_name)
+        _LOADED_CLASSES[provider] = cls
+        print(f"LLM provider '{provider}' loaded in {(time.time() - start) * 1000:.0f} ms")
+    return cls
+
+
+def create_llm(provider: str, model: str, api_key: str = '', base_url: str = '', temperature=None, timeout=None, **kwargs):
+    """
+    Creates a LangChain LLM client for the given provider.
+    Raises ValueError for unknown providers.
+    """
+    cls = get_provider_class(provider)
+    if provider == 'ollama':
+        if timeout is not None:
+            kwargs['timeout'] = timeout
+        return cls(model=model, base_url=base_url, **kwargs)
+    if provider == 'gemini':
+        if temperature is not None:
+            kwargs['generation_config'] = {"temperature": temperature}
+        return cls(model=model, google_api_key=api_key, **kwargs)
+    # anthropic
+    if temperature is not None:
+        kwargs['temperature'] = temperature
+    return cls(model=model, api_key=api_key, **kwargs)
+
+
+# Providers whose LangChain chat model supports bind_tools (Ollama uses JSON mode instead)
+TOOL_CALLING_PROVIDERS = ('anthropic', 'gemini')
+
+
+def bind_action_tools(llm, provider: str, tools: list):
+    """
+    Returns the LLM bound to the given tools, forced to call one of them where the provider
+    supports tool_choice. Returns None when native tool calling is not available.
+    """
+    if provider not in TOOL_CALLING_PROVIDERS or not hasattr(llm, 'bind_tools'):
+        return None
+    try:
+        return llm.bind_tools(tools, tool_choice='any')
+    except Exception as e:
+        # Older integrations reject tool_choice; tools alone still give tool calls most of the time
+        print(f"bind_tools with tool_choice failed ({e}); binding tools without it.")
+    try:
+        return llm.bind_tools(tools)
+    except Exception as e:
+        print(f"Native tool calling unavailable for {provider}: {e}")
+        return None
+
+
+def response_text(response) -> str:
+    """Text of an LLM reply: chat message content (string or list of content blocks) or the plain string."""
+    content = getattr(response, 'content', response)
+    if isinstance(content, list):
+        return "".join(block.get('text', '') if isinstance(block, dict) else str(block) for block in content)
+    return str(content)
+
+
+def _genai():
+    """google.generativeai, imported on first use."""
+    return importlib.import_module('google.generativeai')
+
+
+def _conditional_headers(validators) -> dict:
+    """If-None-Match / If-Modified-Since headers from a previous response's validators."""
+    headers = {}
+    if validators:
+        if validators.get('etag'):
+            headers['If-None-Match'] = validators['etag']
+        if validators.get('last_modified'):
+            headers['If-Modified-Since'] = validators['last_modified']
+    return headers
+
+
+def _store_validators(response, validators):
+    if validators is not None:
+        validators['etag'] = response.headers.get('ETag', '')
+        validators['last_modified'] = response.headers.get('Last-Modified', '')
 
 # --- LLM Utility Functions ---
 
-def check_ollama_connection(api_url: str):
+def invoke_llm(llm, prompt, provider: str, role: str, **kwargs):
+    """
+    Calls llm.invoke() and records latency, outcome and token metrics.
+    role: 'agent', 'validator', 'summarizer', 'chat' or 'search'.
+    """
+    target = getattr(llm, 'bound', llm)  # Tool-bound models are RunnableBindings around the client
+    model = getattr(target, 'model', None) or getattr(target, 'model_name', None) or 'unknown'
+    start = time.time()
+    response = None
+    status = 'ok'
+    try:
+        response = llm.invoke(prompt, **kwargs)
+        return response
+    except Exception:
+        status = 'error'
+        raise
+    finally:
+        record_llm_call(provider or 'unknown', str(model), role, time.time() - start, status, prompt, response)
+
+def check_ollama_connection(api_url: str, validators: dict = None):
     """
     Checks if the Ollama API is reachable and returns available models.
     Returns (True, "Success message", [models]) or (False, "Error message", []).
+    With validators (ETag/Last-Modified of a previous call, updated in place) the request is
+    conditional and an unchanged list returns (True, "Not modified.", None).
     """
     if not api_url:
         return False, "Ollama API URL cannot be empty.", []
     
     try:
         # The /api/tags endpoint lists all local models
-        response = requests.get(f"{api_url}/api/tags", timeout=5)
+        response = requests.get(f"{api_url}/api/tags", headers=_conditional_headers(validators), timeout=5)
+        if response.status_code == 304:
+            return True, "Not modified.", None
         response.raise_for_status() # Raise an exception for bad status codes (4xx, 5xx)
+        _store_validators(response, validators)
         
         models_data = response.json()
         model_names = [model['name'] for model in models_data.get('models', [])]
@@ -46,6 +169,7 @@ def check_gemini_connection(api_key: str):
         return False, "Gemini API Key cannot be empty.", []
         
     try:
+        genai = _genai()
         genai.configure(api_key=api_key)
         
         # List models and filter for those that support 'generateContent'
@@ -64,10 +188,11 @@ def check_gemini_connection(api_key: str):
         traceback.print_exc()
         return False, f"Gemini API Key validation failed: {str(e)}", []
 
-def check_anthropic_connection(api_key: str):
+def check_anthropic_connection(api_key: str, validators: dict = None):
     """
     Checks Anthropic API key validity and FETCHES the dynamic model list from their API.
     Returns (True, "Success", [models]) or (False, "Error", []).
+    validators: same conditional-request behaviour as check_ollama_connection.
     """
     if not api_key:
         return False, "Anthropic API Key cannot be empty.", []
@@ -79,12 +204,17 @@ def check_anthropic_connection(api_key: str):
             "x-api-key": api_key,
             "anthropic-version": "2023-06-01"
         }
+        headers.update(_conditional_headers(validators))
         # We use standard requests since langchain might not wrap the list endpoint yet
-        response = requests.get("https://api.anthropic.com/v1/models", headers=headers, timeout=10)
+        # (limit=1000: the endpoint is paginated with a default page size of 20)
+        response = requests.get("https://api.anthropic.com/v1/models", params={"limit": 1000}, headers=headers, timeout=10)
 
+        if response.status_code == 304:
+            return True, "Not modified.", None
         if response.status_code != 200:
             return False, f"Anthropic API Error: {response.status_code} - {response.text}", []
 
+        _store_validators(response, validators)
         data = response.json()
 
         # Extract model IDs (filter for actual models if needed)
@@ -93,12 +223,8 @@ def check_anthropic_connection(api_key: str):
         if not models:
             return False, "API Key valid but no models returned by Anthropic.", []
 
-        # 2. Optional: Quick generation test (sanity check)
-        # Use the first available model to verify generation rights
-        test_model = models[0]
-        llm = ChatAnthropic(model=test_model, api_key=api_key, max_tokens=1)
-        llm.invoke("Hi")
-
+        # A successful authenticated model listing already validates the key;
+        # no generation call is made (it would cost tokens and add seconds to every check)
         return True, f"Anthropic connected. Found {len(models)} models.", sorted(models)
 
     except Exception as e:
@@ -1,359 +1,827 @@
 import os
 import re
+import copy
 import json
+import atexit
+import gzip
+import uuid
+import shutil
+import threading
+from collections import deque
 from datetime import datetime
-from typing import Dict, List, Optional, Tuple, Any
-from config import KEYS_DIR, APP_DIR, EXECUTION_LOG_LLM_CONTEXT_PATH, CHAT_LOG_FILE_PATH, ACTION_PLAN_FILE_PATH
+from typing import Dict, List, Optional, Tuple, Any, Iterator
+from config import (
+    KEYS_DIR, APP_DIR, EXECUTION_LOG_LLM_CONTEXT_PATH, CHAT_LOG_FILE_PATH, CHAT_LOG_LEGACY_PATH, ACTION_PLAN_FILE_PATH,
+    EXECUTION_LOG_FILE_PATH, EXECUTION_EVENT_LOG_PATH, EXECUTION_LOG_SEGMENTS_DIR
+)
 
 # ===========================
 # === LOG PATHS ===
 # ===========================
 
-EXECUTION_LOG_PATH = os.path.join(KEYS_DIR, 'execution_log.txt')
+EXECUTION_LOG_PATH = EXECUTION_LOG_FILE_PATH
+EVENT_LOG_PATH = EXECUTION_EVENT_LOG_PATH  # single-file log, migrated into segments
+
+# Active segment is rotated (and gzip-compressed) once it reaches this size
+SEGMENT_MAX_BYTES = 4 * 1024 * 1024
 
 # Ensure keys directory exists
 os.makedirs(KEYS_DIR, exist_ok=True)
 
 
+# ===========================
+# === EVENT SCHEMA ===
+# ===========================
+# Every line of execution_log.jsonl is one record:
+# {"v": 1, "seq": 12, "ts": "2026-01-10T09:21:12", "task_id": "...", "step": 3, "type": "command_executed", ...}
+# Type-specific fields are listed next to each type. Fields are only ever added, never renamed.
+
+EVENT_SCHEMA_VERSION = 1
+
+EVENT_TASK_STARTED = 'task_started'            # objective, system_info, target
+EVENT_STEP_STARTED = 'step_started'            # -
+EVENT_REASON = 'reason'                        # text
+EVENT_COMMAND_PROPOSED = 'command_proposed'    # command
+EVENT_VALIDATOR_RESULT = 'validator_result'    # approved, mode, reason
+EVENT_COMMAND_EXECUTED = 'command_executed'    # command, target
+EVENT_COMMAND_OUTPUT = 'command_output'        # output, success
+EVENT_STEP_ENDED = 'step_ended'                # -
+EVENT_TASK_COMPLETED = 'task_completed'        # report
+EVENT_ASK_QUESTION = 'ask_question'            # question, reason
+EVENT_ASK_ANSWER = 'ask_answer'                # answer
+EVENT_INTERVENTION = 'intervention'            # kind, details
+EVENT_SEARCH = 'search'                        # query, results
+EVENT_FILE_CONTENT = 'file_content'            # path, content
+EVENT_SSH_CONNECTION_CHANGED = 'ssh_connection_changed'  # username, ip, previous_username, previous_ip
+EVENT_MANUAL_EDIT = 'manual_edit'              # -
+EVENT_NOTE = 'note'                            # text (free text imported from legacy logs)
+
+
+def new_task_id() -> str:
+    """Unique, time-ordered task identifier shared by the event log and the task trace."""
+    return f"{datetime.now().strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:6]}"
+
+
+def render_event_text(event: Dict) -> str:
+    """Render one event in the classic execution_log.txt text format."""
+    etype = event.get('type')
+
+    if etype == EVENT_TASK_STARTED:
+        return (f"\n=== NEW TASK STARTED ===\nObjective: {event.get('objective', '')}\n"
+                f"System Info: {event.get('system_info', '')}\n=========================\n\n")
+    if etype == EVENT_STEP_STARTED:
+        return f"--- STEP {event.get('step', 0)} ---\n"
+    if etype == EVENT_REASON:
+        return f"REASON: {event.get('text', '')}\n"
+    if etype == EVENT_COMMAND_PROPOSED:
+        return f"COMMAND TO EXECUTE: {event.get('command', '')}\n"
+    if etype == EVENT_VALIDATOR_RESULT:
+        if event.get('approved'):
+            if event.get('mode') == 'independent':
+                return "VALIDATOR: APPROVED (Independent mode)\n"
+            return "VALIDATOR: APPROVED by user (Assisted mode)\n"
+        return f"VALIDATOR: REJECTED - {event.get('reason', '')}\n"
+    if etype == EVENT_COMMAND_EXECUTED:
+        return f"COMMAND EXECUTED: {event.get('command', '')}\n"
+    if etype == EVENT_COMMAND_OUTPUT:
+        return f"OUTPUT:\n{_output_text(event)}\n"
+    if etype == EVENT_STEP_ENDED:
+        return "--- STEP END ---\n\n"
+    if etype == EVENT_TASK_COMPLETED:
+        return f"=== TASK COMPLETED ===\nREPORT: {event.get('report', '')}\n=======================\n\n"
+    if etype == EVENT_ASK_QUESTION:
+        text = f"REASON: {event['reason']}\n" if event.get('reason') else ""
+        return text + f"ASK: {event.get('question', '')}\n"
+    if etype == EVENT_ASK_ANSWER:
+        return f"HUMAN RESPONSE: {event.get('answer', '')}\n"
+    if etype == EVENT_INTERVENTION:
+        return f"INTERVENTION: {event.get('kind', '')} - {event.get('details', '')}\n"
+    if etype == EVENT_SEARCH:
+        return f"--- SEARCH ---\nQuery: {event.get('query', '')}\nResults:\n{event.get('results', '')}\n--- SEARCH END ---\n\n"
+    if etype == EVENT_FILE_CONTENT:
+        return (f"--- FILE CONTENT WRITTEN TO {event.get('path', '')} ---\n"
+                f"{event.get('content', '')}\n--- END FILE CONTENT ---\n\n")
+    if etype == EVENT_SSH_CONNECTION_CHANGED:
+        text = f"\n=== SSH CONNECTION CHANGED ===\nTimestamp: {_display_timestamp(event.get('ts'))}\n"
+        if event.get('previous_username') and event.get('previous_ip'):
+            text += f"Previous: {event['previous_username']}@{event['previous_ip']}\n"
+        else:
+            text += "Previous: (none - first connection)\n"
+        text += f"Current: {event.get('username', '')}@{event.get('ip', '')}\n"
+        return text + "==============================\n\n"
+    if etype == EVENT_MANUAL_EDIT:
+        return ("\n\n=== USER MANUALLY EDITED MEMORY/CONTEXT ===\n"
+                "Note: The user has rewritten the agent's memory at this point.\n"
+                "===========================================\n\n")
+    if etype == EVENT_NOTE:
+        return f"{event.get('text', '')}\n"
+    return ""
+
+
+def _output_text(event: Dict) -> str:
+    """Output body of a command_output event (with the classic empty-output messages)."""
+    output = event.get('output', '')
+    if output.strip():
+        return output
+    if event.get('success'):
+        return "Success: Command executed with no output."
+    return "Error: Command failed with no output."
+
+
+def _display_timestamp(ts: Optional[str]) -> str:
+    """Convert an ISO event timestamp to the 'YYYY-MM-DD HH:MM:SS' format used in the text log."""
+    try:
+        return datetime.fromisoformat(ts).strftime("%Y-%m-%d %H:%M:%S")
+    except (TypeError, ValueError):
+        return ts or ""
+
+
+def _parse_target_from_system_info(system_info: str) -> Tuple[Optional[str], Optional[str]]:
+    """Extract (username, ip) from the System Info string written at task start."""
+    # Match user: username or user: HOSTNAME\username (Windows format)
+    user_match = re.search(r'user:\s*(?:[\w-]+\\)?(\w+)', system_info, re.IGNORECASE)
+    ip_match = re.search(r'IP:\s*([\d\.]+)', system_info)
+    return (user_match.group(1) if user_match else None,
+            ip_match.group(1) if ip_match else None)
+
+
+def _import_legacy_text(text: str) -> List[Dict]:
+    """
+    One-time conversion of a legacy free-text execution_log.txt into typed events.
+    Lines that do not belong to a known block are kept as 'note' events.
+    """
+    events = []
+    lines = text.splitlines()
+    username, ip = "user", "remote"
+    step = 0
+    i = 0
+
+    def add(etype, **fields):
+        events.append(dict(fields, type=etype, step=step))
+
+    def collect_until(start, *terminators):
+        """Collects lines from start until a line starting with a terminator. Returns (lines, next_index)."""
+        body = []
+        j = start
+        while j < len(lines) and not any(lines[j].strip().startswith(t) for t in terminators):
+            body.append(lines[j])
+            j += 1
+        return body, j
+
+    while i < len(lines):
+        line = lines[i]
+        stripped = line.strip()
+
+        if stripped.startswith("=== NEW TASK STARTED ==="):
+            objective = system_info = ""
+            i += 1
+            while i < len(lines) and not lines[i].strip().startswith("====="):
+                if lines[i].strip().startswith("Objective:"):
+                    objective = lines[i].strip().replace("Objective:", "", 1).strip()
+                elif lines[i].strip().startswith("System Info:"):
+                    system_info = lines[i].strip().replace("System Info:", "", 1).strip()
+                i += 1
+            step = 0
+            parsed_user, parsed_ip = _parse_target_from_system_info(system_info)
+            username, ip = parsed_user or "user", parsed_ip or "remote"
+            add(EVENT_TASK_STARTED, objective=objective, system_info=system_info, target=f"{username}@{ip}")
+        elif stripped.startswith("=== SSH CONNECTION CHANGED ==="):
+            fields = {'username': '', 'ip': '', 'previous_username': '', 'previous_ip': ''}
+            i += 1
+            while i < len(lines) and not lines[i].strip().startswith("====="):
+                current = re.match(r'(Current|Previous):\s*([^@\s]+)@(\S+)', lines[i].strip())
+                if current:
+                    prefix = '' if current.group(1) == 'Current' else 'previous_'
+                    fields[prefix + 'username'], fields[prefix + 'ip'] = current.group(2), current.group(3)
+                i += 1
+            if fields['username']:
+                username, ip = fields['username'], fields['ip']
+            add(EVENT_SSH_CONNECTION_CHANGED, **fields)
+        elif stripped.startswith("=== USER MANUALLY EDITED"):
+            i += 1
+            while i < len(lines) and not lines[i].strip().startswith("====="):
+                i += 1
+            add(EVENT_MANUAL_EDIT)
+        elif stripped.startswith("=== TASK COMPLETED ==="):
+            body, i = collect_until(i + 1, "=====")
+            report = "\n".join(body)
+            add(EVENT_TASK_COMPLETED, report=report[len("REPORT:"):].strip() if report.startswith("REPORT:") else report)
+        elif stripped.startswith("--- STEP END ---"):
+            add(EVENT_STEP_ENDED)
+        elif re.match(r'--- STEP (\d+) ---', stripped):
+            step = int(re.match(r'--- STEP (\d+) ---', stripped).group(1))
+            add(EVENT_STEP_STARTED)
+        elif stripped.startswith("--- SEARCH ---"):
+            body, i = collect_until(i + 1, "--- SEARCH END ---")
+            query = body[0].strip().replace("Query:", "", 1).strip() if body else ""
+            add(EVENT_SEARCH, query=query, results="\n".join(body[2:]))
+        elif stripped.startswith("--- FILE CONTENT WRITTEN TO"):
+            path = stripped.replace("--- FILE CONTENT WRITTEN TO", "", 1).rstrip("-").strip()
+            body, i = collect_until(i + 1, "--- END FILE CONTENT ---")
+            add(EVENT_FILE_CONTENT, path=path, content="\n".join(body))
+        elif stripped.startswith("OUTPUT:"):
+            body, i = collect_until(i + 1, "--- STEP")
+            output = "\n".join(body)
+            add(EVENT_COMMAND_OUTPUT, output=output, success=not output.startswith("Error"))
+            continue
+        elif stripped.startswith("REASON:"):
+            add(EVENT_REASON, text=stripped[len("REASON:"):].strip())
+        elif stripped.startswith("COMMAND TO EXECUTE:"):
+            add(EVENT_COMMAND_PROPOSED, command=stripped[len("COMMAND TO EXECUTE:"):].strip())
+        elif stripped.startswith("COMMAND EXECUTED:"):
+            add(EVENT_COMMAND_EXECUTED, command=stripped[len("COMMAND EXECUTED:"):].strip(), target=f"{username}@{ip}")
+        elif stripped.startswith("VALIDATOR: APPROVED"):
+            add(EVENT_VALIDATOR_RESULT, approved=True, mode='independent' if 'Independent' in stripped else 'assisted', reason="")
+        elif stripped.startswith("VALIDATOR: REJECTED"):
+            add(EVENT_VALIDATOR_RESULT, approved=False, mode='', reason=stripped.replace("VALIDATOR: REJECTED -", "", 1).strip())
+        elif stripped.startswith("ASK:"):
+            add(EVENT_ASK_QUESTION, question=stripped[len("ASK:"):].strip(), reason="")
+        elif stripped.startswith("HUMAN RESPONSE:"):
+            add(EVENT_ASK_ANSWER, answer=stripped[len("HUMAN RESPONSE:"):].strip())
+        elif stripped.startswith("INTERVENTION:"):
+            kind, _, details = stripped[len("INTERVENTION:"):].strip().partition(" - ")
+            add(EVENT_INTERVENTION, kind=kind, details=details)
+        elif stripped:
+            add(EVENT_NOTE, text=line)
+        i += 1
+
+    return events
+
+
+def _read_lines_reverse(path: str, chunk_size: int = 65536) -> Iterator[bytes]:
+    """Yield the lines of a file from the last to the first, reading fixed-size chunks backwards."""
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        remainder = b""
+        while position > 0:
+            read_size = min(chunk_size, position)
+            position -= read_size
+            f.seek(position)
+            lines = (f.read(read_size) + remainder).split(b'\n')
+            # The first piece may be the end of a line that starts in the previous chunk
+            remainder = lines.pop(0)
+            for line in reversed(lines):
+                yield line
+        if remainder:
+            yield remainder
+
+
 # ===========================
 # === BASE LOG MANAGER ===
 # ===========================
 
 class BaseLogManager:
     """
-    Manages the immutable Full Log stored in execution_log.txt.
+    Manages the immutable Full Log stored as structured events.
     This is the single source of truth for all logging.
-    Format matches the specification exactly.
+
+    The events are split into fixed-size segments inside the log directory:
+    - segment_NNNNNN.jsonl     the active segment (append-only)
+    - segment_NNNNNN.jsonl.gz  cold segments, gzip-compressed on rotation
+    - manifest.json            index of the segments (seq/ts ranges, size, compression)
+    The classic text format (execution_log.txt) is rendered from the events on demand.
     """
 
-    def __init__(self, log_path: str = EXECUTION_LOG_PATH):
-        self.log_path = log_path
-        self._ensure_log_exists()
+    MANIFEST_NAME = 'manifest.json'
+
+    def __init__(self, log_dir: str = EXECUTION_LOG_SEGMENTS_DIR, text_log_path: str = EXECUTION_LOG_PATH,
+                 legacy_log_path: str = EVENT_LOG_PATH, segment_max_bytes: int = SEGMENT_MAX_BYTES):
+        self.log_dir = log_dir
+        self.text_log_path = text_log_path
+        self.legacy_log_path = legacy_log_path
+        self.segment_max_bytes = segment_max_bytes
+        self.manifest_path = os.path.join(log_dir, self.MANIFEST_NAME)
+        self._lock = threading.Lock()
+        self._seq = 0
+        self._generation = 0    # Bumped when the log is replaced (reset / reload), since seq restarts
+        self.segments: List[Dict] = []
         self.current_step = 0
         self.current_objective = ""
         self.current_system_info = ""
+        self.current_task_id = None
+        self.current_username = "user"
+        self.current_ip = "remote"
+        self._ensure_log_exists()
+        self._load_manifest()
+        self._seq = self._read_last_seq()
+
+    @property
+    def version(self) -> str:
+        """Changes with every event written and every reset / reload (ETag of the log views)."""
+        return f"{self._generation}.{self._seq}"
+
+    # === Segment Storage ===
+
+    @property
+    def active_segment(self) -> Dict:
+        return self.segments[-1]
+
+    def _segment_path(self, segment: Dict) -> str:
+        return os.path.join(self.log_dir, segment['name'])
+
+    def _new_segment(self, index: int) -> Dict:
+        return {'index': index, 'name': f"segment_{index:06d}.jsonl", 'first_seq': None, 'last_seq': None,
+                'first_ts': None, 'last_ts': None, 'bytes': 0, 'compressed': False}
+
+    def _save_manifest(self):
+        """Atomically rewrites the manifest (only on segment creation/rotation, never per event)."""
+        tmp_path = self.manifest_path + '.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'v': EVENT_SCHEMA_VERSION, 'segments': self.segments}, f, indent=2)
+            os.replace(tmp_path, self.manifest_path)
+        except Exception as e:
+            print(f"ERROR saving log manifest: {e}")
+
+    def _load_manifest(self):
+        """Reads the manifest and refreshes the active segment entry from its file."""
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                self.segments = json.load(f).get('segments', [])
+        except (FileNotFoundError, json.JSONDecodeError) as e:
+            if not isinstance(e, FileNotFoundError):
+                print(f"ERROR reading log manifest, starting a new one: {e}")
+            self.segments = []
+
+        if not self.segments:
+            self.segments = [self._new_segment(1)]
+            self._save_manifest()
+
+        active = self.active_segment
+        active_path = self._segment_path(active)
+        if not os.path.exists(active_path):
+            open(active_path, 'a', encoding='utf-8').close()
+        # The active entry is not rewritten per event, so its ranges are re-derived from the file
+        active['bytes'] = os.path.getsize(active_path)
+        if active['bytes'] > 0:
+            last_event = next(self._iter_segment_reverse(active), None)
+            first_event = next(self._iter_segment(active), None)
+            if first_event and last_event:
+                active['first_seq'], active['first_ts'] = first_event.get('seq'), first_event.get('ts')
+                active['last_seq'], active['last_ts'] = last_event.get('seq'), last_event.get('ts')
 
     def _ensure_log_exists(self):
-        """Ensure log file exists."""
-        if not os.path.exists(self.log_path):
-            with open(self.log_path, 'w', encoding='utf-8') as f:
-                pass  # Create empty file
+        """Ensure log directory exists (migrating a single-file or legacy text log on first run)."""
+        if os.path.isdir(self.log_dir):
+            return
+        os.makedirs(self.log_dir, exist_ok=True)
+        first_segment = os.path.join(self.log_dir, self._new_segment(1)['name'])
+
+        if os.path.exists(self.legacy_log_path):
+            # Single-file event log from before segmentation becomes the first segment
+            os.replace(self.legacy_log_path, first_segment)
+            print(f"Moved event log {self.legacy_log_path} into segmented log {self.log_dir}")
+        elif os.path.exists(self.text_log_path) and os.path.getsize(self.text_log_path) > 0:
+            self._migrate_legacy_text_log(first_segment)
+
+    def _migrate_legacy_text_log(self, segment_path: str):
+        """Converts an existing execution_log.txt into structured events."""
+        try:
+            with open(self.text_log_path, 'r', encoding='utf-8') as f:
+                legacy_events = _import_legacy_text(f.read())
+            imported_at = datetime.now().isoformat(timespec='seconds')
+            with open(segment_path, 'a', encoding='utf-8') as f:
+                for seq, event in enumerate(legacy_events, 1):
+                    record = {'v': EVENT_SCHEMA_VERSION, 'seq': seq, 'ts': imported_at, 'task_id': None, 'legacy': True}
+                    record.update(event)
+                    f.write(json.dumps(record, ensure_ascii=False) + '\n')
+            print(f"Migrated {len(legacy_events)} events from legacy log {self.text_log_path}")
+        except Exception as e:
+            print(f"ERROR migrating legacy text log: {e}")
 
-    def _append(self, text: str):
-        """Append text to log file."""
+    def _rotate(self):
+        """Closes the active segment (gzip-compressing it) and starts a new one. Caller holds the lock."""
+        active = self.active_segment
+        plain_path = self._segment_path(active)
         try:
-            with open(self.log_path, 'a', encoding='utf-8') as f:
-                f.write(text)
+            with open(plain_path, 'rb') as src, gzip.open(plain_path + '.gz', 'wb', compresslevel=6) as dst:
+                shutil.copyfileobj(src, dst)
+            os.remove(plain_path)
+            active['name'] += '.gz'
+            active['compressed'] = True
+            active['bytes'] = os.path.getsize(self._segment_path(active))
         except Exception as e:
-            print(f"ERROR appending to full log: {e}")
+            # The uncompressed segment stays readable; only the space saving is lost
+            print(f"ERROR compressing log segment {plain_path}: {e}")
+        self.segments.append(self._new_segment(active['index'] + 1))
+        open(self._segment_path(self.active_segment), 'a', encoding='utf-8').close()
+        self._save_manifest()
+
+    def _read_last_seq(self) -> int:
+        """Sequence number of the last record (from the active segment tail, else the manifest)."""
+        for segment in reversed(self.segments):
+            if segment.get('last_seq') is not None:
+                return segment['last_seq']
+        return 0
+
+    def _write_event(self, event_type: str, **fields) -> Dict:
+        """Append one typed event to the active segment."""
+        with self._lock:
+            self._seq += 1
+            record = {
+                'v': EVENT_SCHEMA_VERSION,
+                'seq': self._seq,
+                'ts': datetime.now().isoformat(timespec='seconds'),
+                'task_id': self.current_task_id,
+                'step': self.current_step,
+                'type': event_type,
+            }
+            record.update(fields)
+            try:
+                line = (json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8')
+                with open(self._segment_path(self.active_segment), 'ab') as f:
+                    f.write(line)
+                active = self.active_segment
+                if active['first_seq'] is None:
+                    active['first_seq'], active['first_ts'] = record['seq'], record['ts']
+                active['last_seq'], active['last_ts'] = record['seq'], record['ts']
+                active['bytes'] += len(line)
+                if active['bytes'] >= self.segment_max_bytes:
+                    self._rotate()
+            except Exception as e:
+                print(f"ERROR appending to full log: {e}")
+        return record
 
-    def log_new_task(self, objective: str, system_info: str):
+    @property
+    def current_target(self) -> str:
+        return f"{self.current_username}@{self.current_ip}"
+
+    def log_new_task(self, objective: str, system_info: str, task_id: Optional[str] = None):
         """Log a new task starting."""
         self.current_objective = objective
         self.current_system_info = system_info
         self.current_step = 0
+        self.current_task_id = task_id or new_task_id()
 
-        log_entry = f"""
-=== NEW TASK STARTED ===
-Objective: {objective}
-System Info: {system_info}
-=========================
+        # The System Info string carries the detected user and IP for this task
+        username, ip = _parse_target_from_system_info(system_info)
+        self.current_username = username or "user"
+        self.current_ip = ip or "remote"
 
-"""
-        self._append(log_entry)
+        self._write_event(EVENT_TASK_STARTED, objective=objective, system_info=system_info, target=self.current_target)
 
     def log_step_start(self, step_num: int):
         """Log step start."""
         self.current_step = step_num
-        self._append(f"--- STEP {step_num} ---\n")
+        self._write_event(EVENT_STEP_STARTED)
 
     def log_reason(self, reason: str):
         """Log reasoning."""
-        self._append(f"REASON: {reason}\n")
+        self._write_event(EVENT_REASON, text=reason)
 
     def log_command_to_execute(self, command: str):
         """Log command that will be executed."""
-        self._append(f"COMMAND TO EXECUTE: {command}\n")
+        self._write_event(EVENT_COMMAND_PROPOSED, command=command)
 
     def log_validator_result(self, approved: bool, mode: str, reason: str = ""):
         """Log validation result."""
-        if approved:
-            if mode == 'independent':
-                self._append("VALIDATOR: APPROVED (Independent mode)\n")
-            else:
-                self._append("VALIDATOR: APPROVED by user (Assisted mode)\n")
-        else:
-            self._append(f"VALIDATOR: REJECTED - {reason}\n")
+        self._write_event(EVENT_VALIDATOR_RESULT, approved=approved, mode=mode, reason=reason)
 
     def log_command_executed(self, command: str):
         """Log actual command executed."""
-        self._append(f"COMMAND EXECUTED: {command}\n")
+        self._write_event(EVENT_COMMAND_EXECUTED, command=command, target=self.current_target)
 
     def log_output(self, output: str, success: bool):
         """Log command output."""
-        self._append("OUTPUT:\n")
-        if output.strip():
-            self._append(f"{output}\n")
-        else:
-            if success:
-                self._append("Success: Command executed with no output.\n")
-            else:
-                self._append("Error: Command failed with no output.\n")
+        self._write_event(EVENT_COMMAND_OUTPUT, output=output, success=success)
 
     def log_step_end(self):
         """Log step end."""
-        self._append("--- STEP END ---\n\n")
+        self._write_event(EVENT_STEP_ENDED)
 
     def log_task_completed(self, report: str):
         """Log task completion."""
-        log_entry = f"""=== TASK COMPLETED ===
-REPORT: {report}
-=======================
-
-"""
-        self._append(log_entry)
+        self._write_event(EVENT_TASK_COMPLETED, report=report)
 
     def log_ask_question(self, question: str, reason: str = ""):
         """Log agent asking a question."""
-        if reason:
-            self._append(f"REASON: {reason}\n")
-        self._append(f"ASK: {question}\n")
+        self._write_event(EVENT_ASK_QUESTION, question=question, reason=reason)
 
     def log_ask_answer(self, answer: str):
         """Log human answer."""
-        self._append(f"HUMAN RESPONSE: {answer}\n")
+        self._write_event(EVENT_ASK_ANSWER, answer=answer)
 
     def log_intervention(self, intervention_type: str, details: str):
         """Log human intervention."""
-        self._append(f"INTERVENTION: {intervention_type} - {details}\n")
+        self._write_event(EVENT_INTERVENTION, kind=intervention_type, details=details)
 
     def log_search(self, query: str, results: str):
         """Log search operation."""
-        log_entry = f"""--- SEARCH ---
-Query: {query}
-Results:
-{results}
---- SEARCH END ---
-
-"""
-        self._append(log_entry)
+        self._write_event(EVENT_SEARCH, query=query, results=results)
 
     def log_file_content(self, path: str, content: str):
         """
         Log the content of a file being written.
-        Wrapped in markers to be easily identifying during search.
+        Stored as its own event so search can return the whole block.
         """
-        header = f"--- FILE CONTENT WRITTEN TO {path} ---\n"
-        footer = "\n--- END FILE CONTENT ---\n\n"
-        self._append(header + content + footer)
+        self._write_event(EVENT_FILE_CONTENT, path=path, content=content)
 
     def log_ssh_connection_change(self, username: str, ip: str, previous_username: str = "", previous_ip: str = ""):
         """
         Log an SSH connection change event.
         This creates an explicit record in the Full Log when the target system changes.
         """
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-        log_entry = f"""
-=== SSH CONNECTION CHANGED ===
-Timestamp: {timestamp}
-"""
-        if previous_username and previous_ip:
-            log_entry += f"Previous: {previous_username}@{previous_ip}\n"
-        else:
-            log_entry += "Previous: (none - first connection)\n"
+        self.current_username = username
+        self.current_ip = ip
+        self._write_event(EVENT_SSH_CONNECTION_CHANGED, username=username, ip=ip,
+                          previous_username=previous_username, previous_ip=previous_ip)
+
+    def log_manual_edit(self):
+        """Log that the user rewrote the agent memory."""
+        self._write_event(EVENT_MANUAL_EDIT)
+
+    # === Reading ===
 
-        log_entry += f"Current: {username}@{ip}\n"
-        log_entry += "==============================\n\n"
+    def _open_segment(self, segment: Dict, mode: str = 'rt'):
+        path = self._segment_path(segment)
+        if segment.get('compressed'):
+            return gzip.open(path, mode, encoding='utf-8') if 't' in mode else gzip.open(path, mode)
+        return open(path, mode, encoding='utf-8') if 't' in mode else open(path, mode)
 
-        self._append(log_entry)
+    def _iter_segment(self, segment: Dict) -> Iterator[Dict]:
+        """Yield the events of one segment in order, skipping malformed lines."""
+        try:
+            with self._open_segment(segment) as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError:
+                        print(f"WARNING: Skipping malformed event line in {segment['name']}")
+        except FileNotFoundError:
+            print(f"WARNING: Log segment {segment['name']} is missing")
+        except Exception as e:
+            print(f"ERROR reading log segment {segment['name']}: {e}")
+
+    def _iter_segment_reverse(self, segment: Dict, chunk_size: int = 65536) -> Iterator[Dict]:
+        """Yield the events of one segment newest-first, seeking from the end of the file."""
+        try:
+            if segment.get('compressed'):
+                # gzip is not seekable backwards; cold segments are bounded by segment_max_bytes
+                with self._open_segment(segment, 'rb') as f:
+                    lines = f.read().split(b'\n')
+            else:
+                lines = _read_lines_reverse(self._segment_path(segment), chunk_size)
+            for raw_line in (reversed(lines) if segment.get('compressed') else lines):
+                if not raw_line.strip():
+                    continue
+                try:
+                    yield json.loads(raw_line)
+                except ValueError:
+                    print(f"WARNING: Skipping malformed event line in {segment['name']}")
+        except FileNotFoundError:
+            print(f"WARNING: Log segment {segment['name']} is missing")
+        except Exception as e:
+            print(f"ERROR reading log segment {segment['name']}: {e}")
+
+    def iter_events(self, since_seq: int = 0) -> Iterator[Dict]:
+        """Yield all events in order. Segments entirely before since_seq are skipped via the manifest."""
+        for segment in list(self.segments):
+            if since_seq and segment.get('last_seq') is not None and segment['last_seq'] < since_seq:
+                continue
+            for event in self._iter_segment(segment):
+                if event.get('seq', 0) >= since_seq:
+                    yield event
+
+    def iter_events_reverse(self, before_seq: Optional[int] = None) -> Iterator[Dict]:
+        """
+        Yield events newest-first; cost is proportional to how far back the caller reads.
+        With before_seq, only events older than that sequence number are returned
+        (segments that start at or after it are skipped via the manifest).
+        """
+        for segment in reversed(list(self.segments)):
+            if before_seq is not None and segment.get('first_seq') is not None and segment['first_seq'] >= before_seq:
+                continue
+            for event in self._iter_segment_reverse(segment):
+                if before_seq is None or event.get('seq', 0) < before_seq:
+                    yield event
+
+    def get_total_bytes(self) -> int:
+        """On-disk size of all segments (compressed size for cold segments)."""
+        return sum(segment.get('bytes', 0) for segment in self.segments)
 
     def read_full_log(self) -> str:
-        """Read and return the entire Full Log."""
+        """Render and return the entire Full Log in text format."""
+        return "".join(render_event_text(event) for event in self.iter_events())
+
+    def read_tail_text(self, max_chars: int) -> Tuple[str, bool]:
+        """
+        Render only the newest events, up to max_chars of text.
+        Returns (text, truncated). Older segments are never opened once the budget is filled.
+        """
+        parts = []
+        size = 0
+        truncated = False
+        for event in self.iter_events_reverse():
+            text = render_event_text(event)
+            if size + len(text) > max_chars:
+                truncated = True
+                remaining = max_chars - size
+                if remaining > 0:
+                    parts.append(text[-remaining:])
+                break
+            parts.append(text)
+            size += len(text)
+        return "".join(reversed(parts)), truncated
+
+    def export_text_log(self, path: Optional[str] = None) -> Optional[str]:
+        """Writes the rendered text log to disk (execution_log.txt by default). Returns the path."""
+        path = path or self.text_log_path
         try:
-            if os.path.exists(self.log_path):
-                with open(self.log_path, 'r', encoding='utf-8') as f:
-                    return f.read()
-            return ""
+            with open(path, 'w', encoding='utf-8') as f:
+                for event in self.iter_events():
+                    f.write(render_event_text(event))
+            return path
         except Exception as e:
-            print(f"ERROR reading full log: {e}")
-            return ""
+            print(f"ERROR exporting text log: {e}")
+            return None
+
+    def reload(self):
+        """Re-reads the manifest after the log directory was replaced on disk (Load Session)."""
+        with self._lock:
+            self._ensure_log_exists()
+            self._load_manifest()
+            self._seq = self._read_last_seq()
+            self._generation += 1
+        self.current_step = 0
 
     def reset_log(self):
         """Reset the full log (creates backup first)."""
-        if os.path.exists(self.log_path) and os.path.getsize(self.log_path) > 0:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            backup_path = os.path.join(KEYS_DIR, f"execution_log_backup_{timestamp}.txt")
-            try:
-                import shutil
-                shutil.copy(self.log_path, backup_path)
-                print(f"Full log backed up to: {backup_path}")
-            except Exception as e:
-                print(f"ERROR backing up log: {e}")
-
-        with open(self.log_path, 'w', encoding='utf-8') as f:
-            f.write("")
+        with self._lock:
+            if self.get_total_bytes() > 0:
+                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                backup_path = os.path.join(KEYS_DIR, f"execution_log_backup_{timestamp}")
+                try:
+                    shutil.move(self.log_dir, backup_path)
+                    print(f"Full log backed up to: {backup_path}")
+                except Exception as e:
+                    print(f"ERROR backing up log: {e}")
+                    shutil.rmtree(self.log_dir, ignore_errors=True)
+
+            os.makedirs(self.log_dir, exist_ok=True)
+            for name in os.listdir(self.log_dir):
+                os.remove(os.path.join(self.log_dir, name))
+            self.segments = []
+            self._load_manifest()
+            self._seq = 0
+            self._generation += 1
 
         self.current_step = 0
         self.current_objective = ""
         self.current_system_info = ""
+        self.current_task_id = None
 
 
 # ===========================
 # === VIEW GENERATOR ===
 # ===========================
 
+def _project_action(event: Dict) -> List[str]:
+    """Actions Mode projection of one event."""
+    etype = event.get('type')
+    if etype == EVENT_TASK_STARTED:
+        return ["Starting new task"]
+    if etype == EVENT_STEP_STARTED:
+        return ["Thinking..."]
+    if etype == EVENT_VALIDATOR_RESULT:
+        return ["Command approved" if event.get('approved') else "Command rejected by validator"]
+    if etype == EVENT_COMMAND_EXECUTED:
+        return ["Executing command..."]
+    if etype == EVENT_COMMAND_OUTPUT:
+        return ["Command executed successfully"]
+    if etype == EVENT_TASK_COMPLETED:
+        return ["Task finished", "Report generated"]
+    if etype == EVENT_ASK_QUESTION:
+        return ["Agent asking question"]
+    if etype == EVENT_ASK_ANSWER:
+        return ["Human responded"]
+    if etype == EVENT_MANUAL_EDIT:
+        return ["User manually edited memory/context"]
+    return []
+
+
+def _project_command(event: Dict) -> List[str]:
+    """Commands Mode projection of one event."""
+    etype = event.get('type')
+    if etype == EVENT_TASK_STARTED:
+        return ["=== NEW TASK ==="]
+    if etype == EVENT_COMMAND_EXECUTED and event.get('step'):
+        return [f"STEP {event['step']}: {event.get('command', '')}"]
+    if etype == EVENT_TASK_COMPLETED:
+        return ["=== TASK END ==="]
+    return []
+
+
+def _project_vm_screen(event: Dict) -> List[str]:
+    """VM Screen projection of one event (terminal-like view)."""
+    etype = event.get('type')
+    if etype == EVENT_TASK_STARTED:
+        return ["=== Objective ===", event.get('objective', ''), "=================", ""]
+    if etype == EVENT_COMMAND_EXECUTED:
+        return [f"{event.get('target', 'user@remote')}~# {event.get('command', '')}"]
+    if etype == EVENT_COMMAND_OUTPUT:
+        return [line.rstrip() for line in _output_text(event).split('\n')] + [""]
+    if etype == EVENT_TASK_COMPLETED:
+        return ["===== TASK END ====="]
+    return []
+
+
+def _project_full(event: Dict) -> List[str]:
+    """Full Log projection of one event (the rendered text, split into lines)."""
+    text = render_event_text(event)
+    return text[:-1].split('\n') if text.endswith('\n') else text.split('\n')
+
+
 class ViewGenerator:
-    """Generates different views extracted from the Full Log."""
+    """Generates different views as filtered projections of the typed Full Log events."""
+
+    PROJECTORS = {
+        'full': _project_full,
+        'actions': _project_action,
+        'commands': _project_command,
+        'vm_screen': _project_vm_screen,
+    }
 
     def __init__(self, base_log_manager: BaseLogManager):
         self.base_log = base_log_manager
 
+    def _project(self, projector, max_lines: int) -> Tuple[List[str], bool]:
+        """
+        Runs a projector over the newest events, keeping only the last max_lines lines.
+        Reads newest-first and stops as soon as the view is full.
+        """
+        chunks = []
+        count = 0
+        for event in self.base_log.iter_events_reverse():
+            projected = projector(event)
+            if not projected:
+                continue
+            if count + len(projected) > max_lines:
+                keep = max_lines - count
+                if keep > 0:
+                    chunks.append(projected[-keep:])
+                return [line for chunk in reversed(chunks) for line in chunk], True
+            chunks.append(projected)
+            count += len(projected)
+        return [line for chunk in reversed(chunks) for line in chunk], False
+
+    def get_page(self, view: str, before_offset: Optional[int] = None, limit: int = 500) -> Dict:
+        """
+        Returns one page of a view: the newest `limit` lines produced by events older than
+        `before_offset` (an event sequence number). Pages end on event boundaries, so passing
+        the returned `next_before_offset` back fetches the page right before this one.
+        """
+        projector = self.PROJECTORS[view]
+        chunks = []
+        count = 0
+        oldest_seq = None
+        has_more = False
+        for event in self.base_log.iter_events_reverse(before_seq=before_offset):
+            projected = projector(event)
+            if not projected:
+                continue
+            if chunks and count + len(projected) > limit:
+                has_more = True
+                break
+            chunks.append(projected)
+            count += len(projected)
+            oldest_seq = event.get('seq')
+
+        return {
+            'data': '\n'.join(line for chunk in reversed(chunks) for line in chunk),
+            'line_count': count,
+            'next_before_offset': oldest_seq if has_more else None,
+            'has_more': has_more,
+        }
+
     def get_actions_view(self) -> str:
         """Extract Actions Mode view."""
-        full_log = self.base_log.read_full_log()
-        actions = []
-
-        for line in full_log.splitlines():
-            line_stripped = line.strip()
-            if line_stripped.startswith("=== NEW TASK STARTED ==="):
-                actions.append("Starting new task")
-            elif line_stripped.startswith("--- STEP "):
-                actions.append("Thinking...")
-            elif line_stripped.startswith("VALIDATOR: APPROVED"):
-                actions.append("Command approved")
-            elif line_stripped.startswith("VALIDATOR: REJECTED"):
-                actions.append("Command rejected by validator")
-            elif line_stripped.startswith("COMMAND EXECUTED:"):
-                actions.append("Executing command...")
-            elif line_stripped.startswith("OUTPUT:"):
-                actions.append("Command executed successfully")
-            elif line_stripped.startswith("=== TASK COMPLETED ==="):
-                actions.append("Task finished")
-            elif line_stripped.startswith("REPORT:"):
-                actions.append("Report generated")
-            elif line_stripped.startswith("ASK:"):
-                actions.append("Agent asking question")
-            elif line_stripped.startswith("HUMAN RESPONSE:"):
-                actions.append("Human responded")
-            elif line_stripped.startswith("--- Summarization ---"):
-                actions.append(line_stripped)
-            elif line_stripped.startswith("=== USER MANUALLY EDITED"):
-                actions.append("User manually edited memory/context")
-
         # PERFORMANCE FIX: Limit actions view
         MAX_ACTION_LINES = 2000
-        if len(actions) > MAX_ACTION_LINES:
-            return "... [Older actions truncated] ...\n" + '\n'.join(actions[-MAX_ACTION_LINES:])
-
+        actions, truncated = self._project(_project_action, MAX_ACTION_LINES)
+        if truncated:
+            return "... [Older actions truncated] ...\n" + '\n'.join(actions)
         return '\n'.join(actions)
 
     def get_commands_view(self) -> str:
         """Extract Commands Mode view."""
-        full_log = self.base_log.read_full_log()
-        lines = []
-        current_step = None
-        in_task = False
-
-        for line in full_log.splitlines():
-            line_stripped = line.strip()
-            if line_stripped.startswith("=== NEW TASK STARTED ==="):
-                in_task = True
-                lines.append("=== NEW TASK ===")
-            elif line_stripped.startswith("--- STEP "):
-                match = re.search(r'--- STEP (\d+) ---', line_stripped)
-                if match:
-                    current_step = match.group(1)
-            elif line_stripped.startswith("COMMAND EXECUTED:") and current_step:
-                command = line_stripped.replace("COMMAND EXECUTED:", "").strip()
-                lines.append(f"STEP {current_step}: {command}")
-            elif line_stripped.startswith("=== TASK COMPLETED ==="):
-                lines.append("=== TASK END ===")
-                in_task = False
-
         # PERFORMANCE FIX: Limit commands view
         MAX_CMD_LINES = 2000
-        if len(lines) > MAX_CMD_LINES:
-            return "... [Older commands truncated] ...\n" + '\n'.join(lines[-MAX_CMD_LINES:])
-
+        lines, truncated = self._project(_project_command, MAX_CMD_LINES)
+        if truncated:
+            return "... [Older commands truncated] ...\n" + '\n'.join(lines)
         return '\n'.join(lines)
 
     def get_vm_screen_view(self) -> str:
         """Extract VM Screen view."""
-        full_log = self.base_log.read_full_log()
-        lines = []
-        objective = ""
-        username = "user"
-        ip = "remote"
-        current_command = ""
-        collecting_output = False
-        output_lines = []
-
-        for line in full_log.splitlines():
-            line_stripped = line.strip()
-            # ROBUST FIX: Parse explicit SSH connection change markers (single source of truth)
-            if line_stripped.startswith("=== SSH CONNECTION CHANGED ==="):
-                # We're entering a connection change block - parse the next few lines
-                # Format: "Current: username@ip"
-                pass  # Just a marker, actual parsing happens on "Current:" line
-            elif line_stripped.startswith("Current:") and "@" in line_stripped:
-                # Extract username@ip from "Current: username@ip" line
-                current_match = re.search(r'Current:\s*(\w+)@([\d\.]+)', line_stripped)
-                if current_match:
-                    username = current_match.group(1)
-                    ip = current_match.group(2)
-            # FALLBACK: Reset username/IP at start of NEW TASK (for backwards compatibility with old logs)
-            elif line_stripped.startswith("=== NEW TASK STARTED ==="):
-                # Reset to defaults - will be updated by next System Info line
-                username = "user"
-                ip = "remote"
-            elif line_stripped.startswith("Objective:"):
-                objective = line_stripped.replace("Objective:", "").strip()
-                lines.append("=== Objective ===")
-                lines.append(objective)
-                lines.append("=================")
-                lines.append("")
-            elif line_stripped.startswith("System Info:"):
-                system_info = line_stripped.replace("System Info:", "").strip()
-                # Match user: username or user: HOSTNAME\username (Windows format)
-                user_match = re.search(r'user:\s*(?:[\w-]+\\)?(\w+)', system_info, re.IGNORECASE)
-                ip_match = re.search(r'IP:\s*([\d\.]+)', system_info)
-                if user_match:
-                    username = user_match.group(1)  # Extracts username after backslash if present
-                if ip_match:
-                    ip = ip_match.group(1)
-            elif line_stripped.startswith("COMMAND EXECUTED:"):
-                current_command = line_stripped.replace("COMMAND EXECUTED:", "").strip()
-                lines.append(f"{username}@{ip}~# {current_command}")
-            elif line_stripped.startswith("OUTPUT:"):
-                collecting_output = True
-                output_lines = []
-            elif collecting_output:
-                if line_stripped.startswith("--- STEP END ---") or line_stripped.startswith("--- STEP "):
-                    if output_lines:
-                        lines.extend(output_lines)
-                    else:
-                        lines.append("(no output)")
-                    lines.append("")
-                    collecting_output = False
-                    output_lines = []
-                else:
-                    output_lines.append(line.rstrip())
-            elif line_stripped.startswith("=== TASK COMPLETED ==="):
-                lines.append("===== TASK END =====")
-
-        if collecting_output and output_lines:
-            lines.extend(output_lines)
-            lines.append("")
-
         # PERFORMANCE FIX: Truncate view if too large
         # Browser cannot handle 40MB textareas. Limit to last 5000 lines (~500KB-1MB).
         MAX_VIEW_LINES = 5000
-        if len(lines) > MAX_VIEW_LINES:
-            truncated_lines = [f"... [Older content truncated for performance. Showing last {MAX_VIEW_LINES} lines] ...\n"]
-            truncated_lines.extend(lines[-MAX_VIEW_LINES:])
-            return '\n'.join(truncated_lines)
-
+        lines, truncated = self._project(_project_vm_screen, MAX_VIEW_LINES)
+        if truncated:
+            return '\n'.join([f"... [Older content truncated for performance. Showing last {MAX_VIEW_LINES} lines] ...\n"] + lines)
         return '\n'.join(lines)
 
 
@@ -419,53 +887,131 @@ class AgentMemoryManager:
         except:
             return 0
 
+    def get_context_version(self) -> str:
+        """Size + mtime of the context file (changes on every append / overwrite)."""
+        try:
+            stat = os.stat(self.context_path)
+            return f"{stat.st_size}.{stat.st_mtime_ns}"
+        except OSError:
+            return "0"
+
 
 # ===========================
 # === CHAT LOG MANAGER ===
 # ===========================
 
 class ChatLogManager:
-    """Manages the persistent chat history in JSON format."""
+    """
+    Manages the persistent chat history as append-only JSONL (one message per line).
+    The last MAX_MESSAGES messages are kept in memory; the file is compacted to
+    that size once it holds COMPACT_AFTER lines.
+    """
+
+    MAX_MESSAGES = 200
+    COMPACT_AFTER = 400
 
-    def __init__(self, log_path: str = CHAT_LOG_FILE_PATH):
+    def __init__(self, log_path: str = CHAT_LOG_FILE_PATH, legacy_path: str = CHAT_LOG_LEGACY_PATH):
         self.log_path = log_path
+        self.legacy_path = legacy_path
+        self._lock = threading.Lock()
+        self.history = deque(maxlen=self.MAX_MESSAGES)
+        self._lines_on_disk = 0
         self._ensure_log_exists()
+        self._load_tail()
 
     def _ensure_log_exists(self):
-        if not os.path.exists(self.log_path):
-            with open(self.log_path, 'w', encoding='utf-8') as f:
-                json.dump([], f)
-
-    def load_history(self) -> List[Dict]:
+        if os.path.exists(self.log_path):
+            return
+        legacy_history = []
+        if os.path.exists(self.legacy_path):
+            # One-time migration from the old rewrite-the-whole-file chat_history.json
+            try:
+                with open(self.legacy_path, 'r', encoding='utf-8') as f:
+                    legacy_history = json.load(f)
+                print(f"Migrating {len(legacy_history)} chat messages from {self.legacy_path}")
+            except (json.JSONDecodeError, OSError) as e:
+                print(f"Error reading legacy chat history: {e}")
+        self._write_all(legacy_history[-self.MAX_MESSAGES:] if isinstance(legacy_history, list) else [])
+        if legacy_history and os.path.exists(self.legacy_path):
+            os.remove(self.legacy_path)
+
+    def _write_all(self, messages):
+        """Atomically rewrites the file with the given messages."""
+        tmp_path = self.log_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for message in messages:
+                f.write(json.dumps(message, ensure_ascii=False) + '\n')
+        os.replace(tmp_path, self.log_path)
+
+    def _load_tail(self):
+        """Reads only the last MAX_MESSAGES lines, seeking from the end of the file."""
+        messages = []
+        lines_seen = 0
         try:
-            with open(self.log_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except (json.JSONDecodeError, FileNotFoundError):
-            return []
+            for line in _read_lines_reverse(self.log_path):
+                if not line.strip():
+                    continue
+                lines_seen += 1
+                try:
+                    messages.append(json.loads(line))
+                except ValueError:
+                    continue
+                if len(messages) >= self.MAX_MESSAGES:
+                    break
+        except FileNotFoundError:
+            pass
+        self.history = deque(reversed(messages), maxlen=self.MAX_MESSAGES)
+        # Compaction keeps the file short, so the exact count only matters below COMPACT_AFTER
+        self._lines_on_disk = lines_seen if len(messages) < self.MAX_MESSAGES else self.COMPACT_AFTER
+
+    def _compact(self):
+        """Rewrites the file with only the messages kept in memory. Caller holds the lock."""
+        try:
+            self._write_all(self.history)
+            self._lines_on_disk = len(self.history)
+        except Exception as e:
+            print(f"Error compacting chat history: {e}")
+
+    def load_history(self, limit: Optional[int] = None) -> List[Dict]:
+        """Returns the last `limit` messages (all kept messages by default) from memory."""
+        with self._lock:
+            if limit is None or limit >= len(self.history):
+                return list(self.history)
+            if limit <= 0:
+                return []
+            return list(self.history)[-limit:]
 
     def add_message(self, role: str, content: str):
-        try:
-            history = self.load_history()
-            entry = {
-                "role": role,
-                "content": content,
-                "timestamp": datetime.now().isoformat()
-            }
-            history.append(entry)
+        entry = {
+            "role": role,
+            "content": content,
+            "timestamp": datetime.now().isoformat()
+        }
+        with self._lock:
+            try:
+                with open(self.log_path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+                self._lines_on_disk += 1
+            except Exception as e:
+                print(f"Error saving chat history: {e}")
+            self.history.append(entry)
             # Limit history size (last 200 messages) to prevent huge files
-            if len(history) > 200:
-                history = history[-200:]
+            if self._lines_on_disk >= self.COMPACT_AFTER:
+                self._compact()
 
-            with open(self.log_path, 'w', encoding='utf-8') as f:
-                json.dump(history, f, indent=2)
-        except Exception as e:
-            print(f"Error saving chat history: {e}")
+    def reload(self):
+        """Re-reads the history after the file was replaced on disk (Load Session)."""
+        with self._lock:
+            self._ensure_log_exists()
+            self._load_tail()
 
     def clear_history(self):
         print(f"ChatLogManager: Attempting to clear history at {self.log_path}")
         try:
-            with open(self.log_path, 'w', encoding='utf-8') as f:
-                json.dump([], f)
+            with self._lock:
+                self._write_all([])
+                self.history.clear()
+                self._lines_on_disk = 0
             print(f"ChatLogManager: Successfully cleared chat history")
         except Exception as e:
             print(f"ChatLogManager ERROR: Failed to clear chat history: {e}")
@@ -479,23 +1025,24 @@ class ActionPlanManager:
     Allows nested sub-plans (e.g., Main Plan -> Sub-task Plan).
     """
 
+    # Write-behind delay: bursts of updates (chat loop, step marking) are written once
+    FLUSH_DELAY_SECONDS = 0.5
+
     def __init__(self, log_path: str = ACTION_PLAN_FILE_PATH):
         self.log_path = log_path
+        self._lock = threading.RLock()
+        self._stack: List[Dict] = []
+        self._dirty = False
+        self._flush_timer = None
         self._ensure_file_exists()
+        self._stack = self._read_stack_from_disk()
+        atexit.register(self.flush)
 
     def _ensure_file_exists(self):
         if not os.path.exists(self.log_path):
-            self._save_stack([])
-
-    def _save_stack(self, stack: List[Dict]):
-        try:
-            with open(self.log_path, 'w', encoding='utf-8') as f:
-                json.dump(stack, f, indent=2)
-        except Exception as e:
-            print(f"Error saving action plan stack: {e}")
+            self._write_stack_to_disk([])
 
-    def load_stack(self) -> List[Dict]:
-        """Returns the full stack of plans."""
+    def _read_stack_from_disk(self) -> List[Dict]:
         try:
             with open(self.log_path, 'r', encoding='utf-8') as f:
                 data = json.load(f)
@@ -505,181 +1052,235 @@ class ActionPlanManager:
                     # Migration from old format: wrap single plan in list
                     return [data]
                 return []
-        except (json.JSONDecodeError, FileNotFoundError):
+        except (json.JSONDecodeError, FileNotFoundError, OSError):
             return []
 
+    def _write_stack_to_disk(self, stack: List[Dict]):
+        """Atomic write: temp file + rename, so a crash never leaves a half-written plan."""
+        tmp_path = self.log_path + '.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(stack, f, indent=2)
+            os.replace(tmp_path, self.log_path)
+        except Exception as e:
+            print(f"Error saving action plan stack: {e}")
+
+    def _save_stack(self, stack: List[Dict]):
+        """Replaces the cached stack and schedules a write-behind flush."""
+        with self._lock:
+            self._stack = copy.deepcopy(stack)
+            self._dirty = True
+            if self._flush_timer is None:
+                self._flush_timer = threading.Timer(self.FLUSH_DELAY_SECONDS, self.flush)
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
+
+    def flush(self):
+        """Writes pending changes to disk now (also called before Save Session and at exit)."""
+        with self._lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            if not self._dirty:
+                return
+            self._write_stack_to_disk(self._stack)
+            self._dirty = False
+
+    def reload(self):
+        """
+        Re-reads the file after it was replaced on disk (Load Session, snapshot restore).
+        Pending in-memory changes are dropped: callers flush() before replacing the file.
+        """
+        with self._lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            self._dirty = False
+            self._stack = self._read_stack_from_disk()
+
+    def load_stack(self) -> List[Dict]:
+        """Returns a copy of the full stack of plans (from memory)."""
+        with self._lock:
+            return copy.deepcopy(self._stack)
+
     def get_active_plan(self) -> Optional[Dict]:
         """Returns the plan at the top of the stack (the one currently being executed)."""
-        stack = self.load_stack()
-        return stack[-1] if stack else None
+        with self._lock:
+            return copy.deepcopy(self._stack[-1]) if self._stack else None
 
     def set_plan(self, title: str, steps: List[str]):
         """PUSHES a new plan onto the stack."""
-        stack = self.load_stack()
-
-        new_plan = {
-            "id": int(datetime.now().timestamp()),
-            "title": title,
-            "steps": [{"objective": step.strip(), "completed": False} for step in steps],
-            "created_at": datetime.now().isoformat()
-        }
+        with self._lock:
+            stack = self.load_stack()
+
+            new_plan = {
+                "id": int(datetime.now().timestamp()),
+                "title": title,
+                "steps": [{"objective": step.strip(), "completed": False} for step in steps],
+                "created_at": datetime.now().isoformat()
+            }
 
-        # Check if identical plan is already on top (prevent duplicate pushes by LLM loops)
-        if stack and stack[-1]['title'] == title and len(stack[-1]['steps']) == len(steps):
-            print("ActionPlanManager: Identical plan already active. Skipping push.")
-            return
+            # Check if identical plan is already on top (prevent duplicate pushes by LLM loops)
+            if stack and stack[-1]['title'] == title and len(stack[-1]['steps']) == len(steps):
+                print("ActionPlanManager: Identical plan already active. Skipping push.")
+                return
 
-        stack.append(new_plan)
-        self._save_stack(stack)
-        print(f"Action plan PUSHED: '{title}' (Stack depth: {len(stack)})")
+            stack.append(new_plan)
+            self._save_stack(stack)
+            print(f"Action plan PUSHED: '{title}' (Stack depth: {len(stack)})")
 
     def get_plan_status(self) -> str:
         """Returns formatted status of the ACTIVE plan for prompt injection."""
-        stack = self.load_stack()
-        if not stack:
-            return ""
+        with self._lock:
+            stack = self._stack  # read-only, no copy needed
+            if not stack:
+                return ""
 
-        active_plan = stack[-1]
-        parent_title = stack[-2]['title'] if len(stack) > 1 else "None"
+            active_plan = stack[-1]
+            parent_title = stack[-2]['title'] if len(stack) > 1 else "None"
 
-        status_lines = ["\n--- CURRENT ACTION PLAN STATUS ---"]
+            status_lines = ["\n--- CURRENT ACTION PLAN STATUS ---"]
 
-        if len(stack) > 1:
-            status_lines.append(f"Context: You are working on a SUB-PLAN.")
-            status_lines.append(f"Parent Plan: '{parent_title}' (Paused until sub-plan finishes)")
+            if len(stack) > 1:
+                status_lines.append(f"Context: You are working on a SUB-PLAN.")
+                status_lines.append(f"Parent Plan: '{parent_title}' (Paused until sub-plan finishes)")
 
-        status_lines.append(f"ACTIVE PLAN: {active_plan['title']}")
+            status_lines.append(f"ACTIVE PLAN: {active_plan['title']}")
 
-        steps_done = 0
-        total_steps = len(active_plan['steps'])
+            steps_done = 0
+            total_steps = len(active_plan['steps'])
 
-        for idx, step in enumerate(active_plan['steps'], 1):
-            checkbox = "[X]" if step['completed'] else "[ ]"
-            status_lines.append(f"{checkbox} Step {idx}. {step['objective']}")
-            if step['completed']:
-                steps_done += 1
+            for idx, step in enumerate(active_plan['steps'], 1):
+                checkbox = "[X]" if step['completed'] else "[ ]"
+                status_lines.append(f"{checkbox} Step {idx}. {step['objective']}")
+                if step['completed']:
+                    steps_done += 1
 
-        # Find next pending step
-        next_step = None
-        for idx, step in enumerate(active_plan['steps'], 1):
-            if not step['completed']:
-                next_step = idx
-                break
+            # Find next pending step
+            next_step = None
+            for idx, step in enumerate(active_plan['steps'], 1):
+                if not step['completed']:
+                    next_step = idx
+                    break
 
-        if next_step:
-            status_lines.append(f"\nACTION REQUIRED: Perform Step {next_step}.")
-            status_lines.append(f"Use <<REQUEST_TASK: ...>> to initiate Step {next_step}.")
-        else:
-            status_lines.append(f"\nActive plan '{active_plan['title']}' is COMPLETE.")
-            if len(stack) > 1:
-                status_lines.append(f"Wait for the user to acknowledge, then we will return to parent plan: '{parent_title}'.")
+            if next_step:
+                status_lines.append(f"\nACTION REQUIRED: Perform Step {next_step}.")
+                status_lines.append(f"Use <<REQUEST_TASK: ...>> to initiate Step {next_step}.")
+            else:
+                status_lines.append(f"\nActive plan '{active_plan['title']}' is COMPLETE.")
+                if len(stack) > 1:
+                    status_lines.append(f"Wait for the user to acknowledge, then we will return to parent plan: '{parent_title}'.")
 
-        status_lines.append("---\n")
-        return "\n".join(status_lines)
+            status_lines.append("---\n")
+            return "\n".join(status_lines)
 
     def mark_step_completed(self, step_objective: str) -> bool:
         """
         Marks step in ACTIVE plan.
         If active plan finishes, POPS it from stack.
         """
-        stack = self.load_stack()
-        if not stack:
-            return False
+        with self._lock:
+            stack = self.load_stack()
+            if not stack:
+                return False
 
-        # Work only on the top plan
-        active_plan = stack[-1]
+            # Work only on the top plan
+            active_plan = stack[-1]
 
-        # --- ROBUST MATCHING LOGIC ---
-        normalized_input = step_objective.lower().strip()
-        input_tokens = set(re.findall(r'\w+', normalized_input))
+            # --- ROBUST MATCHING LOGIC ---
+            normalized_input = step_objective.lower().strip()
+            input_tokens = set(re.findall(r'\w+', normalized_input))
 
-        updated = False
-        highest_completed_index = -1
+            updated = False
+            highest_completed_index = -1
 
-        for idx, step in enumerate(active_plan['steps']):
-            if step.get('completed', False):
-                highest_completed_index = max(highest_completed_index, idx)
-                continue
+            for idx, step in enumerate(active_plan['steps']):
+                if step.get('completed', False):
+                    highest_completed_index = max(highest_completed_index, idx)
+                    continue
 
-            step_text = step['objective'].lower().strip()
-            step_tokens = set(re.findall(r'\w+', step_text))
+                step_text = step['objective'].lower().strip()
+                step_tokens = set(re.findall(r'\w+', step_text))
 
-            if not step_tokens: continue
+                if not step_tokens: continue
 
-            common_words = input_tokens.intersection(step_tokens)
-            match_score = len(common_words) / len(step_tokens)
+                common_words = input_tokens.intersection(step_tokens)
+                match_score = len(common_words) / len(step_tokens)
 
-            is_match = (step_text in normalized_input) or \
-                       (normalized_input in step_text) or \
-                       (match_score > 0.5)
+                is_match = (step_text in normalized_input) or \
+                           (normalized_input in step_text) or \
+                           (match_score > 0.5)
 
-            if is_match:
-                step['completed'] = True
-                updated = True
-                highest_completed_index = max(highest_completed_index, idx)
-                print(f"Action plan: Marked Step {idx+1} completed in '{active_plan['title']}'")
-
-        # Catch-up logic
-        if highest_completed_index > -1:
-            for i in range(highest_completed_index):
-                if not active_plan['steps'][i].get('completed', False):
-                    active_plan['steps'][i]['completed'] = True
+                if is_match:
+                    step['completed'] = True
                     updated = True
+                    highest_completed_index = max(highest_completed_index, idx)
+                    print(f"Action plan: Marked Step {idx+1} completed in '{active_plan['title']}'")
+
+            # Catch-up logic
+            if highest_completed_index > -1:
+                for i in range(highest_completed_index):
+                    if not active_plan['steps'][i].get('completed', False):
+                        active_plan['steps'][i]['completed'] = True
+                        updated = True
+
+            # Check if plan is fully complete
+            all_done = all(s.get('completed', False) for s in active_plan['steps'])
+
+            if updated:
+                if all_done:
+                    print(f"Action plan '{active_plan['title']}' finished! Popping from stack.")
+                    # We don't pop immediately here to let the UI show "100% done" once.
+                    # Ideally, we pop when the NEXT request comes or the user acknowledges.
+                    # For now, we save the completed state.
+                    pass
 
-        # Check if plan is fully complete
-        all_done = all(s.get('completed', False) for s in active_plan['steps'])
-
-        if updated:
-            if all_done:
-                print(f"Action plan '{active_plan['title']}' finished! Popping from stack.")
-                # We don't pop immediately here to let the UI show "100% done" once.
-                # Ideally, we pop when the NEXT request comes or the user acknowledges.
-                # For now, we save the completed state.
-                pass
-
-            self._save_stack(stack)
+                self._save_stack(stack)
 
-        return updated
+            return updated
 
     def mark_step_by_index(self, step_index: int) -> bool:
         """
         Marks a specific step as completed based on its 1-based index.
         This is more reliable than fuzzy matching and uses explicit LLM tags.
         """
-        stack = self.load_stack()
-        if not stack:
-            return False
+        with self._lock:
+            stack = self.load_stack()
+            if not stack:
+                return False
 
-        active_plan = stack[-1]
+            active_plan = stack[-1]
 
-        # Adjust for 0-based array (Step 1 is index 0)
-        array_index = step_index - 1
+            # Adjust for 0-based array (Step 1 is index 0)
+            array_index = step_index - 1
 
-        if 0 <= array_index < len(active_plan['steps']):
-            if not active_plan['steps'][array_index]['completed']:
-                active_plan['steps'][array_index]['completed'] = True
-                print(f"Action plan: Explicitly marked Step {step_index} as completed.")
-                self._save_stack(stack)
-                return True
+            if 0 <= array_index < len(active_plan['steps']):
+                if not active_plan['steps'][array_index]['completed']:
+                    active_plan['steps'][array_index]['completed'] = True
+                    print(f"Action plan: Explicitly marked Step {step_index} as completed.")
+                    self._save_stack(stack)
+                    return True
 
-        return False
+            return False
 
     def pop_finished_plans(self):
         """Helper to remove finished plans from top of stack (called before getting status or setting new ones)."""
-        stack = self.load_stack()
-        if not stack: return
-
-        # If top plan is done, remove it
-        if all(s.get('completed', False) for s in stack[-1]['steps']):
-             # Only pop if there is a parent plan to go back to, OR if we want to clear the slate
-             if len(stack) > 0:
-                 finished = stack.pop()
-                 print(f"Popped finished plan: {finished['title']}")
-                 self._save_stack(stack)
+        with self._lock:
+            stack = self.load_stack()
+            if not stack: return
+
+            # If top plan is done, remove it
+            if all(s.get('completed', False) for s in stack[-1]['steps']):
+                 # Only pop if there is a parent plan to go back to, OR if we want to clear the slate
+                 if len(stack) > 0:
+                     finished = stack.pop()
+                     print(f"Popped finished plan: {finished['title']}")
+                     self._save_stack(stack)
 
     def clear_plan(self):
         """Clears the entire stack."""
         self._save_stack([])
+        self.flush()
         print("Action plan stack cleared")
 
 
@@ -698,8 +1299,8 @@ class UnifiedLogManager:
         self.action_plan = ActionPlanManager()  # NEW
 
     # === Task Lifecycle ===
-    def log_new_task(self, objective: str, system_info: str):
-        self.base_log.log_new_task(objective, system_info)
+    def log_new_task(self, objective: str, system_info: str, task_id: Optional[str] = None):
+        self.base_log.log_new_task(objective, system_info, task_id)
 
         # Also append to LLM Context so agent sees the new goal
         context_entry = f"\n\n=== NEW TASK STARTED ===\nObjective: {objective}\nSystem Info: {system_info}\n=========================\n"
@@ -753,10 +1354,7 @@ class UnifiedLogManager:
         Log a manual edit event to the full log and update memory.
         """
         # 1. Log to disk (so we have a record that user changed things)
-        log_entry = f"\n\n=== USER MANUALLY EDITED MEMORY/CONTEXT ===\n" \
-                    f"Note: The user has rewritten the agent's memory at this point.\n" \
-                    f"===========================================\n\n"
-        self.base_log._append(log_entry)
+        self.base_log.log_manual_edit()
 
         # 2. Overwrite the memory file
         self.agent_memory.overwrite_context(new_context_content)
@@ -764,16 +1362,20 @@ class UnifiedLogManager:
     # === Views & Context ===
     def get_full_log(self) -> str:
         """Get the Full Log (truncated for UI performance)."""
-        full_text = self.base_log.read_full_log()
-
         # Hard limit for UI display (e.g. 1MB approx 100k chars)
         # If the user needs the REAL full log, they should use 'Save Session' (ZIP)
         MAX_CHARS = 500000 # 500KB
 
-        if len(full_text) > MAX_CHARS:
-            return f"... [Log too large for browser ({len(full_text)//1024} KB). Download Session to view full log.] ...\n\n" + full_text[-MAX_CHARS:]
+        # Only the newest segments are read, so cost is bounded by MAX_CHARS, not the session size
+        tail_text, truncated = self.base_log.read_tail_text(MAX_CHARS)
+        if truncated:
+            return f"... [Log too large for browser ({self.base_log.get_total_bytes()//1024} KB on disk). Download Session to view full log.] ...\n\n" + tail_text
 
-        return full_text
+        return tail_text
+
+    def get_log_page(self, view: str, before_offset: Optional[int] = None, limit: int = 500) -> Dict:
+        """Paginated view ('full', 'actions', 'commands', 'vm_screen'), newest page first."""
+        return self.view_generator.get_page(view, before_offset, limit)
 
     def get_actions_view(self) -> str:
         return self.view_generator.get_actions_view()
@@ -798,71 +1400,65 @@ class UnifiedLogManager:
     def get_context_size(self) -> int:
         return self.agent_memory.get_context_size()
 
+    def get_log_version(self) -> str:
+        """Version of the Full Log and of every view derived from it."""
+        return self.base_log.version
+
+    def get_context_version(self) -> str:
+        return self.agent_memory.get_context_version()
+
     def search_past_context(self, query: str, limit: int = 50) -> str:
         """
         Searches the full log. If a match is found within a file content block,
         returns the entire block. Otherwise, returns a standard context window.
+        Streams over the events, so the full log is never loaded into memory.
         """
-        full_log = self.base_log.read_full_log()
-        if not full_log: return "No log data available."
-
         clean_query = query.strip().strip('"\'`')
-        lines = full_log.split('\n')
-        matching_sections = []
         query_lower = clean_query.lower()
+        LINES_BEFORE, LINES_AFTER = 5, 9
 
-        # Helper to find block boundaries
-        def expand_to_block(start_idx, end_idx):
-            # Markers for file content blocks
-            FILE_START_MARKER = "--- FILE CONTENT WRITTEN TO"
-            FILE_END_MARKER = "--- END FILE CONTENT ---"
-
-            block_start = max(0, start_idx - 5)
-            block_end = min(len(lines), end_idx + 10)
-
-            # 1. Search backwards for start marker (up to 2000 lines back)
-            found_start = False
-            potential_start = -1
-
-            for i in range(start_idx, max(-1, start_idx - 2000), -1):
-                if FILE_START_MARKER in lines[i]:
-                    potential_start = i
-                    found_start = True
-                    break
-                # Stop if we hit a previous end marker (overlap protection)
-                if FILE_END_MARKER in lines[i] and i < start_idx:
-                    break
-
-            # 2. If start found, search forwards for end marker
-            if found_start:
-                for i in range(end_idx, min(len(lines), end_idx + 4000)):
-                    if FILE_END_MARKER in lines[i]:
-                        # We found a complete block!
-                        return potential_start, i + 1 # Include the marker line
-
-            # Default logic: standard small context window if no block detected
-            return block_start, block_end
-
-        # Find matches
-        i = 0
-        while i < len(lines):
-            if query_lower in lines[i].lower():
-                # We found a match at line i. Try to expand to full block.
-                start, end = expand_to_block(i, i)
-
-                section = '\n'.join(lines[start:end])
-
-                # Avoid duplicates if multiple hits are in the same block
-                if not matching_sections or section != matching_sections[-1]:
-                    matching_sections.append(section)
-
-                # Skip ahead to avoid finding the same block multiple times
-                i = end
+        matching_sections = []
+        previous_lines = deque(maxlen=LINES_BEFORE)
+        current_section = None
+        remaining_after = 0
+        has_data = False
+
+        def add_section(lines):
+            section = '\n'.join(lines)
+            # Avoid duplicates if multiple hits are in the same block
+            if not matching_sections or section != matching_sections[-1]:
+                matching_sections.append(section)
+
+        for event in self.base_log.iter_events():
+            has_data = True
+            text = render_event_text(event)
+            lines = text.split('\n')[:-1] if text.endswith('\n') else text.split('\n')
+
+            # File content blocks are returned whole when any of their lines match
+            if event.get('type') == EVENT_FILE_CONTENT and current_section is None and query_lower in text.lower():
+                add_section(text.rstrip('\n').split('\n'))
+                previous_lines.clear()
+                if len(matching_sections) >= limit: break
+                continue
 
+            for line in lines:
+                if current_section is not None:
+                    current_section.append(line)
+                    remaining_after -= 1
+                    if remaining_after == 0:
+                        add_section(current_section)
+                        current_section = None
+                elif query_lower in line.lower():
+                    current_section = list(previous_lines) + [line]
+                    remaining_after = LINES_AFTER
+                previous_lines.append(line)
                 if len(matching_sections) >= limit: break
-            else:
-                i += 1
+            if len(matching_sections) >= limit: break
 
+        if current_section is not None and len(matching_sections) < limit:
+            add_section(current_section)
+
+        if not has_data: return "No log data available."
         if not matching_sections: return f"No matches found for: {clean_query}"
 
         result = f"=== SEARCH RESULTS FOR: {clean_query} ===\n\n"
@@ -889,9 +1485,9 @@ class UnifiedLogManager:
         """Log a chat message to persistent history."""
         self.chat_log.add_message(role, content)
 
-    def get_chat_history(self) -> List[Dict]:
-        """Get all chat messages from persistent history."""
-        return self.chat_log.load_history()
+    def get_chat_history(self, limit: Optional[int] = None) -> List[Dict]:
+        """Get the last `limit` chat messages (all kept messages by default)."""
+        return self.chat_log.load_history(limit)
 
     def clear_chat_history(self):
         """Clear all chat history."""
@@ -914,6 +1510,10 @@ class UnifiedLogManager:
         """Clear the active action plan."""
         self.action_plan.clear_plan()
 
+    def flush(self):
+        """Writes any pending write-behind state (action plan) to disk."""
+        self.action_plan.flush()
+
     def reload_state(self):
         """
         Critical for Load Session: Forces the manager to re-read JSON files
@@ -921,13 +1521,12 @@ class UnifiedLogManager:
         """
         print("UnifiedLogManager: Reloading internal state from disk...")
         # Reload Chat History
-        self.chat_log.history = self.chat_log.load_history()
+        self.chat_log.reload()
 
-        # Reload Action Plan (Plan is stateless in memory, always reads file,
-        # but good to ensure no cached data if we add caching later)
-        pass
+        # Reload Action Plan (cached in memory)
+        self.action_plan.reload()
 
-        # Reset internal pointers for Execution Log if needed
-        self.base_log.current_step = 0  # Or try to calculate from log content
+        # Re-read the event log position (the file may have been replaced on disk)
+        self.base_log.reload()
 
         print("UnifiedLogManager: State reload complete.")
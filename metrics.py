@@ -0,0 +1,248 @@
+import bisect
+import threading
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+from tracing import TRACER
+
+# ===========================
+# === METRIC TYPES ===
+# ===========================
+# Minimal Prometheus text-format (0.0.4) metrics, without extra dependencies.
+# Hot-path cost of inc()/observe() is one dict lookup and a few additions under a lock.
+# Gauges that describe state (sizes, client counts) are computed only when /metrics is scraped.
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+
+def _format_labels(labelnames: Sequence[str], values: Tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    TYPE = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple, object] = {}
+        REGISTRY.append(self)
+
+    def _key(self, labels: Dict) -> Tuple:
+        return tuple(labels.get(name, '') for name in self.labelnames)
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.TYPE}"]
+        lines.extend(self._render_samples())
+        return "\n".join(lines)
+
+    def _render_samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Counter(_Metric):
+    TYPE = 'counter'
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    TYPE = 'gauge'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._function: Optional[Callable] = None
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set_function(self, function: Callable):
+        """
+        Computes the value at scrape time. The function returns a number, or for labelled
+        gauges a dict {label_value_tuple: number}.
+        """
+        self._function = function
+
+    def _render_samples(self):
+        if self._function is not None:
+            try:
+                result = self._function()
+            except Exception as e:
+                print(f"Metrics: gauge {self.name} failed: {e}")
+                return
+            if isinstance(result, dict):
+                for key, value in result.items():
+                    key = key if isinstance(key, tuple) else (key,)
+                    yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            elif result is not None:
+                yield f"{self.name} {_format_value(result)}"
+            return
+        yield from super()._render_samples()
+
+
+class Histogram(_Metric):
+    TYPE = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # [per-bucket counts (non-cumulative) + overflow, sum, count]
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def _render_samples(self):
+        with self._lock:
+            items = [(key, (list(state[0]), state[1], state[2])) for key, state in self._values.items()]
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = 'le="' + _format_value(bound) + '"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, key)} {count}"
+
+
+REGISTRY = []
+
+
+def render() -> str:
+    """Prometheus text exposition of all registered metrics."""
+    return "\n".join(metric.render() for metric in REGISTRY) + "\n"
+
+
+# ===========================
+# === CONTROLLER METRICS ===
+# ===========================
+
+PHASE_DURATION = Histogram(
+    'agent_phase_duration_seconds', 'Duration of agent task phases (from tracing spans).', ['phase'])
+
+LLM_REQUEST_DURATION = Histogram(
+    'llm_request_duration_seconds', 'LLM call latency.', ['provider', 'model', 'role'])
+LLM_REQUESTS = Counter(
+    'llm_requests_total', 'LLM calls by outcome.', ['provider', 'model', 'role', 'status'])
+LLM_TOKENS = Counter(
+    'llm_tokens_total', 'LLM tokens (provider usage metadata when available, otherwise estimated as chars/4).',
+    ['provider', 'model', 'role', 'direction'])
+
+SSH_CONNECT_DURATION = Histogram(
+    'ssh_connect_duration_seconds', 'SSH connection + authentication latency.')
+SSH_EXEC_DURATION = Histogram(
+    'ssh_exec_duration_seconds', 'SSH command execution latency (exec + output read).')
+SSH_COMMAND_ATTEMPTS = Counter(
+    'ssh_command_attempts_total', 'Agent SSH command attempts by outcome.', ['outcome'])
+SSH_RETRIES = Counter(
+    'ssh_command_retries_total', 'Agent SSH command attempts after the first one.')
+
+AGENT_ACTIONS_PARSED = Counter(
+    'agent_actions_parsed_total', 'Agent LLM replies by action protocol and parse outcome (none = format retry).',
+    ['protocol', 'outcome'])
+VALIDATOR_DECISIONS = Counter(
+    'validator_decisions_total', 'Command validation decisions.', ['mode', 'decision'])
+SUMMARIZATIONS = Counter(
+    'summarizations_total', 'Summarizations performed.', ['kind'])
+SUMMARIZATION_BYTES_SAVED = Counter(
+    'summarization_bytes_saved_total', 'Characters removed from the context by summarization.', ['kind'])
+
+PROMPT_CACHE_TOKENS = Counter(
+    'llm_prompt_cache_tokens_total', 'Agent prompt input tokens by prompt-cache result (hit = read from cache, write = cached now, miss = uncached).',
+    ['provider', 'result'])
+PROMPT_CACHE_HIT_RATIO = Gauge(
+    'llm_prompt_cache_hit_ratio', 'Share of agent prompt input tokens served from the provider prompt cache.', ['provider'])
+
+CONTEXT_SIZE = Gauge(
+    'agent_context_size_chars', 'Current size of the LLM context (agent working memory).')
+LOG_FILE_BYTES = Gauge(
+    'log_file_size_bytes', 'On-disk size of the persistent logs.', ['log'])
+SOCKETIO_CLIENTS = Gauge(
+    'socketio_active_clients', 'Connected Socket.IO clients.')
+SOCKETIO_EVENTS = Counter(
+    'socketio_events_total', 'Agent Socket.IO events through the event bus (queued, coalesced, batched, dropped, resync).', ['outcome'])
+STARTUP_DURATION = Gauge(
+    'app_startup_duration_seconds', 'Time spent in each startup phase.', ['phase'])
+
+
+def record_llm_call(provider: str, model: str, role: str, duration: float, status: str, prompt=None, response=None):
+    """Records one LLM call (latency, outcome and token counts)."""
+    LLM_REQUEST_DURATION.observe(duration, provider=provider, model=model, role=role)
+    LLM_REQUESTS.inc(provider=provider, model=model, role=role, status=status)
+    if response is None:
+        return
+    usage = getattr(response, 'usage_metadata', None) or {}
+    input_tokens = usage.get('input_tokens')
+    output_tokens = usage.get('output_tokens')
+    if input_tokens is None and prompt is not None:
+        input_tokens = len(str(prompt)) // 4
+    if output_tokens is None:
+        output_tokens = len(str(getattr(response, 'content', response))) // 4
+    LLM_TOKENS.inc(input_tokens or 0, provider=provider, model=model, role=role, direction='input')
+    LLM_TOKENS.inc(output_tokens or 0, provider=provider, model=model, role=role, direction='output')
+
+
+def record_prompt_cache(provider: str, hit_tokens: int, write_tokens: int, miss_tokens: int):
+    """Records how many prompt tokens the provider read from / wrote to its prompt cache."""
+    PROMPT_CACHE_TOKENS.inc(max(0, hit_tokens), provider=provider, result='hit')
+    PROMPT_CACHE_TOKENS.inc(max(0, write_tokens), provider=provider, result='write')
+    PROMPT_CACHE_TOKENS.inc(max(0, miss_tokens), provider=provider, result='miss')
+
+
+def _prompt_cache_hit_ratio() -> Dict:
+    totals: Dict[str, Dict[str, float]] = {}
+    with PROMPT_CACHE_TOKENS._lock:
+        for (provider, result), value in PROMPT_CACHE_TOKENS._values.items():
+            totals.setdefault(provider, {})[result] = value
+    return {
+        (provider,): round(values.get('hit', 0) / sum(values.values()), 4)
+        for provider, values in totals.items() if sum(values.values())
+    }
+
+
+PROMPT_CACHE_HIT_RATIO.set_function(_prompt_cache_hit_ratio)
+
+
+def record_summarization(kind: str, chars_before: int, chars_after: int):
+    SUMMARIZATIONS.inc(kind=kind)
+    SUMMARIZATION_BYTES_SAVED.inc(max(0, chars_before - chars_after), kind=kind)
+
+
+# Phase histograms are fed from the tracer, so every traced phase is measured without extra calls
+TRACER.add_listener(lambda name, cat, duration, args: PHASE_DURATION.observe(duration, phase=name))
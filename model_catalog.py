@@ -0,0 +1,146 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from typing import Callable, Dict, Optional, Tuple
+
+from config import KEYS_DIR
+import llm_utils
+
+# ===========================
+# === MODEL CATALOGUE ===
+# ===========================
+# Cached model lists per provider + credential (Ollama URL or API key), persisted in
+# keys/model_catalog.json so the settings UI gets its dropdowns instantly after a restart.
+# - fresh entry: served from cache
+# - stale entry: served from cache, refreshed in the background (stale-while-revalidate)
+# - refresh: conditional request (ETag / Last-Modified) where the provider API is plain HTTP
+# Failed refreshes are never cached; the last good list keeps being served.
+
+MODEL_CATALOG_PATH = os.path.join(KEYS_DIR, 'model_catalog.json')
+CATALOG_TTL_SECONDS = {
+    'ollama': 60,           # Local server, models change whenever someone runs 'ollama pull'
+    'gemini': 6 * 3600,
+    'anthropic': 6 * 3600,
+}
+
+FETCHERS = {
+    'ollama': llm_utils.check_ollama_connection,
+    'gemini': llm_utils.check_gemini_connection,
+    'anthropic': llm_utils.check_anthropic_connection,
+}
+CONDITIONAL_PROVIDERS = {'ollama', 'anthropic'}   # Fetchers that accept ETag/Last-Modified validators
+
+
+def _entry_key(provider: str, credential: str) -> str:
+    # API keys are never written to disk, only a hash identifying them
+    digest = hashlib.sha256(f"{provider}:{credential}".encode('utf-8')).hexdigest()[:16]
+    return f"{provider}:{digest}"
+
+
+class ModelCatalog:
+    """Per-provider model list cache with TTL, background revalidation and disk persistence."""
+
+    def __init__(self, path: str = MODEL_CATALOG_PATH, spawn: Optional[Callable] = None):
+        self.path = path
+        # spawn(func) starts a background task; app.py replaces it with socketio.start_background_task
+        self.spawn = spawn or (lambda func: threading.Thread(target=func, daemon=True).start())
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        self._entries: Dict[str, Dict] = self._load()
+
+    # === Persistence ===
+
+    def _load(self) -> Dict[str, Dict]:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return data.get('entries', {}) if isinstance(data, dict) else {}
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            print(f"Model catalogue: could not read {self.path}: {e}")
+            return {}
+
+    def _save(self):
+        with self._lock:
+            data = {'entries': dict(self._entries)}
+        tmp_path = self.path + '.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            print(f"Model catalogue: could not save {self.path}: {e}")
+
+    # === Lookup ===
+
+    def get_models(self, provider: str, credential: str, force: bool = False) -> Tuple[bool, str, list]:
+        """
+        Returns (ok, message, models) like the llm_utils check functions, from cache when possible.
+        force=True always queries the provider (conditionally, if it supports it).
+        """
+        if provider not in FETCHERS:
+            return False, f"Unknown provider: {provider}", []
+        if not credential:
+            return FETCHERS[provider](credential)
+
+        entry = self._entries.get(_entry_key(provider, credential))
+        if entry is None or force:
+            return self.refresh(provider, credential)
+
+        if time.time() - entry['fetched_at'] >= CATALOG_TTL_SECONDS[provider]:
+            self._refresh_in_background(provider, credential)
+        return True, entry['message'], list(entry['models'])
+
+    def refresh(self, provider: str, credential: str) -> Tuple[bool, str, list]:
+        """Queries the provider now and updates the cache on success."""
+        key = _entry_key(provider, credential)
+        entry = self._entries.get(key)
+
+        if provider in CONDITIONAL_PROVIDERS:
+            validators = dict(entry.get('validators', {})) if entry else {}
+            ok, message, models = FETCHERS[provider](credential, validators=validators)
+        else:
+            validators = {}
+            ok, message, models = FETCHERS[provider](credential)
+
+        if not ok:
+            return ok, message, models
+        if models is None:
+            # 304 Not Modified (only possible when validators from a cached entry were sent)
+            models, message = entry['models'], entry['message']
+
+        with self._lock:
+            self._entries[key] = {
+                'provider': provider,
+                'models': models,
+                'message': message,
+                'fetched_at': time.time(),
+                'validators': validators,
+            }
+        self._save()
+        return ok, message, list(models)
+
+    def _refresh_in_background(self, provider: str, credential: str):
+        key = _entry_key(provider, credential)
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def task():
+            try:
+                self.refresh(provider, credential)
+            except Exception as e:
+                print(f"Model catalogue: background refresh of {provider} failed: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        self.spawn(task)
+
+
+# Shared catalogue (settings routes + health checks)
+MODEL_CATALOG = ModelCatalog()
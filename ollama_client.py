@@ -0,0 +1,119 @@
+import requests
+from typing import List, Optional
+
+# ===========================
+# === OLLAMA NATIVE CLIENT ===
+# ===========================
+# Agent-side Ollama client talking to /api/generate directly, so the KV context of the
+# previous step can be reused. /api/generate returns 'context' (the token ids of prompt +
+# answer); sending it back with only the NEW text makes the server evaluate just that text
+# instead of the whole, ever-growing history.
+#
+# The agent prompt is head + history + tail (see prompt_cache.py) and the history is
+# append-only between summarizations. With stable_prefix = head + history:
+#   step 1:  prompt = head + history + tail                          -> context C1
+#   step 2:  prompt = (history appended since step 1) + tail, C1     -> context C2
+# so the model reads: head, history, tail, answer 1, new history, tail, answer 2 ...
+# The context is dropped (full prompt sent again) when the prefix changes (summarization,
+# objective or template edit) or when it would no longer fit in num_ctx.
+
+DEFAULT_NUM_CTX = 4096          # Ollama's default context window, when [Ollama] num_ctx is not set
+CONTEXT_FILL_LIMIT = 0.75       # Keep room for the new text and the answer
+CHARS_PER_TOKEN = 4             # Rough estimate, only used to decide if the new text fits
+
+
+class OllamaText(str):
+    """Reply text with token usage attached (read by metrics.record_llm_call / record_cache_usage)."""
+    usage_metadata: dict = {}
+
+
+class OllamaSession:
+    """
+    LangChain-compatible invoke() for Ollama with optional context reuse.
+    invoke(prompt) alone is stateless (used by the summarizer); invoke(prompt, stable_prefix=...)
+    continues the agent's conversation context.
+    """
+
+    def __init__(self, base_url: str, model: str, timeout: int = 300, keep_alive: Optional[str] = None,
+                 format: Optional[str] = None, num_ctx: int = 0):
+        self.base_url = base_url.rstrip('/')
+        self.model = model
+        self.timeout = timeout
+        self.keep_alive = keep_alive
+        self.format = format
+        self.num_ctx = num_ctx
+        self._context: Optional[List[int]] = None
+        self._covered = ""      # stable_prefix text already inside self._context
+
+    def reset(self):
+        """Forgets the conversation context (next call sends the full prompt)."""
+        self._context = None
+        self._covered = ""
+
+    def _continuation(self, prompt: str, stable_prefix: Optional[str]):
+        """Returns (text_to_send, context) for this call."""
+        if not stable_prefix or not prompt.startswith(stable_prefix):
+            return prompt, None
+        if self._context is None or not stable_prefix.startswith(self._covered):
+            return prompt, None
+        new_text = prompt[len(self._covered):]
+        limit = (self.num_ctx or DEFAULT_NUM_CTX) * CONTEXT_FILL_LIMIT
+        if len(self._context) + len(new_text) // CHARS_PER_TOKEN > limit:
+            print(f"Ollama context full ({len(self._context)} tokens). Sending the full prompt.")
+            return prompt, None
+        return new_text, self._context
+
+    def invoke(self, prompt: str, stop: Optional[List[str]] = None, stable_prefix: Optional[str] = None, **kwargs) -> OllamaText:
+        text, context = self._continuation(str(prompt), stable_prefix)
+        payload = {'model': self.model, 'prompt': text, 'stream': False}
+        options = {}
+        if stop:
+            options['stop'] = stop
+        if self.num_ctx:
+            options['num_ctx'] = self.num_ctx
+        if options:
+            payload['options'] = options
+        if context is not None:
+            payload['context'] = context
+        if self.keep_alive is not None:
+            payload['keep_alive'] = self.keep_alive
+        if self.format:
+            payload['format'] = self.format
+
+        try:
+            response = requests.post(f"{self.base_url}/api/generate", json=payload, timeout=self.timeout)
+            response.raise_for_status()
+            data = response.json()
+        except Exception:
+            # A failed agent call leaves the conversation state unknown; start over on the next call
+            if stable_prefix is not None:
+                self.reset()
+            raise
+
+        if stable_prefix is not None:
+            if data.get('context') and prompt.startswith(stable_prefix):
+                self._context = data['context']
+                self._covered = stable_prefix
+            else:
+                self.reset()
+
+        reused = len(context) if context is not None else 0
+        evaluated = data.get('prompt_eval_count') or 0
+        result = OllamaText(data.get('response', ''))
+        result.usage_metadata = {
+            'input_tokens': reused + evaluated,
+            'output_tokens': data.get('eval_count') or 0,
+            'input_token_details': {'cache_read': reused},
+        }
+        return result
+
+
+# --- Bloc optional pentru testare ---
+if __name__ == '__main__':
+    session = OllamaSession('http://localhost:11434', 'llama3:latest', num_ctx=8192)
+    session._context, session._covered = [1] * 100, "HEAD\nstep 1\n"
+    text, context = session._continuation("HEAD\nstep 1\nstep 2\nTAIL", "HEAD\nstep 1\nstep 2\n")
+    assert text == "step 2\nTAIL" and len(context) == 100
+    text, context = session._continuation("HEAD\nsummary\nTAIL", "HEAD\nsummary\n")
+    assert text == "HEAD\nsummary\nTAIL" and context is None
+    print("Continuation checks passed.")
@@ -0,0 +1,165 @@
+import os
+import re
+import time
+import uuid
+import codecs
+from typing import Dict, List, Optional
+
+from config import KEYS_DIR
+from ansi_stripper import AnsiStripper
+
+# ===========================
+# === OUTPUT CAPTURE ===
+# ===========================
+# Sink for the stdout / stderr of one SSH command. Raw bytes are decoded and ANSI-stripped
+# incrementally; up to memory_limit characters are kept in memory. Beyond that the whole
+# output goes to a spill file (keys/command_output/<id>.log) and only a head and a tail stay
+# in memory, so a 'cat' of a huge file costs a bounded amount of RAM. text() then returns
+# head + stats + tail: that is what the full log, the VM Screen and the LLM get, and the
+# complete output is paged from disk (GET /command_output/<id>).
+
+COMMAND_OUTPUT_DIR = os.path.join(KEYS_DIR, 'command_output')
+DEFAULT_MEMORY_LIMIT = 1024 * 1024      # Characters kept in memory before spilling ([System] output_memory_cap_kb)
+HEAD_CHARS = 8 * 1024                   # Kept from the start of a spilled output
+TAIL_CHARS = 8 * 1024                   # Kept from the end of a spilled output
+MAX_SPILL_FILES = 20                    # Older spill files are deleted
+SPILL_ID_RE = re.compile(r'^[0-9]{8}-[0-9]{6}-[0-9a-f]{8}$')
+
+
+class OutputCapture:
+    """Bounded capture of one output stream (spills to disk beyond memory_limit)."""
+
+    def __init__(self, memory_limit: int = DEFAULT_MEMORY_LIMIT, spill_dir: str = COMMAND_OUTPUT_DIR):
+        self.memory_limit = max(memory_limit, HEAD_CHARS + TAIL_CHARS)
+        self.spill_dir = spill_dir
+        self.spill_id: Optional[str] = None
+        self.chars = 0
+        self.lines = 0
+        self.raw_bytes = 0
+        self._parts: List[str] = []
+        self._head = ""
+        self._tail = ""
+        self._spill_file = None
+        self._decoder = codecs.getincrementaldecoder('utf-8')('ignore')
+        self._stripper = AnsiStripper()
+
+    @property
+    def spilled(self) -> bool:
+        return self.spill_id is not None
+
+    def feed(self, data: bytes):
+        """Adds raw bytes read from the channel."""
+        self.raw_bytes += len(data)
+        self._write(self._stripper.feed(self._decoder.decode(data)))
+
+    def finish(self):
+        """Flushes the decoder and the stripper and closes the spill file."""
+        self._write(self._stripper.feed(self._decoder.decode(b"", final=True)) + self._stripper.flush())
+        if self._spill_file:
+            self._spill_file.close()
+            self._spill_file = None
+
+    def _write(self, text: str):
+        if not text:
+            return
+        self.chars += len(text)
+        self.lines += text.count('\n')
+        if self._spill_file:
+            self._spill_file.write(text)
+            self._tail = (self._tail + text)[-TAIL_CHARS:]
+            return
+        self._parts.append(text)
+        if self.chars > self.memory_limit:
+            self._spill()
+
+    def _spill(self):
+        os.makedirs(self.spill_dir, exist_ok=True)
+        _prune_spill_files(self.spill_dir, MAX_SPILL_FILES - 1)
+        self.spill_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        self._spill_file = open(os.path.join(self.spill_dir, f"{self.spill_id}.log"), 'w', encoding='utf-8')
+        text = "".join(self._parts)
+        self._parts = []
+        self._spill_file.write(text)
+        self._head, self._tail = text[:HEAD_CHARS], text[-TAIL_CHARS:]
+        print(f"Command output exceeded {self.memory_limit} chars, spilling to {self._spill_file.name}")
+
+    def text(self) -> str:
+        """The whole output, or head + stats + tail once it was spilled."""
+        if not self.spilled:
+            if len(self._parts) > 1:
+                self._parts = ["".join(self._parts)]
+            return self._parts[0] if self._parts else ""
+        omitted = self.chars - len(self._head) - len(self._tail)
+        return (f"{self._head}\n\n... [Output too large: {self.raw_bytes / (1024 * 1024):.1f} MB, {self.lines} lines. "
+                f"{omitted} characters omitted here; full output saved on the controller: "
+                f"/command_output/{self.spill_id}] ...\n\n{self._tail}")
+
+    def stats(self) -> Dict:
+        return {'chars': self.chars, 'lines': self.lines, 'bytes': self.raw_bytes, 'spill_id': self.spill_id}
+
+
+def _prune_spill_files(spill_dir: str, keep: int):
+    try:
+        names = sorted(name for name in os.listdir(spill_dir) if name.endswith('.log'))
+    except FileNotFoundError:
+        return
+    for name in names[:max(0, len(names) - keep)]:
+        try:
+            os.remove(os.path.join(spill_dir, name))
+        except OSError as e:
+            print(f"Could not delete old command output {name}: {e}")
+
+
+def spill_path(spill_id: str, spill_dir: str = COMMAND_OUTPUT_DIR) -> Optional[str]:
+    """Path of a spilled output (None for an invalid or deleted id)."""
+    if not SPILL_ID_RE.match(spill_id or ""):
+        return None
+    path = os.path.join(spill_dir, f"{spill_id}.log")
+    return path if os.path.exists(path) else None
+
+
+def read_spill_page(spill_id: str, offset: int = 0, limit: int = 64 * 1024) -> Optional[Dict]:
+    """One page of a spilled output: 'limit' bytes from byte 'offset' (cut at a line end when possible)."""
+    path = spill_path(spill_id)
+    if path is None:
+        return None
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        f.seek(max(0, offset))
+        data = f.read(limit)
+    if len(data) == limit and offset + limit < size:
+        cut = data.rfind(b'\n') + 1
+        if cut > 0:
+            data = data[:cut]
+    next_offset = max(0, offset) + len(data)
+    return {'data': data.decode('utf-8', 'ignore'), 'offset': offset, 'next_offset': next_offset,
+            'size': size, 'eof': next_offset >= size}
+
+
+# --- Bloc optional pentru testare ---
+if __name__ == '__main__':
+    import tempfile
+    import tracemalloc
+
+    spill_dir = tempfile.mkdtemp()
+    tracemalloc.start()
+    capture = OutputCapture(memory_limit=256 * 1024, spill_dir=spill_dir)
+    line = ("\x1b[32m" + "x" * 90 + "\x1b[0m\r\n").encode('utf-8')
+    for _ in range(300):            # ~21 MB of colored PTY output in ~70 KB reads
+        capture.feed(line * 700)
+    capture.finish()
+    peak_mb = tracemalloc.get_traced_memory()[1] / 1e6
+    tracemalloc.stop()
+
+    result = capture.text()
+    assert capture.spilled and len(result) < HEAD_CHARS + TAIL_CHARS + 500, len(result)
+    assert capture.lines == 210000 and "210000 lines" in result
+    assert os.path.getsize(os.path.join(spill_dir, f"{capture.spill_id}.log")) == capture.chars
+    assert peak_mb < 10, peak_mb
+
+    small = OutputCapture(spill_dir=spill_dir)
+    for piece in ("é".encode('utf-8')[:1], "é".encode('utf-8')[1:], b"\x1b[1mok\x1b[0m\r\n"):
+        small.feed(piece)      # Multi-byte character and escape split across reads
+    small.finish()
+    assert small.text() == "éok\n" and not small.spilled
+    print(f"Output capture checks passed: {capture.raw_bytes / 1e6:.0f} MB captured, peak {peak_mb:.1f} MB in memory.")
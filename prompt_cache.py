@@ -0,0 +1,102 @@
+from typing import List, Tuple
+
+import metrics
+
+# ===========================
+# === PROMPT PREFIX CACHE ===
+# ===========================
+# The agent prompt is laid out as   head | history | tail
+#   head    - template text before {history} (instructions, objective, system info): stable
+#   history - append-only between summarizations (one chunk per step is appended)
+#   tail    - template text after {history} (+ native protocol instructions): small
+# AgentPromptCache remembers the history chunks sent on previous steps, so every request
+# starts with the previous request's head + history. Providers reuse that prefix:
+#   Anthropic - content blocks with cache_control breakpoints (end of head, end of the previous
+#               step's history, end of this step's history)
+#   Ollama    - keep_alive keeps the model, and the KV cache of the last prompt, loaded between steps
+#   Gemini    - implicit prefix caching on supported models, nothing to mark
+
+HISTORY_PLACEHOLDER = "\x00HISTORY\x00"
+OLLAMA_KEEP_ALIVE = '30m'       # Longer than the slowest step (command timeout + validation)
+CACHE_CONTROL = {"type": "ephemeral"}
+
+
+def split_rendered_prompt(rendered: str) -> Tuple[str, str]:
+    """Splits a template rendered with history=HISTORY_PLACEHOLDER into (head, tail)."""
+    head, found, tail = rendered.partition(HISTORY_PLACEHOLDER)
+    if not found:
+        # Template without {history}: the whole prompt is the stable prefix
+        return rendered, ""
+    return head, tail.replace(HISTORY_PLACEHOLDER, "")
+
+
+class AgentPromptCache:
+    """Per-task prompt layout; one instance lives for the duration of agent_task_runner."""
+
+    def __init__(self, provider: str):
+        self.provider = provider
+        self._head = None
+        self._chunks: List[str] = []
+
+    def _history_chunks(self, head: str, history: str) -> List[str]:
+        sent = "".join(self._chunks)
+        if head == self._head and sent and history.startswith(sent):
+            # Append-only growth: previous chunks stay byte-identical, the new step text is one chunk
+            delta = history[len(sent):]
+            if delta:
+                self._chunks.append(delta)
+        else:
+            # First step, summarization or objective change: the cached prefix is rebuilt
+            self._chunks = [history] if history else []
+        self._head = head
+        return self._chunks
+
+    def build(self, head: str, history: str, tail: str):
+        """Returns (llm_input, full_prompt_text) for this step."""
+        chunks = self._history_chunks(head, history)
+        full_prompt = head + history + tail
+        if self.provider != 'anthropic':
+            return full_prompt, full_prompt
+
+        from langchain_core.messages import HumanMessage
+
+        blocks = [{"type": "text", "text": text} for text in [head] + chunks + [tail] if text.strip()]
+        # Breakpoints (max 4 per request): end of head, end of the previous history, end of the history
+        history_end = len(blocks) - (1 if tail.strip() else 0)
+        for index in {0, history_end - 2, history_end - 1}:
+            if 0 <= index < history_end:
+                blocks[index]["cache_control"] = CACHE_CONTROL
+        return [HumanMessage(content=blocks)], full_prompt
+
+
+def record_cache_usage(provider: str, response):
+    """Feeds the prompt-cache metrics from the usage a provider reported (no-op if it reported none)."""
+    usage = getattr(response, 'usage_metadata', None) or {}
+    details = usage.get('input_token_details') or {}
+    raw_usage = (getattr(response, 'response_metadata', None) or {}).get('usage') or {}
+
+    hit = details.get('cache_read', raw_usage.get('cache_read_input_tokens'))
+    write = details.get('cache_creation', raw_usage.get('cache_creation_input_tokens'))
+    if hit is None and write is None:
+        return
+    hit, write = hit or 0, write or 0
+    if 'input_tokens' in raw_usage:
+        # Anthropic's own input_tokens excludes the cached tokens
+        miss = raw_usage['input_tokens']
+    else:
+        miss = (usage.get('input_tokens') or 0) - hit - write
+    metrics.record_prompt_cache(provider, hit, write, miss)
+
+
+# --- Bloc optional pentru testare ---
+if __name__ == '__main__':
+    head, tail = split_rendered_prompt(f"Rules...\nHistory:\n{HISTORY_PLACEHOLDER}\nNext action:")
+    cache = AgentPromptCache('anthropic')
+    history = ""
+    for step in range(1, 4):
+        history += f"\n--- STEP {step} ---\nCOMMAND: ls\nOutput: ok\n"
+        messages, text = cache.build(head, history, tail)
+        marked = [i for i, block in enumerate(messages[0].content) if 'cache_control' in block]
+        print(f"step {step}: {len(messages[0].content)} blocks, breakpoints at {marked}")
+        assert text == head + history + tail
+    assert cache.build(head, "summary", tail)[0][0].content[1]["text"] == "summary"
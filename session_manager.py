@@ -1,5 +1,6 @@
 import os
 import json
+import shutil
 import traceback
 import zipfile
 from datetime import datetime
@@ -7,10 +8,15 @@ from typing import Dict, List, Optional
 
 from config import (
     APP_DIR, KEYS_DIR, SESSION_FILE_PATH, CONNECTIONS_FILE_PATH,
-    EXECUTION_LOG_FILE_PATH, CHAT_LOG_FILE_PATH, ACTION_PLAN_FILE_PATH,
-    CONFIG_FILE_PATH, EXECUTION_LOG_LLM_CONTEXT_PATH
+    EXECUTION_LOG_FILE_PATH, CHAT_LOG_FILE_PATH, CHAT_LOG_LEGACY_PATH, ACTION_PLAN_FILE_PATH,
+    CONFIG_FILE_PATH, EXECUTION_LOG_LLM_CONTEXT_PATH, EXECUTION_EVENT_LOG_PATH,
+    EXECUTION_LOG_SEGMENTS_DIR
 )
-from log_manager import UnifiedLogManager
+from log_manager import UnifiedLogManager, BaseLogManager, render_event_text
+from live_log import LiveLog, VmOutputStore
+
+# Cat din Full Log este incarcat in log-ul live (GLOBAL_STATE['live_log']) la pornire
+LOADED_LOG_MAX_CHARS = 500000
 
 # ---
 # --- Functii pentru Conexiuni SSH (Istoric) ---
@@ -47,11 +53,17 @@ def save_connections(connections):
 # --- Functii pentru Starea Aplicatiei (Sesiune & Log Executie) ---
 # ---
 
+def vm_output_text(vm_output) -> str:
+    """Text of the VM Screen store (plain strings from older callers are passed through)."""
+    if isinstance(vm_output, VmOutputStore):
+        return vm_output.text()
+    return vm_output or ""
+
 def save_current_session_to_disk(current_state, session_path, log_path):
     """
     Salveaza starea curenta a aplicatiei:
     1.  Datele de sesiune (istoric, etc.) in 'session.json'.
-    NOTE: execution_log.txt is now managed exclusively by UnifiedLogManager (append-only).
+    NOTE: execution_log.jsonl is now managed exclusively by UnifiedLogManager (append-only).
     """
     success_json = False
 
@@ -73,7 +85,7 @@ def save_current_session_to_disk(current_state, session_path, log_path):
         session_data_for_json = {
             'agent_history': current_state.get('agent_history', ""),
             'system_os_info': current_state.get('system_os_info', ""),
-            'persistent_vm_output': current_state.get('persistent_vm_output', ""),
+            'persistent_vm_output': vm_output_text(current_state.get('persistent_vm_output')),
             'last_session': {
                 "final_report": current_state.get('last_session', {}).get('final_report', ""),
                 "raw_llm_responses": current_state.get('last_session', {}).get('raw_llm_responses', [])
@@ -97,7 +109,8 @@ def save_current_session_to_disk(current_state, session_path, log_path):
 
 def load_session_from_disk(session_path, log_path):
     """
-    Incarca starea aplicatiei de pe disc ('session.json' si 'execution_log.txt').
+    Incarca starea aplicatiei de pe disc ('session.json' si log-ul segmentat 'execution_log/').
+    Only the newest events are rendered to the classic text format for the UI.
     Returneaza un dictionar cu starea incarcata.
     """
     loaded_state = {}
@@ -123,7 +136,7 @@ def load_session_from_disk(session_path, log_path):
             # Reconstituim starea pe baza datelor JSON
             loaded_state['agent_history'] = data.get('agent_history', "No history loaded.")
             loaded_state['system_os_info'] = data.get('system_os_info', "Unknown OS.")
-            loaded_state['persistent_vm_output'] = data.get('persistent_vm_output', "")
+            loaded_state['persistent_vm_output'] = VmOutputStore.from_text(data.get('persistent_vm_output', ""))
             loaded_state['full_history_backups'] = data.get('full_history_backups', [])
             
             # Asiguram ca 'last_session' exista
@@ -140,12 +153,18 @@ def load_session_from_disk(session_path, log_path):
         print(f"No session file found at {session_path}, starting fresh.")
         loaded_state = _get_default_session_data() # Folosim starea default
 
-    # 2. Incarcam 'execution_log.txt'
+    # 2. Incarcam coada log-ului de evenimente (ring buffer-ul log-ului live)
+    loaded_state['live_log'] = load_live_log(log_path)
+
+    return loaded_state
+
+def load_live_log(log_path) -> LiveLog:
+    """Live Execution Log rebuilt from the tail of the event log on disk (rendered as text)."""
     log_content = ""
+    log_truncated = False
     if os.path.exists(log_path):
         try:
-            with open(log_path, 'r', encoding='utf-8') as f:
-                log_content = f.read()
+            log_content, log_truncated = BaseLogManager(log_path).read_tail_text(LOADED_LOG_MAX_CHARS)
             print(f"Execution log loaded from {log_path}.")
         except Exception as e:
             print(f"Error reading execution log file {log_path}: {e}")
@@ -153,13 +172,8 @@ def load_session_from_disk(session_path, log_path):
     else:
         print(f"No execution log found at {log_path}, starting with default message.")
         log_content = "No previous execution log found. Ready for new task."
-        
-    # Adaugam log-ul la starea incarcata
-    if 'last_session' not in loaded_state:
-        loaded_state['last_session'] = {}
-    loaded_state['last_session']['log'] = log_content
 
-    return loaded_state
+    return LiveLog.from_text(log_content, truncated=log_truncated)
 
 def reset_all_memory(session_path, log_path):
     """
@@ -178,7 +192,7 @@ def reset_all_memory(session_path, log_path):
                 
     # Returnam starea default
     default_state = _get_default_session_data()
-    default_state['last_session']['log'] = "--- AGENT MEMORY RESET ---"
+    default_state['live_log'] = LiveLog.from_text("--- AGENT MEMORY RESET ---")
     return default_state
 
 def _get_default_session_data():
@@ -186,10 +200,9 @@ def _get_default_session_data():
     return {
         'agent_history': "No commands have been executed yet.",
         'system_os_info': "Unknown. The first step should be to determine the OS.",
-        'persistent_vm_output': "",
+        'persistent_vm_output': VmOutputStore(),
         'full_history_backups': [],
         'last_session': {
-            "log": "Application started. Ready for task.",
             "final_report": "",
             "raw_llm_responses": []
         }
@@ -210,45 +223,161 @@ def migrate_session_to_new_logs():
         print("Starting with fresh log system.")
         return UnifiedLogManager()
 
-def save_session_state(global_state):
+# ---
+# --- Export Sesiune (ZIP generat in flux) ---
+# ---
+
+EXPORT_CHUNK_SIZE = 256 * 1024          # Bytes read per file chunk / flushed to the response
+DEFAULT_EXPORT_COMPRESS_LEVEL = 6       # zlib level 1-9; 0 stores entries uncompressed
+# Runtime objects and live flags that are never exported
+SESSION_EXPORT_EXCLUDED_KEYS = {'log_manager', 'live_log'}
+
+
+class _ZipStreamSink:
     """
-    Saves the full application state to a ZIP file.
-    Dumps in-memory GLOBAL_STATE to session.json first.
+    Write-only file object for zipfile. It has no seek(), so zipfile writes data descriptors
+    after each entry instead of seeking back; the bytes written are drained between chunks.
     """
-    try:
-        # 1. Dump in-memory state to session.json
-        with open(SESSION_FILE_PATH, 'w') as f:
-            json.dump(global_state, f, indent=4, default=str)
 
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        zip_filename = f"session_{timestamp}.zip"
-        zip_path = os.path.join(APP_DIR, zip_filename)
+    def __init__(self):
+        self._chunks = []
+        self._offset = 0
+        self.pending = 0
 
-        with zipfile.ZipFile(zip_path, 'w') as zipf:
-            # Core State
-            zipf.write(SESSION_FILE_PATH, arcname='session.json')
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._offset += len(data)
+        self.pending += len(data)
+        return len(data)
 
-            # Config
-            if os.path.exists(CONFIG_FILE_PATH):
-                zipf.write(CONFIG_FILE_PATH, arcname='config.ini')
+    def tell(self) -> int:
+        return self._offset
 
-            # SSH Connections
-            if os.path.exists(CONNECTIONS_FILE_PATH):
-                zipf.write(CONNECTIONS_FILE_PATH, arcname='connections.json')
+    def flush(self):
+        pass
 
-            # Logs & History
-            if os.path.exists(EXECUTION_LOG_FILE_PATH):
-                zipf.write(EXECUTION_LOG_FILE_PATH, arcname='execution_log.txt')
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        self.pending = 0
+        return data
 
-            if os.path.exists(EXECUTION_LOG_LLM_CONTEXT_PATH):
-                zipf.write(EXECUTION_LOG_LLM_CONTEXT_PATH, arcname='execution_log_llm_context.txt')
 
-            if os.path.exists(CHAT_LOG_FILE_PATH):
-                zipf.write(CHAT_LOG_FILE_PATH, arcname='chat_history.json')
+def serializable_session_state(global_state: Dict) -> Dict:
+    """The JSON-serializable part of GLOBAL_STATE (runtime objects such as the log manager are skipped)."""
+    state = {}
+    for key, value in global_state.items():
+        if key in SESSION_EXPORT_EXCLUDED_KEYS:
+            continue
+        if isinstance(value, VmOutputStore):
+            value = value.text()
+        try:
+            json.dumps(value)
+        except (TypeError, ValueError):
+            print(f"Session export: skipping non-serializable state key '{key}'.")
+            continue
+        state[key] = value
+    return state
+
+
+def persistence_files() -> List:
+    """(path, arcname, already_compressed) for every persistence file that exists (session export and snapshots)."""
+    files = []
+    for path, arcname in ((CONFIG_FILE_PATH, 'config.ini'), (CONNECTIONS_FILE_PATH, 'connections.json')):
+        if os.path.exists(path):
+            files.append((path, arcname, False))
+    if os.path.isdir(EXECUTION_LOG_SEGMENTS_DIR):
+        # Segments + manifest (cold segments are already gzip-compressed and are stored as-is)
+        for name in sorted(os.listdir(EXECUTION_LOG_SEGMENTS_DIR)):
+            files.append((os.path.join(EXECUTION_LOG_SEGMENTS_DIR, name), f'execution_log/{name}', name.endswith('.gz')))
+    for path, arcname in ((EXECUTION_LOG_LLM_CONTEXT_PATH, 'execution_log_llm_context.txt'),
+                          (CHAT_LOG_FILE_PATH, 'chat_history.jsonl'),
+                          (ACTION_PLAN_FILE_PATH, 'action_plan.json')):
+        if os.path.exists(path):
+            files.append((path, arcname, False))
+    return files
+
+
+def persistence_path(arcname: str) -> Optional[str]:
+    """Disk path for an archive name produced by persistence_files() (None if unknown)."""
+    if arcname.startswith('execution_log/'):
+        return os.path.join(EXECUTION_LOG_SEGMENTS_DIR, os.path.basename(arcname))
+    return {
+        'config.ini': CONFIG_FILE_PATH,
+        'connections.json': CONNECTIONS_FILE_PATH,
+        'execution_log_llm_context.txt': EXECUTION_LOG_LLM_CONTEXT_PATH,
+        'chat_history.jsonl': CHAT_LOG_FILE_PATH,
+        'action_plan.json': ACTION_PLAN_FILE_PATH,
+    }.get(arcname)
 
-            if os.path.exists(ACTION_PLAN_FILE_PATH):
-                zipf.write(ACTION_PLAN_FILE_PATH, arcname='action_plan.json')
 
+def stream_session_zip(global_state: Dict, compress_level: int = DEFAULT_EXPORT_COMPRESS_LEVEL):
+    """
+    Returns (filename, chunks): the session ZIP (same layout as before) generated chunk by
+    chunk. Files are read in EXPORT_CHUNK_SIZE pieces and the text log is rendered straight
+    into its entry, so memory use does not depend on the session size and nothing is
+    written to disk.
+    """
+    # Persist pending write-behind state so the archive sees the latest files
+    log_manager = global_state.get('log_manager')
+    if log_manager:
+        log_manager.flush()
+
+    session_json = json.dumps(serializable_session_state(global_state), indent=4).encode('utf-8')
+    filename = f"session_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
+    compress_level = max(0, min(9, int(compress_level)))
+    compression = zipfile.ZIP_DEFLATED if compress_level > 0 else zipfile.ZIP_STORED
+
+    def chunks():
+        sink = _ZipStreamSink()
+        with zipfile.ZipFile(sink, 'w', compression, compresslevel=compress_level or None) as zipf:
+            # Core State
+            zipf.writestr('session.json', session_json)
+            yield sink.drain()
+
+            # Config, connections, logs & history
+            for path, arcname, already_compressed in persistence_files():
+                try:
+                    if already_compressed:
+                        info = zipfile.ZipInfo.from_file(path, arcname)
+                        info.compress_type = zipfile.ZIP_STORED
+                    else:
+                        info = arcname
+                    with open(path, 'rb') as src, zipf.open(info, 'w', force_zip64=True) as dest:
+                        for chunk in iter(lambda: src.read(EXPORT_CHUNK_SIZE), b''):
+                            dest.write(chunk)
+                            if sink.pending >= EXPORT_CHUNK_SIZE:
+                                yield sink.drain()
+                except FileNotFoundError:
+                    # Rotated or removed while exporting
+                    continue
+                yield sink.drain()
+
+            # Human-readable text export, rendered from the events into the archive
+            if os.path.isdir(EXECUTION_LOG_SEGMENTS_DIR):
+                with zipf.open('execution_log.txt', 'w', force_zip64=True) as dest:
+                    for event in BaseLogManager(EXECUTION_LOG_SEGMENTS_DIR).iter_events():
+                        dest.write(render_event_text(event).encode('utf-8'))
+                        if sink.pending >= EXPORT_CHUNK_SIZE:
+                            yield sink.drain()
+                yield sink.drain()
+        # Central directory
+        yield sink.drain()
+
+    return filename, (chunk for chunk in chunks() if chunk)
+
+
+def save_session_state(global_state, compress_level: int = DEFAULT_EXPORT_COMPRESS_LEVEL):
+    """
+    Saves the full application state to a ZIP file in APP_DIR (same archive as the
+    /save_session download). Returns the path, or None on error.
+    """
+    try:
+        filename, chunks = stream_session_zip(global_state, compress_level)
+        zip_path = os.path.join(APP_DIR, filename)
+        with open(zip_path, 'wb') as f:
+            for chunk in chunks:
+                f.write(chunk)
         print(f"Session saved to {zip_path}")
         return zip_path
 
@@ -280,7 +409,22 @@ def load_session_state(zip_path):
                     f.write(zipf.read('connections.json'))
 
             # Extract Logs
-            if 'execution_log.txt' in zipf.namelist():
+            segment_names = [n for n in zipf.namelist() if n.startswith('execution_log/') and not n.endswith('/')]
+            if segment_names or 'execution_log.jsonl' in zipf.namelist() or 'execution_log.txt' in zipf.namelist():
+                # The archive replaces the current log; older formats are migrated on reload
+                shutil.rmtree(EXECUTION_LOG_SEGMENTS_DIR, ignore_errors=True)
+                if os.path.exists(EXECUTION_EVENT_LOG_PATH):
+                    os.remove(EXECUTION_EVENT_LOG_PATH)
+
+            if segment_names:
+                os.makedirs(EXECUTION_LOG_SEGMENTS_DIR, exist_ok=True)
+                for name in segment_names:
+                    with open(os.path.join(EXECUTION_LOG_SEGMENTS_DIR, os.path.basename(name)), 'wb') as f:
+                        f.write(zipf.read(name))
+            elif 'execution_log.jsonl' in zipf.namelist():
+                with open(EXECUTION_EVENT_LOG_PATH, 'wb') as f:
+                    f.write(zipf.read('execution_log.jsonl'))
+            elif 'execution_log.txt' in zipf.namelist():
                 with open(EXECUTION_LOG_FILE_PATH, 'wb') as f:
                     f.write(zipf.read('execution_log.txt'))
 
@@ -289,9 +433,15 @@ def load_session_state(zip_path):
                     f.write(zipf.read('execution_log_llm_context.txt'))
 
             # Extract Chat & Plan
-            if 'chat_history.json' in zipf.namelist():
+            if 'chat_history.jsonl' in zipf.namelist():
                 with open(CHAT_LOG_FILE_PATH, 'wb') as f:
+                    f.write(zipf.read('chat_history.jsonl'))
+            elif 'chat_history.json' in zipf.namelist():
+                # Older archives: the JSON list is migrated to JSONL on reload
+                with open(CHAT_LOG_LEGACY_PATH, 'wb') as f:
                     f.write(zipf.read('chat_history.json'))
+                if os.path.exists(CHAT_LOG_FILE_PATH):
+                    os.remove(CHAT_LOG_FILE_PATH)
 
             if 'action_plan.json' in zipf.namelist():
                 with open(ACTION_PLAN_FILE_PATH, 'wb') as f:
@@ -0,0 +1,301 @@
+import os
+import json
+import time
+import zlib
+import shutil
+import hashlib
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from config import KEYS_DIR, SESSION_FILE_PATH, EXECUTION_LOG_SEGMENTS_DIR
+from session_manager import persistence_files, persistence_path, serializable_session_state
+
+# ===========================
+# === SNAPSHOT STORE ===
+# ===========================
+# Incremental, content-addressed session snapshots (crash recovery checkpoints).
+#
+#   keys/snapshots/objects/ab/abcd...   zlib-compressed blobs, named by the sha256 of their content
+#   keys/snapshots/manifests/NNNNNNNN.json
+#
+# A manifest maps every persistence file (and every large state string) to a list of parts:
+# the file content is the concatenation of those blobs. When a file only grew since the
+# previous snapshot (append-only logs), the new manifest reuses the previous parts and adds
+# one blob with the new byte range. Unchanged files (same size and mtime) are not even read,
+# and identical content is stored once. Manifests are self-contained, so old ones can be
+# pruned without breaking newer ones; restore concatenates the parts of one manifest.
+
+SNAPSHOTS_DIR = os.path.join(KEYS_DIR, 'snapshots')
+MAX_SNAPSHOTS = 200             # Older manifests are pruned, unreferenced blobs collected
+PRUNE_BATCH = 20                # Pruning (a scan of all manifests and blobs) runs once per this many extra snapshots
+MAX_PARTS_PER_FILE = 64         # Beyond this a file is stored whole again (bounded restore cost)
+TAIL_CHECK_BYTES = 4096         # Append-only check: the last bytes of the previous content must be unchanged
+LARGE_STATE_VALUE_CHARS = 64 * 1024   # State strings above this get append-only storage like files
+CHUNK_SIZE = 1024 * 1024
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+class SnapshotStore:
+    """Content-addressed incremental snapshots of the session state and persistence files."""
+
+    def __init__(self, root: str = SNAPSHOTS_DIR):
+        self.root = root
+        self.objects_dir = os.path.join(root, 'objects')
+        self.manifests_dir = os.path.join(root, 'manifests')
+        self._lock = threading.Lock()
+        self._latest: Optional[Dict] = None
+        self._loaded = False
+
+    # === Blobs ===
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.objects_dir, digest[:2], digest)
+
+    def _put_bytes(self, data: bytes) -> str:
+        digest = _sha256(data)
+        path = self._object_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(zlib.compress(data, 6))
+            os.replace(tmp_path, path)
+        return digest
+
+    def _put_stream(self, f) -> Tuple[str, int]:
+        """Stores the rest of an open file as one blob (streamed). Returns (digest, length)."""
+        os.makedirs(self.objects_dir, exist_ok=True)
+        tmp_path = os.path.join(self.objects_dir, f"stream.{threading.get_ident()}.tmp")
+        hasher, compressor, length = hashlib.sha256(), zlib.compressobj(6), 0
+        with open(tmp_path, 'wb') as out:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                hasher.update(chunk)
+                out.write(compressor.compress(chunk))
+                length += len(chunk)
+            out.write(compressor.flush())
+        digest = hasher.hexdigest()
+        path = self._object_path(digest)
+        if os.path.exists(path):
+            os.remove(tmp_path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(tmp_path, path)
+        return digest, length
+
+    def _get(self, digest: str) -> bytes:
+        with open(self._object_path(digest), 'rb') as f:
+            return zlib.decompress(f.read())
+
+    # === Entries ===
+
+    def _file_entry(self, path: str, previous: Optional[Dict]) -> Dict:
+        stat = os.stat(path)
+        if previous and previous.get('size') == stat.st_size and previous.get('mtime_ns') == stat.st_mtime_ns:
+            return previous
+
+        with open(path, 'rb') as f:
+            if self._can_append(previous, stat.st_size):
+                start = max(0, previous['size'] - TAIL_CHECK_BYTES)
+                f.seek(start)
+                if _sha256(f.read(previous['size'] - start)) == previous['tail_hash']:
+                    digest, length = self._put_stream(f)
+                    parts = previous['parts'] + ([digest] if length else [])
+                    return self._entry(f, parts, previous['size'] + length, stat.st_mtime_ns)
+            f.seek(0)
+            digest, length = self._put_stream(f)
+            return self._entry(f, [digest], length, stat.st_mtime_ns)
+
+    def _value_entry(self, data: bytes, previous: Optional[Dict]) -> Dict:
+        """Same as _file_entry for an in-memory value (large state strings)."""
+        if self._can_append(previous, len(data)):
+            start = max(0, previous['size'] - TAIL_CHECK_BYTES)
+            if _sha256(data[start:previous['size']]) == previous['tail_hash']:
+                delta = data[previous['size']:]
+                parts = previous['parts'] + ([self._put_bytes(delta)] if delta else [])
+                return {'parts': parts, 'size': len(data), 'tail_hash': _sha256(data[-TAIL_CHECK_BYTES:])}
+        return {'parts': [self._put_bytes(data)], 'size': len(data), 'tail_hash': _sha256(data[-TAIL_CHECK_BYTES:])}
+
+    @staticmethod
+    def _can_append(previous: Optional[Dict], size: int) -> bool:
+        return bool(previous) and 0 < previous['size'] <= size and len(previous['parts']) < MAX_PARTS_PER_FILE
+
+    @staticmethod
+    def _entry(f, parts: List[str], size: int, mtime_ns: int) -> Dict:
+        f.seek(max(0, size - TAIL_CHECK_BYTES))
+        tail = f.read(min(size, TAIL_CHECK_BYTES))
+        return {'parts': parts, 'size': size, 'mtime_ns': mtime_ns, 'tail_hash': _sha256(tail)}
+
+    def _read_parts(self, parts: List[str]) -> bytes:
+        return b"".join(self._get(digest) for digest in parts)
+
+    # === Manifests ===
+
+    def _manifest_ids(self) -> List[int]:
+        if not os.path.isdir(self.manifests_dir):
+            return []
+        return sorted(int(name[:-5]) for name in os.listdir(self.manifests_dir) if name.endswith('.json') and name[:-5].isdigit())
+
+    def _read_manifest(self, snapshot_id: int) -> Dict:
+        with open(os.path.join(self.manifests_dir, f"{snapshot_id:08d}.json"), 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            ids = self._manifest_ids()
+            try:
+                self._latest = self._read_manifest(ids[-1]) if ids else None
+            except Exception as e:
+                print(f"Snapshot store: could not read the latest manifest: {e}")
+                self._latest = None
+            self._loaded = True
+
+    def list_snapshots(self) -> List[Dict]:
+        snapshots = []
+        for snapshot_id in self._manifest_ids():
+            try:
+                manifest = self._read_manifest(snapshot_id)
+            except Exception:
+                continue
+            snapshots.append({'id': snapshot_id, 'created_at': manifest['created_at'], 'label': manifest.get('label', ''),
+                              'files': len(manifest['files'])})
+        return snapshots
+
+    # === Public API ===
+
+    def checkpoint(self, global_state: Dict, label: str = "") -> Optional[int]:
+        """Writes an incremental snapshot. Returns its id (None on error)."""
+        start = time.time()
+        try:
+            log_manager = global_state.get('log_manager')
+            if log_manager:
+                log_manager.flush()
+
+            with self._lock:
+                self._ensure_loaded()
+                previous = self._latest or {'files': {}, 'values': {}}
+
+                # The live log is not included: it is rebuilt from the event log on restore
+                state = serializable_session_state(global_state)
+                values = {}
+                for key, value in list(state.items()):
+                    if isinstance(value, str) and len(value) > LARGE_STATE_VALUE_CHARS:
+                        values[key] = self._value_entry(value.encode('utf-8'), previous['values'].get(key))
+                        del state[key]
+
+                files = {}
+                for path, arcname, _ in persistence_files():
+                    try:
+                        files[arcname] = self._file_entry(path, previous['files'].get(arcname))
+                    except FileNotFoundError:
+                        continue   # Rotated while snapshotting; the next snapshot picks up the new name
+
+                ids = self._manifest_ids()
+                snapshot_id = (ids[-1] + 1) if ids else 1
+                manifest = {
+                    'id': snapshot_id, 'created_at': time.time(), 'label': label,
+                    'state': self._put_bytes(json.dumps(state, sort_keys=True).encode('utf-8')),
+                    'values': values, 'files': files,
+                }
+                os.makedirs(self.manifests_dir, exist_ok=True)
+                path = os.path.join(self.manifests_dir, f"{snapshot_id:08d}.json")
+                with open(path + '.tmp', 'w', encoding='utf-8') as f:
+                    json.dump(manifest, f)
+                os.replace(path + '.tmp', path)
+                self._latest = manifest
+
+                if len(ids) + 1 > MAX_SNAPSHOTS + PRUNE_BATCH:
+                    self._prune(ids[:len(ids) + 1 - MAX_SNAPSHOTS])
+
+            print(f"Snapshot {snapshot_id} ({label}) written in {(time.time() - start) * 1000:.0f} ms")
+            return snapshot_id
+        except Exception as e:
+            print(f"Snapshot failed: {e}")
+            return None
+
+    def _prune(self, old_ids: List[int]):
+        """Deletes old manifests and every blob no remaining manifest references."""
+        for snapshot_id in old_ids:
+            try:
+                os.remove(os.path.join(self.manifests_dir, f"{snapshot_id:08d}.json"))
+            except FileNotFoundError:
+                pass
+        referenced = set()
+        for snapshot_id in self._manifest_ids():
+            manifest = self._read_manifest(snapshot_id)
+            referenced.add(manifest['state'])
+            for entry in list(manifest['files'].values()) + list(manifest['values'].values()):
+                referenced.update(entry['parts'])
+        for prefix in os.listdir(self.objects_dir):
+            prefix_dir = os.path.join(self.objects_dir, prefix)
+            if not os.path.isdir(prefix_dir):
+                continue
+            for digest in os.listdir(prefix_dir):
+                if digest not in referenced:
+                    os.remove(os.path.join(prefix_dir, digest))
+
+    def restore(self, snapshot_id: Optional[int] = None) -> Optional[Dict]:
+        """
+        Rebuilds the persistence files of a snapshot (latest by default) and returns its state
+        (without the live log). Returns None if there is no such snapshot.
+        """
+        with self._lock:
+            ids = self._manifest_ids()
+            if snapshot_id is None:
+                snapshot_id = ids[-1] if ids else None
+            if snapshot_id not in ids:
+                return None
+            manifest = self._read_manifest(snapshot_id)
+
+            # Everything is rebuilt next to its target first; the live files are only
+            # replaced once all blobs were read, so a failed restore leaves them untouched
+            staged_segments = EXECUTION_LOG_SEGMENTS_DIR + '.restore'
+            staged = []     # (staged path, live path) of the single files
+            try:
+                shutil.rmtree(staged_segments, ignore_errors=True)
+                os.makedirs(staged_segments)
+                for arcname, entry in manifest['files'].items():
+                    path = persistence_path(arcname)
+                    if not path:
+                        continue
+                    if arcname.startswith('execution_log/'):
+                        staged_path = os.path.join(staged_segments, os.path.basename(path))
+                    else:
+                        staged_path = path + '.restore'
+                        staged.append((staged_path, path))
+                    with open(staged_path, 'wb') as f:
+                        for digest in entry['parts']:
+                            f.write(self._get(digest))
+
+                state = json.loads(self._get(manifest['state']))
+                for key, entry in manifest['values'].items():
+                    state[key] = self._read_parts(entry['parts']).decode('utf-8')
+                staged.append((SESSION_FILE_PATH + '.restore', SESSION_FILE_PATH))
+                with open(SESSION_FILE_PATH + '.restore', 'w') as f:
+                    json.dump(state, f, indent=4)
+            except Exception:
+                shutil.rmtree(staged_segments, ignore_errors=True)
+                for staged_path, _ in staged:
+                    if os.path.exists(staged_path):
+                        os.remove(staged_path)
+                raise
+
+            # The snapshot replaces the current log directory
+            old_segments = EXECUTION_LOG_SEGMENTS_DIR + '.old'
+            shutil.rmtree(old_segments, ignore_errors=True)
+            if os.path.isdir(EXECUTION_LOG_SEGMENTS_DIR):
+                os.replace(EXECUTION_LOG_SEGMENTS_DIR, old_segments)
+            os.replace(staged_segments, EXECUTION_LOG_SEGMENTS_DIR)
+            for staged_path, path in staged:
+                os.replace(staged_path, path)
+            shutil.rmtree(old_segments, ignore_errors=True)
+            # Restored files have new mtimes; the next checkpoint re-reads them once
+            self._latest = manifest
+            self._loaded = True
+        print(f"Snapshot {manifest['id']} ({manifest.get('label', '')}) restored.")
+        return state
+
+
+SNAPSHOT_STORE = SnapshotStore()
@@ -1,15 +1,28 @@
 import os
-import re
+import time
+import select
+import socket
 import paramiko
 import ipaddress
 import subprocess
 import traceback
 from config import get_config, KEYS_DIR
+from tracing import TRACER
+from ansi_stripper import strip_ansi
+from output_capture import OutputCapture, DEFAULT_MEMORY_LIMIT
+import metrics
 
 # --- Constante pentru căile cheilor ---
 PRIVATE_KEY_PATH = os.path.join(KEYS_DIR, 'id_rsa')
 PUBLIC_KEY_PATH = os.path.join(KEYS_DIR, 'id_rsa.pub')
 
+# Bytes requested per read from the command's stdout / stderr
+READ_CHUNK_SIZE = 64 * 1024
+# Seconds a select() on the channel waits before re-checking (keeps Stop / abort responsive)
+CHANNEL_POLL_INTERVAL = 0.2
+# A command that produces no output for this long is treated as hung
+COMMAND_IDLE_TIMEOUT = 1200
+
 # Global variable to track the currently active SSH client
 ACTIVE_SSH_CLIENT = None
 
@@ -21,35 +34,42 @@ def strip_ansi_sequences(text):
     """
     Sterge ANSI escape sequences si artefactele specifice Windows OpenSSH (Window Title).
     Rezolva problema aparitiei '0;C:\\WINDOWS\\system32\\conhost.exe'.
+    Regex-urile sunt precompilate in ansi_stripper (AnsiStripper pentru output primit pe bucati).
+    """
+    return strip_ansi(text)
+
+def drain_channel(channel, stdout_capture, stderr_capture, idle_timeout: float = COMMAND_IDLE_TIMEOUT):
+    """
+    Reads stdout and stderr of an exec channel as each becomes ready, until EOF.
+    Both streams share one SSH window: reading them one after the other (stdout.read() then
+    stderr.read()) stalls forever when the command fills the stderr buffer first.
     """
-    # 1. Regex principal pentru secvente ANSI standard (CSI)
-    # Acopera culori, miscari de cursor etc.
-    ansi_csi_pattern = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])')
-
-    # 2. Regex specific pentru Windows OSC (Operating System Command) - Window Title
-    # Windows trimite adesea: ESC ] 0 ; Titlu BEL  sau ESC ] 0 ; Titlu ESC \
-    # Acest pattern cauta secventa de start \x1B]0; si merge pana la BEL (\x07) sau ST (\x1B\\)
-    ansi_osc_pattern = re.compile(r'\x1B\]0;.*?(?:\x07|\x1B\\)', re.DOTALL)
-
-    # Aplicam curatarea in pasi
-    text = ansi_osc_pattern.sub('', text) # Scoatem titlurile intai (sunt lungi)
-    text = ansi_csi_pattern.sub('', text) # Scoatem culorile
-
-    # 3. Curatare Fallback pentru artefacte 'orphaned'
-    # Uneori, daca buffer-ul taie secventa la mijloc, raman resturi.
-    # Filtram liniile care arata exact a artefact de conhost
-    lines = text.splitlines()
-    cleaned_lines = []
-    for line in lines:
-        clean_line = line.strip()
-        # Daca linia incepe cu '0;' si contine o cale de sistem sau conhost, e gunoi
-        if clean_line.startswith("0;") and ("conhost.exe" in clean_line or ":\\" in clean_line):
+    channel.setblocking(0)
+    last_data = time.time()
+    while True:
+        got_data = False
+        while channel.recv_ready():
+            stdout_capture.feed(channel.recv(READ_CHUNK_SIZE))
+            got_data = True
+        while channel.recv_stderr_ready():
+            stderr_capture.feed(channel.recv_stderr(READ_CHUNK_SIZE))
+            got_data = True
+        if got_data:
+            last_data = time.time()
             continue
-        # Daca linia e goala, o pastram doar daca nu suntem in mijlocul unui bloc de gunoi
-        cleaned_lines.append(line)
+        if channel.eof_received or channel.closed:
+            # The transport thread can queue the last data and set EOF between the reads
+            # above and this check: read until both buffers are empty before stopping.
+            if channel.recv_ready() or channel.recv_stderr_ready():
+                continue
+            break
+        if time.time() - last_data > idle_timeout:
+            raise socket.timeout(f"No output for {idle_timeout}s")
+        # The channel's fileno becomes readable when data (either stream) or EOF arrives
+        select.select([channel], [], [], CHANNEL_POLL_INTERVAL)
+    stdout_capture.finish()
+    stderr_capture.finish()
 
-    result = '\n'.join(cleaned_lines)
-    return result
 
 # --- CORECTIE: Functii "getter" care lipseau ---
 def get_private_key_path():
@@ -288,6 +308,12 @@ def execute_ssh_command(command: str) -> str:
     user = cfg.get('System', 'username', fallback='').strip()
     port = cfg.getint('System', 'ssh_port', fallback=22)
     key_path = cfg.get('System', 'ssh_key_path', fallback='').strip()
+    # Output above this size (per stream) is spilled to disk; only head + tail stay in memory
+    output_memory_limit = cfg.getint('System', 'output_memory_cap_kb', fallback=DEFAULT_MEMORY_LIMIT // 1024) * 1024
+    # SSH flow control for the exec channel: a larger window lets the server keep sending without
+    # waiting for window adjustments (throughput on noisy commands / high-latency links)
+    window_size = cfg.getint('System', 'ssh_window_size_kb', fallback=8192) * 1024
+    max_packet_size = cfg.getint('System', 'ssh_max_packet_kb', fallback=32) * 1024
 
     if not all([ip, user, key_path]):
         return "Error: System IP, Username, or SSH Key Path is missing."
@@ -297,8 +323,11 @@ def execute_ssh_command(command: str) -> str:
         client = paramiko.SSHClient()
         ACTIVE_SSH_CLIENT = client  # Register active client
         client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-        pkey = paramiko.RSAKey.from_private_key_file(key_path)
-        client.connect(hostname=ip, port=port, username=user, pkey=pkey, timeout=30)
+        connect_start = time.time()
+        with TRACER.span('ssh.connect', cat='ssh', host=ip):
+            pkey = paramiko.RSAKey.from_private_key_file(key_path)
+            client.connect(hostname=ip, port=port, username=user, pkey=pkey, timeout=30)
+        metrics.SSH_CONNECT_DURATION.observe(time.time() - connect_start)
 
         # Determine PTY usage based on detected OS
         # Use actual detected OS if available, otherwise fallback to keyword heuristic
@@ -312,27 +341,37 @@ def execute_ssh_command(command: str) -> str:
 
         # get_pty=True pentru Unix (evita blocaje cu pager), False pentru Windows (evita ANSI escape sequences)
         use_pty = not is_windows
-        stdin, stdout, stderr = client.exec_command(command, timeout=1200, get_pty=use_pty)
+        exec_start = time.time()
+        with TRACER.span('ssh.exec', cat='ssh', pty=use_pty):
+            channel = client.get_transport().open_session(window_size=window_size, max_packet_size=max_packet_size, timeout=30)
+            if use_pty:
+                channel.get_pty()
+            channel.exec_command(command)
 
         # --- FIX: Close STDIN immediately ---
         # This prevents commands like 'sudo', 'psql', or 'docker' from hanging
         # while waiting for input that will never come.
-        stdin.close()
+        channel.shutdown_write()
         # ------------------------------------
 
-        output = stdout.read().decode('utf-8', 'ignore').strip()
-        error_output = stderr.read().decode('utf-8', 'ignore').strip()
-        exit_status = stdout.channel.recv_exit_status()
-
-        # DEBUG: Log raw output before stripping
+        # Output-ul e citit pe bucati (stdout si stderr in paralel): decodat si curatat de ANSI pe masura ce vine, limitat in memorie
+        read_span = TRACER.begin('ssh.read', cat='ssh')
+        stdout_capture = OutputCapture(output_memory_limit)
+        stderr_capture = OutputCapture(output_memory_limit)
+        drain_channel(channel, stdout_capture, stderr_capture)
+        exit_status = channel.recv_exit_status()
+        TRACER.end(read_span, bytes=stdout_capture.raw_bytes + stderr_capture.raw_bytes, exit_status=exit_status,
+                   spilled=stdout_capture.spilled or stderr_capture.spilled)
+        metrics.SSH_EXEC_DURATION.observe(time.time() - exec_start)
+
+        # DEBUG: Log raw output size
         print(f"[SSH_UTILS DEBUG] Command: {command[:50]}...", flush=True)
-        print(f"[SSH_UTILS DEBUG] Raw stdout length: {len(output)}, stderr length: {len(error_output)}", flush=True)
-        print(f"[SSH_UTILS DEBUG] Raw stdout (first 200 chars): {repr(output[:200])}", flush=True)
+        print(f"[SSH_UTILS DEBUG] Raw stdout bytes: {stdout_capture.raw_bytes}, stderr bytes: {stderr_capture.raw_bytes}", flush=True)
         print(f"[SSH_UTILS DEBUG] get_pty={use_pty}, exit_status={exit_status}", flush=True)
 
-        # Stergem ANSI escape sequences din output
-        output_stripped = strip_ansi_sequences(output)
-        error_output_stripped = strip_ansi_sequences(error_output)
+        # Text curatat (complet, sau head + statistici + tail daca a fost mutat pe disc)
+        output_stripped = stdout_capture.text().strip()
+        error_output_stripped = stderr_capture.text().strip()
 
         # DEBUG: Log after stripping
         print(f"[SSH_UTILS DEBUG] After strip stdout length: {len(output_stripped)}, stderr length: {len(error_output_stripped)}", flush=True)
@@ -374,3 +413,45 @@ def abort_active_connection():
             ACTIVE_SSH_CLIENT = None
         except Exception as e:
             print(f"Error closing SSH connection: {e}")
+
+
+# --- Bloc optional pentru testare ---
+if __name__ == '__main__':
+    import tempfile
+
+    class _RacingChannel:
+        """Fake channel: the trailing output and EOF arrive in the same poll, after the reads."""
+        def __init__(self):
+            self.stdout, self.stderr = [b"first\n"], []
+            self._eof = False
+            self.closed = False
+
+        def setblocking(self, flag):
+            pass
+
+        def recv_ready(self):
+            return bool(self.stdout)
+
+        def recv_stderr_ready(self):
+            return bool(self.stderr)
+
+        def recv(self, size):
+            return self.stdout.pop(0)
+
+        def recv_stderr(self, size):
+            return self.stderr.pop(0)
+
+        @property
+        def eof_received(self):
+            if not self._eof:
+                self.stdout.append(b"last line\n")
+                self.stderr.append(b"warning\n")
+                self._eof = True
+            return self._eof
+
+    spill_dir = tempfile.mkdtemp()
+    stdout_capture, stderr_capture = OutputCapture(spill_dir=spill_dir), OutputCapture(spill_dir=spill_dir)
+    drain_channel(_RacingChannel(), stdout_capture, stderr_capture, idle_timeout=1)
+    assert stdout_capture.text() == "first\nlast line\n", stdout_capture.text()
+    assert stderr_capture.text() == "warning\n", stderr_capture.text()
+    print("drain_channel checks passed.")
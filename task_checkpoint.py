@@ -0,0 +1,199 @@
+import os
+import json
+import time
+import hashlib
+from typing import Dict, Optional
+
+from config import TASK_CHECKPOINT_PATH
+
+# ===========================
+# === TASK CHECKPOINT ===
+# ===========================
+# Compact record of the task in progress, rewritten atomically at every step boundary:
+#   completed_step   - last step whose result is in the LLM context
+#   context_version  - size + tail hash of the LLM context at that point
+#   action_plan      - active plan id and the index of its first open step
+#   last_command     - last command that finished (success / failed / rejected)
+#   pending          - command of the next step while it waits for approval or runs
+# If the process dies, the file is left with status 'running' and the task can be resumed
+# from completed_step + 1: the logs and the LLM context are already on disk, so no LLM call
+# is replayed and no command is run again (a pending command is reported to the agent instead).
+
+CHECKPOINT_VERSION = 1
+RESUMABLE_STATUSES = ('running', 'failed')
+CONTEXT_TAIL_CHARS = 512        # Tail hashed to detect that the context was rewritten (summarization, edit)
+STEP_HEADER = "\n--- STEP "
+
+
+def context_version(context: str) -> Dict:
+    """Identifies a version of the LLM context (append-only between summarizations)."""
+    context = context or ""
+    return {'chars': len(context),
+            'tail_hash': hashlib.sha256(context[-CONTEXT_TAIL_CHARS:].encode('utf-8')).hexdigest()}
+
+
+def action_plan_pointer(log_manager) -> Optional[Dict]:
+    """Active action plan and the index of its first uncompleted step (None without a plan)."""
+    plan = log_manager.action_plan.get_active_plan() if log_manager else None
+    if not plan:
+        return None
+    steps = plan.get('steps', [])
+    next_index = next((i for i, step in enumerate(steps) if not step.get('completed')), len(steps))
+    return {'plan_id': plan.get('id'), 'title': plan.get('title', ''), 'next_index': next_index, 'total': len(steps)}
+
+
+def steps_recorded_after(checkpoint: Dict, context: str) -> int:
+    """
+    Number of steps appended to the context after the checkpoint was written (a crash between
+    the context write and the next checkpoint). 0 if the context was rewritten since.
+    """
+    version = checkpoint.get('context_version') or {}
+    chars = version.get('chars', 0)
+    if len(context) < chars or context_version(context[:chars]) != version:
+        return 0
+    return context[chars:].count(STEP_HEADER)
+
+
+def load_task_checkpoint(path: str = TASK_CHECKPOINT_PATH) -> Optional[Dict]:
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            checkpoint = json.load(f)
+        return checkpoint if checkpoint.get('version') == CHECKPOINT_VERSION else None
+    except (OSError, ValueError) as e:
+        print(f"Task checkpoint unreadable ({e}), ignoring it.")
+        return None
+
+
+def interrupted_task(path: str = TASK_CHECKPOINT_PATH) -> Optional[Dict]:
+    """Checkpoint of a task that did not finish (process died or runner error), if any."""
+    checkpoint = load_task_checkpoint(path)
+    if checkpoint and checkpoint.get('status') in RESUMABLE_STATUSES:
+        return checkpoint
+    return None
+
+
+def recorded_target(checkpoint: Dict) -> str:
+    """'user@ip' the task ran on ('' for checkpoints without it)."""
+    system = checkpoint.get('system') or {}
+    if not system.get('ip'):
+        return ""
+    return f"{system.get('username', '')}@{system['ip']}"
+
+
+def target_changed(checkpoint: Dict, username: str, ip: str) -> bool:
+    """
+    True when the configured SSH target is not the host the task ran on: a resume would
+    continue there with the OS / sudo info detected on the old one.
+    """
+    recorded = recorded_target(checkpoint)
+    return bool(recorded) and recorded != f"{username}@{ip}"
+
+
+def clear_task_checkpoint(path: str = TASK_CHECKPOINT_PATH):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class TaskCheckpoint:
+    """Checkpoint writer owned by one agent_task_runner."""
+
+    def __init__(self, record: Dict, path: str = TASK_CHECKPOINT_PATH):
+        self.record = record
+        self.path = path
+
+    @classmethod
+    def start(cls, task_id: str, global_state: Dict, detected_os: str, path: str = TASK_CHECKPOINT_PATH) -> 'TaskCheckpoint':
+        record = {
+            'version': CHECKPOINT_VERSION,
+            'task_id': task_id,
+            'objective': global_state['current_objective'],
+            'started_at': time.time(),
+            'status': 'running',
+            'modes': {
+                'execution': global_state.get('current_execution_mode', 'independent'),
+                'summarization': global_state.get('current_summarization_mode', 'automatic'),
+                'allow_ask': global_state.get('current_allow_ask_mode', False),
+            },
+            'system': {
+                'os_info': global_state.get('system_os_info', ''),
+                'detected_os': detected_os,
+                'sudo_available': global_state.get('sudo_available', False),
+                'username': global_state.get('system_username', ''),
+                'ip': global_state.get('system_ip', ''),
+            },
+            'completed_step': 0,
+            'context_version': None,
+            'action_plan': None,
+            'last_command': None,
+            'pending': None,
+        }
+        return cls(record, path)
+
+    @classmethod
+    def resume(cls, checkpoint: Dict, path: str = TASK_CHECKPOINT_PATH) -> 'TaskCheckpoint':
+        record = dict(checkpoint, status='running')
+        record['resumed_count'] = record.get('resumed_count', 0) + 1
+        return cls(record, path)
+
+    def _write(self):
+        """tmp + fsync + rename: a crash leaves either the previous or the new checkpoint."""
+        self.record['updated_at'] = time.time()
+        tmp_path = self.path + '.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.record, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Task checkpoint write failed: {e}")
+
+    def step_completed(self, step: int, context: str, log_manager=None):
+        """Called at the start of every loop iteration: everything up to 'step' is on disk."""
+        self.record.update(completed_step=step, context_version=context_version(context),
+                           action_plan=action_plan_pointer(log_manager), pending=None)
+        self._write()
+
+    def pending(self, step: int, command: str, reason: str, state: str):
+        """Records the command of the current step ('awaiting_approval' or 'executing')."""
+        self.record['pending'] = {'step': step, 'command': command, 'reason': reason, 'state': state}
+        self._write()
+
+    def command_finished(self, step: int, command: str, status: str):
+        self.record['last_command'] = {'step': step, 'command': command, 'status': status}
+        self.record['pending'] = None
+        self._write()
+
+    def finish(self, status: str):
+        """'failed' keeps the checkpoint resumable; any other outcome removes it."""
+        if status in RESUMABLE_STATUSES:
+            self.record['status'] = status
+            self._write()
+        else:
+            clear_task_checkpoint(self.path)
+
+
+# --- Bloc optional pentru testare ---
+if __name__ == '__main__':
+    import tempfile
+
+    path = os.path.join(tempfile.mkdtemp(), 'task_checkpoint.json')
+    state = {'current_objective': 'install nginx', 'system_os_info': 'OS: Linux'}
+    checkpoint = TaskCheckpoint.start('t1', state, 'Linux', path)
+    context = "=== NEW TASK STARTED ===\n\n--- STEP 1 ---\nCOMMAND: ls\n"
+    checkpoint.step_completed(1, context)
+    checkpoint.pending(2, 'apt install nginx', 'install', 'executing')
+
+    saved = interrupted_task(path)
+    assert saved['completed_step'] == 1 and saved['pending']['state'] == 'executing'
+    assert steps_recorded_after(saved, context) == 0
+    assert steps_recorded_after(saved, context + "\n\n--- STEP 2 ---\nOutput: ok\n") == 1
+    assert steps_recorded_after(saved, "summary") == 0
+
+    TaskCheckpoint.resume(saved, path).finish('completed')
+    assert interrupted_task(path) is None
+    print("Task checkpoint checks passed.")
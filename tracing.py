@@ -0,0 +1,200 @@
+import os
+import json
+import time
+import threading
+import functools
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+from config import KEYS_DIR
+
+# ===========================
+# === TRACE STORAGE ===
+# ===========================
+# One file per task: traces/trace_<task_id>.json in Chrome trace format
+# (JSON array of complete "X" events). The closing bracket is optional in that
+# format, so spans are simply appended; the files open in chrome://tracing or Perfetto.
+
+TRACES_DIR = os.path.join(KEYS_DIR, 'traces')
+MAX_TRACE_FILES = 50        # Oldest trace files are deleted beyond this count
+FLUSH_EVERY_SPANS = 100     # Buffered spans are written at step boundaries or after this many
+
+
+class Tracer:
+    """
+    Records timed spans for the running agent task.
+    Spans are only recorded while a task is active, so calls outside a task cost almost nothing.
+    """
+
+    def __init__(self, traces_dir: str = TRACES_DIR):
+        self.traces_dir = traces_dir
+        self._lock = threading.Lock()
+        self._buffer: List[Dict] = []
+        self._path: Optional[str] = None
+        self.task_id: Optional[str] = None
+        self.step = 0
+        self._step_start: Optional[float] = None
+        self._listeners: List[Callable] = []
+
+    def add_listener(self, callback: Callable):
+        """Registers callback(name, cat, duration_seconds, args), called for every completed span."""
+        self._listeners.append(callback)
+
+    # === Task Lifecycle ===
+
+    def start_task(self, task_id: str, objective: str = ""):
+        """Opens a new trace file for the task."""
+        self.end_task()
+        try:
+            os.makedirs(self.traces_dir, exist_ok=True)
+            self._prune_old_traces()
+            path = os.path.join(self.traces_dir, f"trace_{task_id}.json")
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write("[\n")
+                metadata = {'name': 'process_name', 'ph': 'M', 'pid': 1, 'tid': 1,
+                            'args': {'name': f"Task {task_id}: {objective[:80]}"}}
+                f.write(json.dumps(metadata, ensure_ascii=False) + ",\n")
+        except Exception as e:
+            print(f"Tracer: could not create trace file: {e}")
+            return
+        with self._lock:
+            self._path = path
+            self.task_id = task_id
+            self.step = 0
+
+    def set_step(self, step: int):
+        """Marks the start of a new agent step (records the previous step and flushes its spans)."""
+        self._end_step()
+        self.flush()
+        self.step = step
+        self._step_start = time.time()
+
+    def end_task(self):
+        """Flushes and closes the current trace."""
+        self._end_step()
+        self.flush()
+        with self._lock:
+            self._path = None
+            self.task_id = None
+            self.step = 0
+
+    def _end_step(self):
+        if self._step_start is not None and self.task_id is not None:
+            self._record('step', 'step', self._step_start, time.time(), {})
+        self._step_start = None
+
+    # === Spans ===
+
+    def begin(self, name: str, cat: str = 'agent', **args) -> Optional[Dict]:
+        """Starts a span and returns its handle (None when no task is traced)."""
+        if self.task_id is None:
+            return None
+        return {'name': name, 'cat': cat, 'start': time.time(), 'args': args}
+
+    def end(self, handle: Optional[Dict], **args):
+        """Ends a span started with begin()."""
+        if handle is None:
+            return
+        handle['args'].update(args)
+        self._record(handle['name'], handle['cat'], handle['start'], time.time(), handle['args'])
+
+    @contextmanager
+    def span(self, name: str, cat: str = 'agent', **args):
+        """Context manager form: with TRACER.span('llm.invoke', cat='llm'): ..."""
+        handle = self.begin(name, cat, **args)
+        try:
+            yield handle
+        finally:
+            self.end(handle)
+
+    def _record(self, name: str, cat: str, start: float, end: float, args: Dict):
+        span_args = {'task_id': self.task_id, 'step': self.step}
+        span_args.update(args)
+        event = {
+            'name': name,
+            'cat': cat,
+            'ph': 'X',
+            'ts': int(start * 1_000_000),
+            'dur': max(0, int((end - start) * 1_000_000)),
+            'pid': 1,
+            'tid': 1,
+            'args': span_args,
+        }
+        with self._lock:
+            self._buffer.append(event)
+            should_flush = len(self._buffer) >= FLUSH_EVERY_SPANS
+        for listener in self._listeners:
+            try:
+                listener(name, cat, end - start, span_args)
+            except Exception as e:
+                print(f"Tracer: listener failed: {e}")
+        if should_flush:
+            self.flush()
+
+    def flush(self):
+        """Appends buffered spans to the trace file."""
+        with self._lock:
+            if not self._buffer or not self._path:
+                self._buffer = []
+                return
+            events, self._buffer = self._buffer, []
+            path = self._path
+        try:
+            with open(path, 'a', encoding='utf-8') as f:
+                for event in events:
+                    f.write(json.dumps(event, ensure_ascii=False, default=str) + ",\n")
+        except Exception as e:
+            print(f"Tracer: could not write spans: {e}")
+
+    # === Reading ===
+
+    def _prune_old_traces(self):
+        traces = self.list_traces()
+        for task_id in traces[MAX_TRACE_FILES - 1:]:
+            try:
+                os.remove(os.path.join(self.traces_dir, f"trace_{task_id}.json"))
+            except OSError:
+                pass
+
+    def list_traces(self) -> List[str]:
+        """Task IDs that have a trace file, newest first."""
+        try:
+            names = [n for n in os.listdir(self.traces_dir) if n.startswith('trace_') and n.endswith('.json')]
+        except FileNotFoundError:
+            return []
+        names.sort(key=lambda n: os.path.getmtime(os.path.join(self.traces_dir, n)), reverse=True)
+        return [n[len('trace_'):-len('.json')] for n in names]
+
+    def load_trace(self, task_id: str) -> List[Dict]:
+        """Returns the complete spans of a task, ordered by start time."""
+        if task_id == self.task_id:
+            self.flush()
+        path = os.path.join(self.traces_dir, f"trace_{os.path.basename(task_id)}.json")
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                text = f.read().strip()
+        except FileNotFoundError:
+            return []
+        # The array is left open (Chrome trace format allows it); close it for parsing
+        text = text.rstrip(',').rstrip(']').rstrip().rstrip(',') + "]"
+        try:
+            events = json.loads(text)
+        except json.JSONDecodeError as e:
+            print(f"Tracer: could not parse trace {path}: {e}")
+            return []
+        return sorted((e for e in events if e.get('ph') == 'X'), key=lambda e: e['ts'])
+
+
+# Global tracer shared by agent_core and ssh_utils (one task runs at a time)
+TRACER = Tracer()
+
+
+def traced(name: str, cat: str = 'agent'):
+    """Decorator that wraps a function call in a span."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with TRACER.span(name, cat):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator